@@ -34,6 +34,7 @@ ensure_admin()
 
 import importlib
 import threading
+import concurrent.futures
 import time
 import psutil
 import queue
@@ -41,8 +42,10 @@ import datetime
 import json
 from collections import defaultdict, deque
 import socket
-import base64
 import hashlib
+import hmac
+import struct
+import zlib
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
@@ -59,11 +62,24 @@ DRIVE_STATUS_UNKNOWN = "UNKNOWN"
 
 DEFAULT_BORG_PORT = 45678
 DEFAULT_BORG_KEY = "borg-shared-secret"  # override in config for real use
+DEFAULT_BORG_MTU = 1400       # max datagram size for batched BorgComm messages
 
 ANOMALY_FORECAST_WINDOW = 10  # seconds window for short-term anomaly forecast
 DRIVE_TREND_WINDOW = 30       # number of samples for drive trend
 HEALTH_HISTORY_WINDOW = 30    # predictive health trend history length
 SEQUENCE_WINDOW = 5           # length of sequence memory for endpoint sequences
+DELTA_HISTORY_WINDOW = 50     # detector intervals the anomaly forecast looks back over
+ANOMALY_RECENT_WINDOW = 3     # detector intervals counted as "recent"
+REFLECTION_WINDOW = 5         # predictions compared against realized anomalies
+CHANGE_QUEUE_MAX = 10000      # pending memory change events before new ones are dropped
+DETECTOR_TICK = 3             # seconds per ThreatDetector delta interval
+CONNECTION_RING_SIZE = 4096   # recent raw connections kept in memory
+SYSTEM_HISTORY_MAX = 1000     # recorded system states kept in memory
+MEMORY_MAGIC = b"BNM1"        # compact memory model file header
+SYNC_IO_TIMEOUT = 5.0         # seconds before a shared-drive operation counts as hung
+SYNC_IO_WORKERS = 4           # shared-drive I/O threads per node
+ATOMIC_REPLACE_RETRIES = 5    # os.replace attempts while a reader holds the target open
+ATOMIC_REPLACE_DELAY = 0.05   # seconds before the first retry (grows linearly)
 
 
 # ============================================================
@@ -80,6 +96,34 @@ def load_config():
         return {}
 
 
+def write_file_atomic(path, data):
+    """
+    Write bytes to a temp file next to path, fsync, then rename over it.
+    On Windows the rename fails while another process has path open, so it
+    is retried briefly; the temp file is removed if the write gives up.
+    """
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        for attempt in range(1, ATOMIC_REPLACE_RETRIES + 1):
+            try:
+                os.replace(tmp, path)
+                return
+            except PermissionError:
+                if attempt == ATOMIC_REPLACE_RETRIES:
+                    raise
+                time.sleep(ATOMIC_REPLACE_DELAY * attempt)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
 def save_config(cfg):
     try:
         with open(CONFIG_FILE, "w", encoding="utf-8") as f:
@@ -88,6 +132,104 @@ def save_config(cfg):
         print(f"[Config] Failed to save config: {e}")
 
 
+# ============================================================
+# STREAMING ESTIMATORS (O(1) PER SAMPLE)
+# ============================================================
+
+class RollingStats:
+    """
+    Welford mean / population variance. With size set, the oldest sample
+    is removed (reverse Welford update) once the window is full.
+    """
+    def __init__(self, size=None):
+        self.size = size
+        self._window = deque() if size else None
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.recent = 0.0
+
+    def push(self, x):
+        if self._window is not None:
+            if len(self._window) == self.size:
+                self._remove(self._window.popleft())
+            self._window.append(x)
+        self.count += 1
+        d = x - self.mean
+        self.mean += d / self.count
+        self._m2 += d * (x - self.mean)
+        self.recent = x
+
+    def _remove(self, x):
+        if self.count <= 1:
+            self.count = 0
+            self.mean = 0.0
+            self._m2 = 0.0
+            return
+        self.count -= 1
+        d = x - self.mean
+        self.mean -= d / self.count
+        self._m2 = max(0.0, self._m2 - d * (x - self.mean))
+
+    @property
+    def variance(self):
+        return self._m2 / self.count if self.count else 0.0
+
+
+class WindowedSum:
+    """
+    Per-field sums of fixed-width tuples over the last `size` pushes.
+    The window is also kept split into an older half and a newer half
+    (newer gets the extra sample on odd counts) so half-vs-half trends
+    are O(1) as well.
+    """
+    def __init__(self, size, width=1):
+        self.size = size
+        self.width = width
+        self._older = deque()
+        self._newer = deque()
+        self._older_sums = [0.0] * width
+        self._newer_sums = [0.0] * width
+
+    def __len__(self):
+        return len(self._older) + len(self._newer)
+
+    @staticmethod
+    def _add(sums, values, sign):
+        for i, v in enumerate(values):
+            sums[i] += sign * v
+
+    def push(self, values):
+        self._newer.append(values)
+        self._add(self._newer_sums, values, 1)
+
+        if len(self) > self.size:
+            if self._older:
+                self._add(self._older_sums, self._older.popleft(), -1)
+            else:
+                self._add(self._newer_sums, self._newer.popleft(), -1)
+
+        n = len(self)
+        while len(self._newer) > n - n // 2:
+            moved = self._newer.popleft()
+            self._add(self._newer_sums, moved, -1)
+            self._older.append(moved)
+            self._add(self._older_sums, moved, 1)
+
+    def sums(self):
+        return [a + b for a, b in zip(self._older_sums, self._newer_sums)]
+
+    def means(self):
+        n = len(self)
+        return [s / n for s in self.sums()] if n else [0.0] * self.width
+
+    def half_means(self):
+        """(older half means, newer half means); None for an empty half."""
+        older = [s / len(self._older) for s in self._older_sums] if self._older else None
+        newer = [s / len(self._newer) for s in self._newer_sums] if self._newer else None
+        return older, newer
+
+
 # ============================================================
 # AUTOLOADER
 # ============================================================
@@ -147,48 +289,152 @@ class MemoryEngine:
     """
     Stores:
       - endpoints, frequencies, hours, last-seen
-      - connection list
+      - a bounded ring of recent connections
       - a rolling sequence window of endpoints for sequence anomaly detection
+
+    Endpoints are interned to small integer IDs; the ring, the sequence
+    window and the transition table work on IDs, and hours are kept as a
+    24-bit mask. Connections arrive per poll through record_connections(),
+    which counts a socket once for as long as it stays open (dedup by
+    laddr, raddr, pid). The whole model is persisted in a compact binary
+    file next to persist_file (see MEMORY_MAGIC).
+
+    record_connection(s) also emits change events into change_queue so the
+    ThreatDetector only looks at what moved since its last tick. Each event
+    is a tuple (kind, key, freq, timestamp, extra):
+      - ("new_endpoint", endpoint, 1, ts, None)
+      - ("rare_endpoint", endpoint, 2, ts, None)      second sighting
+      - ("new_hour", endpoint, freq, ts, (hour, previous_hours))
+      - ("new_transition", (a, b), 1, ts, (freq_a, freq_b))
     """
+    _ENDPOINT_REC = struct.Struct("<IId")    # freq, hours mask, last-seen epoch
+    _TRANSITION_REC = struct.Struct("<III")  # from id, to id, count
+    _HEADER = struct.Struct("<IIIQ")         # endpoints, transitions, sites, connection total
+
     def __init__(self, persist_file="borgnet_memory.json"):
         self.persist_file = persist_file
+        self.model_file = os.path.splitext(persist_file)[0] + ".bnm"
         self.visited_sites = set()
-        self.connection_patterns = []  # (laddr, raddr, family, type)
-        self.system_history = []
+        # (endpoint_id, local_port, pid, family, type, epoch)
+        self.connection_patterns = deque(maxlen=CONNECTION_RING_SIZE)
+        self.connection_total = 0
+        self.system_history = deque(maxlen=SYSTEM_HISTORY_MAX)
 
-        self.endpoint_frequency = defaultdict(int)
-        self.endpoint_last_seen = {}
-        self.endpoint_hours = defaultdict(set)
+        # Interned endpoints: "ip:port" <-> id
+        self.endpoint_ids = {}
+        self.endpoint_names = []
+
+        self.endpoint_frequency = defaultdict(int)   # name -> count
+        self.endpoint_last_seen = {}                 # name -> epoch seconds
+        self.endpoint_hours = defaultdict(int)       # name -> 24-bit hour mask
 
         # For simple sequence-based anomaly detection
         self.sequence_window = deque(maxlen=SEQUENCE_WINDOW)
-        self.transition_counts = defaultdict(int)  # (from, to) -> count
+        self.transition_counts = defaultdict(int)  # (from_id, to_id) -> count
+
+        # Sockets present in the previous poll: (laddr, raddr, pid)
+        self._live_sockets = set()
+
+        # Change events for incremental consumers (ThreatDetector)
+        self.change_queue = queue.Queue(maxsize=CHANGE_QUEUE_MAX)
+        self.changes_dropped = 0
 
         self._lock = threading.Lock()
         self._load()
 
+    def _intern(self, name):
+        eid = self.endpoint_ids.get(name)
+        if eid is None:
+            eid = len(self.endpoint_names)
+            self.endpoint_ids[name] = eid
+            self.endpoint_names.append(name)
+        return eid
+
+    @staticmethod
+    def _hours_list(mask):
+        return [h for h in range(24) if mask >> h & 1]
+
     def record_site(self, site):
         with self._lock:
             self.visited_sites.add(site)
 
-    def record_connection(self, conn_tuple):
-        _, raddr, _, _ = conn_tuple
-        endpoint_key = f"{raddr.ip}:{raddr.port}"
+    def record_connection(self, conn_tuple, pid=None):
+        """Record a single sighting; no socket dedup."""
+        events = []
+        now = datetime.datetime.now()
+        with self._lock:
+            self._record_locked(conn_tuple, pid, now, events)
+        for event in events:
+            self._emit(event)
+
+    def record_connections(self, batch):
+        """
+        Record one poll worth of (conn_tuple, pid) pairs. A socket that was
+        already present in the previous poll is not counted again.
+        """
+        events = []
         now = datetime.datetime.now()
-        hour = now.hour
-
         with self._lock:
-            self.connection_patterns.append(conn_tuple)
-            self.endpoint_frequency[endpoint_key] += 1
-            self.endpoint_last_seen[endpoint_key] = now.isoformat()
-            self.endpoint_hours[endpoint_key].add(hour)
-
-            # sequence history (simple endpoint sequence)
-            self.sequence_window.append(endpoint_key)
-            if len(self.sequence_window) >= 2:
-                prev = self.sequence_window[-2]
-                cur = self.sequence_window[-1]
-                self.transition_counts[(prev, cur)] += 1
+            live = set()
+            for conn_tuple, pid in batch:
+                key = (conn_tuple[0], conn_tuple[1], pid)
+                live.add(key)
+                if key in self._live_sockets:
+                    continue
+                self._record_locked(conn_tuple, pid, now, events)
+            self._live_sockets = live
+        for event in events:
+            self._emit(event)
+
+    def _record_locked(self, conn_tuple, pid, now, events):
+        laddr, raddr, family, sock_type = conn_tuple
+        endpoint_key = f"{raddr.ip}:{raddr.port}"
+        eid = self._intern(endpoint_key)
+        endpoint_key = self.endpoint_names[eid]
+        hour_bit = 1 << now.hour
+        now_epoch = now.timestamp()
+        now_ts = None
+
+        self.connection_patterns.append(
+            (eid, laddr.port, pid or 0, int(family), int(sock_type), now_epoch)
+        )
+        self.connection_total += 1
+        freq = self.endpoint_frequency[endpoint_key] + 1
+        self.endpoint_frequency[endpoint_key] = freq
+        self.endpoint_last_seen[endpoint_key] = now_epoch
+
+        mask = self.endpoint_hours[endpoint_key]
+        if not mask & hour_bit:
+            if mask:
+                now_ts = now.isoformat()
+                events.append(("new_hour", endpoint_key, freq, now_ts,
+                               (now.hour, self._hours_list(mask))))
+            self.endpoint_hours[endpoint_key] = mask | hour_bit
+
+        if freq <= 2:
+            now_ts = now_ts or now.isoformat()
+            kind = "new_endpoint" if freq == 1 else "rare_endpoint"
+            events.append((kind, endpoint_key, freq, now_ts, None))
+
+        # sequence history (simple endpoint sequence)
+        self.sequence_window.append(eid)
+        if len(self.sequence_window) >= 2:
+            prev = self.sequence_window[-2]
+            count = self.transition_counts[(prev, eid)] + 1
+            self.transition_counts[(prev, eid)] = count
+            if count == 1:
+                prev_key = self.endpoint_names[prev]
+                events.append((
+                    "new_transition", (prev_key, endpoint_key), count,
+                    now_ts or now.isoformat(),
+                    (self.endpoint_frequency.get(prev_key, 0), freq)
+                ))
+
+    def _emit(self, event):
+        try:
+            self.change_queue.put_nowait(event)
+        except queue.Full:
+            self.changes_dropped += 1
 
     def record_system_state(self, state):
         with self._lock:
@@ -196,43 +442,154 @@ class MemoryEngine:
 
     def snapshot(self):
         with self._lock:
+            names = self.endpoint_names
             return {
                 "visited_sites": list(self.visited_sites),
-                "connection_count": len(self.connection_patterns),
+                "connection_count": self.connection_total,
                 "endpoint_frequency": dict(self.endpoint_frequency),
                 "system_history_len": len(self.system_history),
-                "endpoint_last_seen": dict(self.endpoint_last_seen),
+                "endpoint_last_seen": {
+                    ep: datetime.datetime.fromtimestamp(ts).isoformat()
+                    for ep, ts in self.endpoint_last_seen.items()
+                },
                 "endpoint_hours": {
-                    ep: list(hours) for ep, hours in self.endpoint_hours.items()
+                    ep: self._hours_list(mask)
+                    for ep, mask in self.endpoint_hours.items()
                 },
                 "transition_counts": {
-                    f"{a}|{b}": c for (a, b), c in self.transition_counts.items()
+                    f"{names[a]}|{names[b]}": c
+                    for (a, b), c in self.transition_counts.items()
                 }
             }
 
+    def summary(self):
+        """Counts only; cheap enough for periodic status reporting."""
+        with self._lock:
+            return {
+                "visited_sites": len(self.visited_sites),
+                "connection_count": self.connection_total,
+                "known_endpoints": len(self.endpoint_frequency),
+                "system_history_len": len(self.system_history),
+            }
+
+    # ---------------- persistence ---------------- #
+    #
+    # MEMORY_MAGIC, crc32(body), zlib(body) where body is:
+    #   header   <IIIQ  endpoints, transitions, sites, connection total
+    #   <I + names      endpoint names joined by "\n", in id order
+    #   endpoints       <IId per endpoint (freq, hours mask, last seen)
+    #   transitions     <III per transition (from id, to id, count)
+    #   <I + sites      visited sites joined by "\n"
+
+    def _encode_model(self):
+        names = self.endpoint_names
+        names_blob = "\n".join(names).encode("utf-8")
+        sites_blob = "\n".join(sorted(self.visited_sites)).encode("utf-8")
+        rec = self._ENDPOINT_REC
+        parts = [
+            self._HEADER.pack(len(names), len(self.transition_counts),
+                              len(self.visited_sites), self.connection_total),
+            struct.pack("<I", len(names_blob)), names_blob,
+        ]
+        parts.extend(
+            rec.pack(self.endpoint_frequency.get(name, 0),
+                     self.endpoint_hours.get(name, 0),
+                     self.endpoint_last_seen.get(name, 0.0))
+            for name in names
+        )
+        trec = self._TRANSITION_REC
+        parts.extend(trec.pack(a, b, c) for (a, b), c in self.transition_counts.items())
+        parts.append(struct.pack("<I", len(sites_blob)))
+        parts.append(sites_blob)
+        body = b"".join(parts)
+        return MEMORY_MAGIC + struct.pack("<I", zlib.crc32(body)) + zlib.compress(body, 6)
+
+    def _decode_model(self, blob):
+        """Parse the whole blob into locals; the model is only touched once it all validates."""
+        if blob[:4] != MEMORY_MAGIC:
+            raise ValueError("bad magic")
+        (crc,) = struct.unpack_from("<I", blob, 4)
+        body = zlib.decompress(blob[8:])
+        if zlib.crc32(body) != crc:
+            raise ValueError("checksum mismatch")
+
+        n_ep, n_tr, n_sites, conn_total = self._HEADER.unpack_from(body, 0)
+        off = self._HEADER.size
+        (nlen,) = struct.unpack_from("<I", body, off)
+        off += 4
+        names = body[off:off + nlen].decode("utf-8").split("\n") if n_ep else []
+        off += nlen
+        if len(names) != n_ep:
+            raise ValueError("endpoint table size mismatch")
+
+        rec = self._ENDPOINT_REC
+        ep_bytes = body[off:off + rec.size * n_ep]
+        if len(ep_bytes) != rec.size * n_ep:
+            raise ValueError("truncated endpoint records")
+        frequency = defaultdict(int)
+        hours = defaultdict(int)
+        last_seen = {}
+        for name, (freq, mask, last) in zip(names, rec.iter_unpack(ep_bytes)):
+            if freq:
+                frequency[name] = freq
+            if mask:
+                hours[name] = mask
+            if last:
+                last_seen[name] = last
+        off += len(ep_bytes)
+
+        trec = self._TRANSITION_REC
+        tr_bytes = body[off:off + trec.size * n_tr]
+        if len(tr_bytes) != trec.size * n_tr:
+            raise ValueError("truncated transition records")
+        transitions = defaultdict(int)
+        for a, b, c in trec.iter_unpack(tr_bytes):
+            if a >= n_ep or b >= n_ep:
+                raise ValueError("transition references unknown endpoint")
+            transitions[(a, b)] = c
+        off += len(tr_bytes)
+
+        (slen,) = struct.unpack_from("<I", body, off)
+        off += 4
+        sites = set(body[off:off + slen].decode("utf-8").split("\n")) if n_sites else set()
+
+        self.endpoint_names = names
+        self.endpoint_ids = {name: i for i, name in enumerate(names)}
+        self.endpoint_frequency = frequency
+        self.endpoint_hours = hours
+        self.endpoint_last_seen = last_seen
+        self.transition_counts = transitions
+        self.visited_sites = sites
+        self.connection_total = conn_total
+
     def _load(self):
+        if os.path.exists(self.model_file):
+            try:
+                with open(self.model_file, "rb") as f:
+                    self._decode_model(f.read())
+                print("[MemoryEngine] Loaded persisted memory model.")
+                return
+            except Exception as e:
+                print(f"[MemoryEngine] Failed to load memory model: {e}")
+
         if not os.path.exists(self.persist_file):
             return
         try:
             with open(self.persist_file, "r", encoding="utf-8") as f:
                 data = json.load(f)
             self.visited_sites = set(data.get("visited_sites", []))
-            self.endpoint_frequency = defaultdict(
-                int, data.get("endpoint_frequency", {})
-            )
+            for ep, freq in data.get("endpoint_frequency", {}).items():
+                self._intern(ep)
+                self.endpoint_frequency[ep] = freq
             print("[MemoryEngine] Loaded persisted memory.")
         except Exception as e:
             print(f"[MemoryEngine] Failed to load memory: {e}")
 
     def save(self):
         try:
-            snap = self.snapshot()
-            data = {
-                "visited_sites": snap["visited_sites"],
-                "endpoint_frequency": snap["endpoint_frequency"],
-            }
-            with open(self.persist_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
+            with self._lock:
+                blob = self._encode_model()
+            write_file_atomic(self.model_file, blob)
             print("[MemoryEngine] Memory persisted.")
         except Exception as e:
             print(f"[MemoryEngine] Failed to save memory: {e}")
@@ -266,8 +623,10 @@ class ThreatDetector(threading.Thread):
         self.rare_count = 0
         self.unusual_time_count = 0
 
-        # For predictive model: per-interval deltas
-        self.delta_history = deque(maxlen=50)  # list of dicts with deltas + timestamp
+        # For predictive model: (new, rare, unusual, sequence) per interval,
+        # aggregated as they arrive
+        self.delta_window = WindowedSum(DELTA_HISTORY_WINDOW, width=4)
+        self.delta_recent = WindowedSum(ANOMALY_RECENT_WINDOW, width=4)
 
         # Sequence anomaly stream
         self.sequence_anomalies = 0
@@ -285,15 +644,11 @@ class ThreatDetector(threading.Thread):
             elif level == "ATTENTION":
                 self.unusual_time_count += 1
 
-    def _check_sequence_anomalies(self, snap):
-        transition_counts = snap.get("transition_counts", {})
-        endpoint_frequency = snap.get("endpoint_frequency", {})
+    def _check_sequence_anomalies(self, transitions):
         anomalies_in_tick = 0
-        for key, count in transition_counts.items():
-            if count == 1:
-                a, b = key.split("|", 1)
-                if endpoint_frequency.get(a, 0) > 3 and endpoint_frequency.get(b, 0) > 3:
-                    anomalies_in_tick += 1
+        for _, _, _, _, (freq_a, freq_b) in transitions:
+            if freq_a > 3 and freq_b > 3:
+                anomalies_in_tick += 1
         if anomalies_in_tick > 0:
             with self.stats_lock:
                 self.sequence_anomalies += anomalies_in_tick
@@ -303,78 +658,84 @@ class ThreatDetector(threading.Thread):
                 })
             self._log_alert("WATCH",
                             f"Sequence anomalies detected: {anomalies_in_tick} new rare transition(s)")
+        return anomalies_in_tick
+
+    def _process_change(self, event, counts, transitions):
+        kind, endpoint, freq, ts, extra = event
+
+        if kind == "new_endpoint":
+            if endpoint in self.known_endpoints:
+                return
+            self.known_endpoints.add(endpoint)
+            counts["new"] += 1
+            self._log_alert(
+                "INFO",
+                f"New endpoint observed (possible rogue): {endpoint} "
+                f"(first seen at {ts})"
+            )
+
+        elif kind == "rare_endpoint":
+            if (
+                endpoint in self.rare_endpoints_flagged
+                or not 1 < freq <= self.rare_threshold
+            ):
+                return
+            self.rare_endpoints_flagged.add(endpoint)
+            counts["rare"] += 1
+            self._log_alert(
+                "WATCH",
+                f"Rare endpoint (possible rogue): {endpoint} "
+                f"(seen {freq} times, last seen at {ts})"
+            )
+
+        elif kind == "new_hour":
+            hour, hours_list = extra
+            if (
+                endpoint in self.unusual_time_flagged
+                or freq < self.min_baseline_for_time
+                or not hours_list
+            ):
+                return
+            self.unusual_time_flagged.add(endpoint)
+            counts["unusual"] += 1
+            self._log_alert(
+                "ATTENTION",
+                f"Endpoint contacted at unusual time (possible rogue): {endpoint} "
+                f"(normal hours: {hours_list}, current hour: {hour})"
+            )
+
+        elif kind == "new_transition":
+            transitions.append(event)
 
     def run(self):
+        changes = self.memory.change_queue
         while self.running:
             try:
-                snap = self.memory.snapshot()
-                freq_map = snap["endpoint_frequency"]
-                hours_map = snap["endpoint_hours"]
-                last_seen_map = snap["endpoint_last_seen"]
-
-                now = datetime.datetime.now()
-                current_hour = now.hour
-
-                interval_new = 0
-                interval_rare = 0
-                interval_unusual = 0
-
-                for endpoint, freq in freq_map.items():
-                    hours_list = hours_map.get(endpoint, [])
-                    last_seen = last_seen_map.get(endpoint, "unknown")
-
-                    if endpoint not in self.known_endpoints and freq == 1:
-                        self.known_endpoints.add(endpoint)
-                        interval_new += 1
-                        self._log_alert(
-                            "INFO",
-                            f"New endpoint observed (possible rogue): {endpoint} "
-                            f"(first seen at {last_seen})"
-                        )
-                        continue
-
-                    if (
-                        endpoint not in self.rare_endpoints_flagged
-                        and 1 < freq <= self.rare_threshold
-                    ):
-                        self.rare_endpoints_flagged.add(endpoint)
-                        interval_rare += 1
-                        self._log_alert(
-                            "WATCH",
-                            f"Rare endpoint (possible rogue): {endpoint} "
-                            f"(seen {freq} times, last seen at {last_seen})"
-                        )
-
-                    if (
-                        endpoint not in self.unusual_time_flagged
-                        and freq >= self.min_baseline_for_time
-                        and len(hours_list) > 0
-                        and current_hour not in hours_list
-                    ):
-                        self.unusual_time_flagged.add(endpoint)
-                        interval_unusual += 1
-                        self._log_alert(
-                            "ATTENTION",
-                            f"Endpoint contacted at unusual time (possible rogue): {endpoint} "
-                            f"(normal hours: {sorted(hours_list)}, current hour: {current_hour})"
-                        )
-
-                self._check_sequence_anomalies(snap)
-
-                now_ts = datetime.datetime.now().isoformat()
-                deltas = {
-                    "time": now_ts,
-                    "new": interval_new,
-                    "rare": interval_rare,
-                    "unusual": interval_unusual,
-                    "sequence": self.sequence_anomaly_history[-1]["count"] if self.sequence_anomaly_history else 0
-                }
+                # Consume change events as they arrive; the tick only bounds
+                # the interval the deltas are reported over.
+                deadline = time.time() + DETECTOR_TICK
+                counts = {"new": 0, "rare": 0, "unusual": 0}
+                transitions = []
+                while self.running:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        event = changes.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    self._process_change(event, counts, transitions)
+
+                sequence_count = self._check_sequence_anomalies(transitions)
+
+                values = (counts["new"], counts["rare"], counts["unusual"], sequence_count)
                 with self.stats_lock:
-                    self.delta_history.append(deltas)
+                    self.delta_window.push(values)
+                    self.delta_recent.push(values)
 
             except Exception as e:
                 self._log_alert("INFO", f"ThreatDetector error: {e}")
-            time.sleep(3)
+                time.sleep(DETECTOR_TICK)
 
     def stop(self):
         self.running = False
@@ -394,9 +755,17 @@ class ThreatDetector(threading.Thread):
         with self.stats_lock:
             return self.unusual_time_count > 0
 
-    def get_delta_history(self):
+    def get_delta_stats(self):
+        """Window aggregates of (new, rare, unusual, sequence); O(1)."""
         with self.stats_lock:
-            return list(self.delta_history)
+            older, newer = self.delta_window.half_means()
+            return {
+                "count": len(self.delta_window),
+                "means": self.delta_window.means(),
+                "recent_means": self.delta_recent.means(),
+                "older_half_means": older,
+                "newer_half_means": newer,
+            }
 
 
 # ============================================================
@@ -415,10 +784,11 @@ class NetworkObserver(threading.Thread):
             try:
                 interval = self.config.settings["background_scan_interval"]
                 conns = psutil.net_connections()
-                for c in conns:
-                    if c.raddr and c.laddr:
-                        conn_tuple = (c.laddr, c.raddr, c.family, c.type)
-                        self.memory.record_connection(conn_tuple)
+                self.memory.record_connections([
+                    ((c.laddr, c.raddr, c.family, c.type), c.pid)
+                    for c in conns
+                    if c.raddr and c.laddr
+                ])
                 time.sleep(interval)
             except Exception as e:
                 print(f"[NetworkObserver] Error: {e}")
@@ -442,8 +812,7 @@ class SimulationEngine(threading.Thread):
     def run(self):
         while self.running:
             try:
-                snap = self.memory.snapshot()
-                conn_count = snap["connection_count"]
+                conn_count = self.memory.summary()["connection_count"]
                 if conn_count > 0:
                     pass
                 time.sleep(5)
@@ -560,6 +929,10 @@ class AdaptiveConfig:
 # SHARED STATE SYNC (DUAL DRIVES + RESYNC + LATENCY)
 # ============================================================
 
+class SharedIOPending(TimeoutError):
+    """The previous I/O on a shared dir is still stuck, so nothing was attempted."""
+
+
 class SharedStateSync(threading.Thread):
     def __init__(self, node, get_primary_dir_func, get_secondary_dir_func, shared_registry):
         super().__init__(daemon=True)
@@ -575,12 +948,28 @@ class SharedStateSync(threading.Thread):
         self._last_secondary_status = DRIVE_STATUS_UNKNOWN
 
         self._lat_lock = threading.Lock()
-        self._primary_latencies = []
-        self._secondary_latencies = []
+        self._primary_latency = RollingStats(DRIVE_TREND_WINDOW)
+        self._secondary_latency = RollingStats(DRIVE_TREND_WINDOW)
+        # cycles skipped because the previous write was still hung
+        self._primary_pending_skips = 0
+        self._secondary_pending_skips = 0
 
         self.shared_registry = shared_registry
         self.registry_lock = shared_registry["_lock"]
 
+        # Shared-drive I/O runs here so a hung mount can't block this thread
+        self.io_timeout = SYNC_IO_TIMEOUT
+        self._io_pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=SYNC_IO_WORKERS, thread_name_prefix="borg-sync-io"
+        )
+        self._pending_io = {}
+
+        # state file path -> (mtime_ns, size, parsed state)
+        self._stat_lock = threading.Lock()
+        self._stat_cache = {}
+        # shared dir -> state body (minus timestamp) we last wrote there
+        self._last_written = {}
+
     def _set_primary_status(self, status):
         with self._status_lock:
             self._last_primary_status = self._primary_status
@@ -597,112 +986,218 @@ class SharedStateSync(threading.Thread):
 
     def _record_latency(self, primary, duration):
         with self._lat_lock:
-            lst = self._primary_latencies if primary else self._secondary_latencies
-            lst.append(duration)
-            if len(lst) > DRIVE_TREND_WINDOW:
-                del lst[0]
+            stats = self._primary_latency if primary else self._secondary_latency
+            stats.push(duration)
+
+    def _record_pending_skip(self, primary):
+        with self._lat_lock:
+            if primary:
+                self._primary_pending_skips += 1
+            else:
+                self._secondary_pending_skips += 1
 
     def get_drive_latency_stats(self):
         with self._lat_lock:
-            def stats(lst):
-                if not lst:
-                    return 0.0, 0.0, 0.0
-                avg = sum(lst) / len(lst)
-                recent = lst[-1]
-                var = sum((x - avg) ** 2 for x in lst) / len(lst)
-                return avg, recent, var
-
-            p_avg, p_recent, p_var = stats(self._primary_latencies)
-            s_avg, s_recent, s_var = stats(self._secondary_latencies)
+            p = self._primary_latency
+            s = self._secondary_latency
             return {
-                "primary_avg": p_avg,
-                "primary_recent": p_recent,
-                "primary_var": p_var,
-                "secondary_avg": s_avg,
-                "secondary_recent": s_recent,
-                "secondary_var": s_var,
+                "primary_avg": p.mean,
+                "primary_recent": p.recent,
+                "primary_var": p.variance,
+                "secondary_avg": s.mean,
+                "secondary_recent": s.recent,
+                "secondary_var": s.variance,
+                "primary_pending_skips": self._primary_pending_skips,
+                "secondary_pending_skips": self._secondary_pending_skips,
             }
 
     def _state_file_path(self, shared_dir, node_name=None):
         safe_name = (node_name or self.node.name).replace(" ", "_")
         return os.path.join(shared_dir, f"{safe_name}_state.json")
 
-    def _write_state_to_dir(self, shared_dir, primary=True):
-        try:
-            if not shared_dir or not os.path.exists(shared_dir):
-                if primary:
-                    self._set_primary_status(DRIVE_STATUS_OFFLINE)
-                else:
-                    self._set_secondary_status(DRIVE_STATUS_OFFLINE)
-                return False
+    @staticmethod
+    def _heartbeat_path(state_path):
+        """Liveness lives in the mtime of a tiny side file, not in the state."""
+        return state_path[:-len("_state.json")] + "_heartbeat"
 
-            start = time.time()
+    def _set_drive_status(self, primary, status):
+        if primary:
+            self._set_primary_status(status)
+        else:
+            self._set_secondary_status(status)
+
+    def _submit_io(self, key, fn, *args):
+        """
+        Run fn in the I/O pool and wait up to io_timeout. If the previous
+        call for key (a shared dir) is still stuck on a hung mount, raise
+        SharedIOPending (a TimeoutError) instead of queueing another one
+        behind it.
+        """
+        prev = self._pending_io.get(key)
+        if prev is not None and not prev.done():
+            raise SharedIOPending(f"previous I/O on {key} still pending")
+        fut = self._io_pool.submit(fn, *args)
+        self._pending_io[key] = fut
+        return fut.result(timeout=self.io_timeout)
+
+    @staticmethod
+    def _write_state_file(shared_dir, fpath, data, known_stat=None):
+        """
+        Worker: touch the heartbeat, and atomically rewrite the state file
+        unless known_stat says it still holds what we last wrote. Returns
+        (stat, rewritten), or None if offline.
+        """
+        if not os.path.isdir(shared_dir):
+            return None
+        heartbeat = SharedStateSync._heartbeat_path(fpath)
+        with open(heartbeat, "ab"):
+            pass
+        os.utime(heartbeat)
+        if known_stat is not None:
+            try:
+                st = os.stat(fpath)
+                if (st.st_mtime_ns, st.st_size) == known_stat:
+                    return st, False
+            except OSError:
+                pass
+        write_file_atomic(fpath, data)
+        st = os.stat(fpath)
+        if st.st_size != len(data):
+            raise IOError(f"size mismatch after write ({st.st_size} != {len(data)})")
+        return st, True
+
+    def _write_state_to_dir(self, shared_dir, primary=True):
+        if not shared_dir:
+            self._set_drive_status(primary, DRIVE_STATUS_OFFLINE)
+            return False
 
-            mem_snap = self.node.memory.snapshot()
-            cfg_snap = self.node.config.snapshot()
+        try:
             state = {
                 "name": self.node.name,
                 "is_queen": self.node.is_queen,
-                "config": cfg_snap,
-                "memory_summary": {
-                    "visited_sites": len(mem_snap["visited_sites"]),
-                    "connection_count": mem_snap["connection_count"],
-                    "known_endpoints": len(mem_snap["endpoint_frequency"]),
-                    "system_history_len": mem_snap["system_history_len"],
-                },
-                "timestamp": datetime.datetime.now().isoformat()
+                "config": self.node.config.snapshot(),
+                "memory_summary": self.node.memory.summary(),
             }
-
+            # Unchanged state is not rewritten: only the heartbeat file is
+            # touched, so the queen's stat cache keeps hitting.
+            body = json.dumps(state, separators=(",", ":"), sort_keys=True)
+            state["timestamp"] = datetime.datetime.now().isoformat()
+            data = json.dumps(state, separators=(",", ":")).encode("utf-8")
             fpath = self._state_file_path(shared_dir, self.node.name)
-            with open(fpath, "w", encoding="utf-8") as f:
-                json.dump(state, f, indent=2)
+            known_stat = None
+            with self._stat_lock:
+                cached = self._stat_cache.get(fpath)
+            if cached and self._last_written.get(shared_dir) == body:
+                known_stat = cached[:2]
 
-            try:
-                with open(fpath, "r", encoding="utf-8") as f:
-                    _ = json.load(f)
-            except Exception:
-                if primary:
-                    self._set_primary_status(DRIVE_STATUS_FAILING)
-                else:
-                    self._set_secondary_status(DRIVE_STATUS_FAILING)
+            start = time.time()
+            result = self._submit_io(
+                shared_dir, self._write_state_file, shared_dir, fpath, data, known_stat
+            )
+            if result is None:
+                self._set_drive_status(primary, DRIVE_STATUS_OFFLINE)
                 return False
+            st, rewritten = result
 
-            duration = time.time() - start
-            self._record_latency(primary, duration)
+            self._record_latency(primary, time.time() - start)
+            self._set_drive_status(primary, DRIVE_STATUS_ONLINE)
 
-            if primary:
-                self._set_primary_status(DRIVE_STATUS_ONLINE)
-            else:
-                self._set_secondary_status(DRIVE_STATUS_ONLINE)
+            if rewritten:
+                self._last_written[shared_dir] = body
+                # Our own file is already known; the queen scan won't re-parse it.
+                with self._stat_lock:
+                    self._stat_cache[fpath] = (st.st_mtime_ns, st.st_size, state)
 
             with self.registry_lock:
                 self.shared_registry["nodes"][self.node.name] = state
 
             return True
 
+        except SharedIOPending as e:
+            # Nothing was attempted, so there is no latency to record.
+            print(f"[SharedStateSync] Write to {shared_dir} skipped: {e}")
+            self._record_pending_skip(primary)
+            self._set_drive_status(primary, DRIVE_STATUS_FAILING)
+            return False
+        except (TimeoutError, concurrent.futures.TimeoutError) as e:
+            print(f"[SharedStateSync] Write to {shared_dir} timed out: {str(e) or f'no reply in {self.io_timeout}s'}")
+            self._record_latency(primary, self.io_timeout)
+            self._set_drive_status(primary, DRIVE_STATUS_FAILING)
+            return False
         except Exception as e:
             print(f"[SharedStateSync] Error writing state: {e}")
-            if primary:
-                self._set_primary_status(DRIVE_STATUS_FAILING)
-            else:
-                self._set_secondary_status(DRIVE_STATUS_FAILING)
+            self._set_drive_status(primary, DRIVE_STATUS_FAILING)
             return False
 
-    def _compare_states_as_queen(self, used_dir):
-        try:
-            if not used_dir or not os.path.exists(used_dir):
-                return
-
-            files = [f for f in os.listdir(used_dir) if f.endswith("_state.json")]
-            states = []
-            for fname in files:
-                fpath = os.path.join(used_dir, fname)
+    def _scan_states(self, shared_dir):
+        """
+        Worker: stat every *_state.json and parse only files whose mtime or
+        size changed since the last scan. A newer heartbeat file only
+        refreshes the state's timestamp. Returns (states, changed).
+        """
+        states = []
+        changed = False
+        seen = set()
+        heartbeats = {}
+        with os.scandir(shared_dir) as it:
+            entries = []
+            for e in it:
+                if e.name.endswith("_state.json"):
+                    entries.append(e)
+                elif e.name.endswith("_heartbeat"):
+                    try:
+                        heartbeats[e.path] = e.stat().st_mtime
+                    except OSError:
+                        pass
+
+        for entry in entries:
+            fpath = entry.path
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            seen.add(fpath)
+
+            with self._stat_lock:
+                cached = self._stat_cache.get(fpath)
+            if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                state = cached[2]
+            else:
                 try:
-                    with open(fpath, "r", encoding="utf-8") as f:
-                        states.append(json.load(f))
+                    with open(fpath, "rb") as f:
+                        state = json.loads(f.read())
                 except Exception:
                     continue
+                with self._stat_lock:
+                    self._stat_cache[fpath] = (st.st_mtime_ns, st.st_size, state)
+                changed = True
+
+            beat = heartbeats.get(self._heartbeat_path(fpath))
+            if beat is not None and beat > st.st_mtime:
+                state["timestamp"] = datetime.datetime.fromtimestamp(beat).isoformat()
+            states.append(state)
+
+        prefix = os.path.join(shared_dir, "")
+        with self._stat_lock:
+            gone = [p for p in self._stat_cache if p.startswith(prefix) and p not in seen]
+            for p in gone:
+                del self._stat_cache[p]
+        return states, changed or bool(gone)
+
+    def _compare_states_as_queen(self, used_dir):
+        try:
+            if not used_dir:
+                return
 
+            states, changed = self._submit_io(used_dir, self._scan_states, used_dir)
+            if not changed:
+                # Only heartbeats moved: refresh last-seen times, nothing to compare.
+                with self.registry_lock:
+                    for s in states:
+                        known = self.shared_registry["nodes"].get(s.get("name"))
+                        if known is not None:
+                            known["timestamp"] = s.get("timestamp")
+                return
             if len(states) < 2:
                 return
 
@@ -718,25 +1213,34 @@ class SharedStateSync(threading.Thread):
                 for s in states:
                     self.shared_registry["nodes"][s["name"]] = s
 
+        except (TimeoutError, concurrent.futures.TimeoutError) as e:
+            print(f"[SharedStateSync] State scan of {used_dir} timed out: {str(e) or f'no reply in {self.io_timeout}s'}")
         except Exception as e:
             print(f"[SharedStateSync] Error comparing states: {e}")
 
+    def _write_states(self, target_dir, states):
+        """Worker: atomically rewrite every given node state into target_dir."""
+        if not os.path.isdir(target_dir):
+            return
+        for s in states:
+            name = s.get("name", "Unknown")
+            fpath = self._state_file_path(target_dir, name)
+            try:
+                data = json.dumps(s, separators=(",", ":")).encode("utf-8")
+                write_file_atomic(fpath, data)
+            except Exception as e:
+                print(f"[SharedStateSync] Error resyncing {name} to {target_dir}: {e}")
+
     def _resync_drive_from_registry(self, target_dir):
-        if not target_dir or not os.path.exists(target_dir):
+        if not target_dir:
             return
 
         try:
             with self.registry_lock:
                 states = list(self.shared_registry["nodes"].values())
-
-            for s in states:
-                name = s.get("name", "Unknown")
-                fpath = self._state_file_path(target_dir, name)
-                try:
-                    with open(fpath, "w", encoding="utf-8") as f:
-                        json.dump(s, f, indent=2)
-                except Exception as e:
-                    print(f"[SharedStateSync] Error resyncing {name} to {target_dir}: {e}")
+            self._submit_io(target_dir, self._write_states, target_dir, states)
+        except (TimeoutError, concurrent.futures.TimeoutError) as e:
+            print(f"[SharedStateSync] Resync of {target_dir} timed out: {str(e) or f'no reply in {self.io_timeout}s'}")
         except Exception as e:
             print(f"[SharedStateSync] Resync error: {e}")
 
@@ -780,22 +1284,164 @@ class SharedStateSync(threading.Thread):
 
     def stop(self):
         self.running = False
+        self._io_pool.shutdown(wait=False, cancel_futures=True)
 
 
 # ============================================================
 # BORG COMM ENGINE (LAN COMMUNICATION)
 # ============================================================
 
+class BorgWireCodec:
+    """
+    Authenticated datagram codec for BorgComm.
+
+    Datagram layout:
+      header  <4sBH8sQI  magic, flags, message count, session id, seq, unix time
+      body    encrypted frames, each <I length + compact JSON message
+              (zlib-compressed as a whole when FLAG_ZLIB is set)
+      tag     HMAC-SHA256(mac_key, header + body) truncated to TAG_LEN
+
+    The body is XORed with a SHAKE-256 keystream keyed by the shared secret
+    and the (session id, seq) nonce; the session id is random per process so
+    nonces never repeat across restarts. Receivers reject packets whose tag
+    does not verify, whose timestamp is outside max_skew, or whose seq was
+    already seen in that session (64-entry sliding window).
+    """
+    MAGIC = b"BRG1"
+    HEADER = struct.Struct("<4sBH8sQI")
+    FRAME_LEN = struct.Struct("<I")
+    TAG_LEN = 16
+    FLAG_ZLIB = 0x01
+    REPLAY_WINDOW = 64
+
+    def __init__(self, key, max_skew=120, compress_min=256):
+        master = hashlib.sha256(key.encode("utf-8")).digest()
+        self.enc_key = hmac.new(master, b"borgcomm-enc", hashlib.sha256).digest()
+        self.mac_key = hmac.new(master, b"borgcomm-mac", hashlib.sha256).digest()
+        self.max_skew = max_skew
+        self.compress_min = compress_min
+
+        self.session_id = os.urandom(8)
+        self._seq = 0
+        self._seq_lock = threading.Lock()
+
+        # session id -> [highest seq, bitmap of seen seqs below it, last seen]
+        self._replay = {}
+        self.rejected = {"malformed": 0, "auth": 0, "stale": 0, "replay": 0}
+
+    def max_body(self, mtu):
+        return mtu - self.HEADER.size - self.TAG_LEN
+
+    def frame(self, msg):
+        raw = json.dumps(msg, separators=(",", ":")).encode("utf-8")
+        return self.FRAME_LEN.pack(len(raw)) + raw
+
+    def _keystream_xor(self, data, session_id, seq):
+        ks = hashlib.shake_256(
+            self.enc_key + session_id + seq.to_bytes(8, "little")
+        ).digest(len(data))
+        n = int.from_bytes(data, "little") ^ int.from_bytes(ks, "little")
+        return n.to_bytes(len(data), "little")
+
+    def seal(self, frames):
+        body = b"".join(frames)
+        flags = 0
+        if len(body) >= self.compress_min:
+            packed = zlib.compress(body, 6)
+            if len(packed) < len(body):
+                body = packed
+                flags |= self.FLAG_ZLIB
+
+        with self._seq_lock:
+            self._seq += 1
+            seq = self._seq
+
+        header = self.HEADER.pack(
+            self.MAGIC, flags, len(frames), self.session_id, seq, int(time.time())
+        )
+        cipher = self._keystream_xor(body, self.session_id, seq)
+        tag = hmac.new(self.mac_key, header + cipher, hashlib.sha256).digest()
+        return header + cipher + tag[:self.TAG_LEN]
+
+    def _accept_seq(self, session_id, seq, now):
+        state = self._replay.get(session_id)
+        if state is None:
+            self._replay[session_id] = [seq, 1, now]
+            if len(self._replay) > 256:
+                cutoff = now - 2 * self.max_skew
+                for sid in [s for s, st in self._replay.items() if st[2] < cutoff]:
+                    del self._replay[sid]
+            return True
+
+        top, bitmap, _ = state
+        if seq > top:
+            shift = seq - top
+            bitmap = ((bitmap << shift) | 1) if shift < self.REPLAY_WINDOW else 1
+            state[0] = seq
+        else:
+            offset = top - seq
+            if offset >= self.REPLAY_WINDOW or bitmap >> offset & 1:
+                return False
+            bitmap |= 1 << offset
+        state[1] = bitmap & ((1 << self.REPLAY_WINDOW) - 1)
+        state[2] = now
+        return True
+
+    def open(self, datagram):
+        """Return the list of messages in datagram, or None if rejected."""
+        hsize = self.HEADER.size
+        if len(datagram) < hsize + self.TAG_LEN:
+            self.rejected["malformed"] += 1
+            return None
+        header = datagram[:hsize]
+        cipher = datagram[hsize:-self.TAG_LEN]
+        tag = datagram[-self.TAG_LEN:]
+
+        magic, flags, count, session_id, seq, ts = self.HEADER.unpack(header)
+        if magic != self.MAGIC:
+            self.rejected["malformed"] += 1
+            return None
+        expected = hmac.new(self.mac_key, header + cipher, hashlib.sha256).digest()
+        if not hmac.compare_digest(expected[:self.TAG_LEN], tag):
+            self.rejected["auth"] += 1
+            return None
+
+        now = time.time()
+        if abs(now - ts) > self.max_skew:
+            self.rejected["stale"] += 1
+            return None
+        if not self._accept_seq(session_id, seq, now):
+            self.rejected["replay"] += 1
+            return None
+
+        body = self._keystream_xor(cipher, session_id, seq)
+        if flags & self.FLAG_ZLIB:
+            body = zlib.decompress(body)
+
+        msgs = []
+        off = 0
+        flen = self.FRAME_LEN
+        for _ in range(count):
+            (n,) = flen.unpack_from(body, off)
+            off += flen.size
+            msgs.append(json.loads(body[off:off + n]))
+            off += n
+        return msgs
+
+
 class BorgCommEngine(threading.Thread):
     """
     Simple LAN comms engine:
-    - UDP unicast with XOR-style "encryption" (demo-level)
+    - UDP unicast, authenticated and encrypted by a pluggable codec
+      (BorgWireCodec by default)
+    - Messages queued with flush=False are batched with the next flush
+      into as few datagrams as fit in borg_mtu
     - Nodes exchange JSON messages:
         - status_update
         - prediction_update
         - alert
     """
-    def __init__(self, node_name, cfg, message_handler):
+    def __init__(self, node_name, cfg, message_handler, codec=None):
         super().__init__(daemon=True)
         self.node_name = node_name
         self.cfg = cfg
@@ -804,7 +1450,10 @@ class BorgCommEngine(threading.Thread):
 
         self.port = int(cfg.get("borg_port", DEFAULT_BORG_PORT))
         self.key = cfg.get("borg_key", DEFAULT_BORG_KEY)
-        self.key_bytes = hashlib.sha256(self.key.encode("utf-8")).digest()
+        self.mtu = int(cfg.get("borg_mtu", DEFAULT_BORG_MTU))
+        self.codec = codec or BorgWireCodec(
+            self.key, max_skew=int(cfg.get("borg_max_skew", 120))
+        )
 
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -814,14 +1463,10 @@ class BorgCommEngine(threading.Thread):
         self._lock = threading.Lock()
         self.last_rx_times = {}
 
-    def _xor_encrypt(self, data: bytes) -> bytes:
-        kb = self.key_bytes
-        return bytes([b ^ kb[i % len(kb)] for i, b in enumerate(data)])
+        self._send_lock = threading.Lock()
+        self._outbox = []
 
-    def _xor_decrypt(self, data: bytes) -> bytes:
-        return self._xor_encrypt(data)
-
-    def send_message(self, msg_type, payload, target="broadcast"):
+    def send_message(self, msg_type, payload, target="broadcast", flush=True):
         msg = {
             "type": msg_type,
             "from": self.node_name,
@@ -830,28 +1475,50 @@ class BorgCommEngine(threading.Thread):
             "payload": payload,
         }
         try:
-            raw = json.dumps(msg).encode("utf-8")
-            enc = self._xor_encrypt(raw)
-            blob = base64.b64encode(enc)
+            frame = self.codec.frame(msg)
+            with self._send_lock:
+                self._outbox.append(frame)
+            if flush:
+                self.flush()
+        except Exception as e:
+            print(f"[BorgCommEngine:{self.node_name}] send_message error: {e}")
 
-            targets = []
-            if target == "broadcast":
-                targets = self.peers
-            else:
-                targets = self.peers
+    def _batch_frames(self, frames):
+        budget = self.codec.max_body(self.mtu)
+        batch = []
+        size = 0
+        for frame in frames:
+            if batch and size + len(frame) > budget:
+                yield batch
+                batch = []
+                size = 0
+            batch.append(frame)
+            size += len(frame)
+        if batch:
+            yield batch
+
+    def flush(self):
+        with self._send_lock:
+            frames = self._outbox
+            self._outbox = []
+        if not frames:
+            return
 
+        # All targets are peers for now; one sealed datagram per batch is
+        # shared by every peer.
+        targets = self.peers
+        for batch in self._batch_frames(frames):
+            blob = self.codec.seal(batch)
             for host in targets:
                 try:
                     self.sock.sendto(blob, (host, self.port))
                 except Exception as e:
                     print(f"[BorgCommEngine:{self.node_name}] send error to {host}: {e}")
-        except Exception as e:
-            print(f"[BorgCommEngine:{self.node_name}] send_message error: {e}")
 
     def run(self):
+        self.sock.settimeout(1.0)
         while self.running:
             try:
-                self.sock.settimeout(1.0)
                 try:
                     data, addr = self.sock.recvfrom(65535)
                 except socket.timeout:
@@ -861,19 +1528,23 @@ class BorgCommEngine(threading.Thread):
                     continue
 
                 try:
-                    enc = base64.b64decode(data)
-                    raw = self._xor_decrypt(enc)
-                    msg = json.loads(raw.decode("utf-8"))
+                    msgs = self.codec.open(data)
                 except Exception:
+                    self.codec.rejected["malformed"] += 1
+                    continue
+                if not msgs:
                     continue
 
-                src = msg.get("from", "?")
-                with self._lock:
-                    self.last_rx_times[src] = datetime.datetime.now().isoformat()
-
-                self.message_handler(msg, addr)
+                now_ts = datetime.datetime.now().isoformat()
+                for msg in msgs:
+                    src = msg.get("from", "?")
+                    with self._lock:
+                        self.last_rx_times[src] = now_ts
+                    self.message_handler(msg, addr)
 
             except Exception as e:
+                if not self.running:
+                    break
                 print(f"[BorgCommEngine:{self.node_name}] recv error: {e}")
                 time.sleep(1)
 
@@ -888,6 +1559,9 @@ class BorgCommEngine(threading.Thread):
         with self._lock:
             return dict(self.last_rx_times)
 
+    def get_codec_stats(self):
+        return dict(self.codec.rejected)
+
 
 # ============================================================
 # PREDICTIVE AI ENGINE (ANOMALY, DRIVE, HIVE-AWARE)
@@ -929,27 +1603,17 @@ class PredictiveAIEngine(threading.Thread):
 
         self._risk_history = deque(maxlen=HEALTH_HISTORY_WINDOW)
         self._self_reflection_history = deque(maxlen=50)
+        # (predicted HIGH, realized intensity) over the last REFLECTION_WINDOW ticks
+        self._reflection_window = WindowedSum(REFLECTION_WINDOW, width=2)
         self._sensitivity_factor = 1.0
 
     def _compute_anomaly_prediction(self):
-        deltas = self.node.threat_detector.get_delta_history()
-        if not deltas:
+        stats = self.node.threat_detector.get_delta_stats()
+        if not stats["count"]:
             return "LOW", "STABLE", "No anomaly activity yet."
 
-        total_new = sum(d["new"] for d in deltas)
-        total_rare = sum(d["rare"] for d in deltas)
-        total_unusual = sum(d["unusual"] for d in deltas)
-        total_seq = sum(d.get("sequence", 0) for d in deltas)
-
-        length = max(1, len(deltas))
-        avg_unusual = total_unusual / length
-        avg_seq = total_seq / length
-
-        recent = deltas[-min(3, length):]
-        recent_new = sum(d["new"] for d in recent) / len(recent)
-        recent_rare = sum(d["rare"] for d in recent) / len(recent)
-        recent_unusual = sum(d["unusual"] for d in recent) / len(recent)
-        recent_seq = sum(d.get("sequence", 0) for d in recent) / len(recent)
+        _, _, avg_unusual, avg_seq = stats["means"]
+        recent_new, recent_rare, recent_unusual, recent_seq = stats["recent_means"]
 
         base_score = (
             recent_new * 5 +
@@ -965,12 +1629,10 @@ class PredictiveAIEngine(threading.Thread):
         else:
             level = "LOW"
 
-        prev_half = deltas[:length // 2]
-        later_half = deltas[length // 2:]
+        prev_half = stats["older_half_means"]
+        later_half = stats["newer_half_means"]
         if prev_half and later_half:
-            prev_intensity = sum(d["new"] + d["rare"] + d["unusual"] + d.get("sequence", 0) for d in prev_half) / len(prev_half)
-            later_intensity = sum(d["new"] + d["rare"] + d["unusual"] + d.get("sequence", 0) for d in later_half) / len(later_half)
-            diff = later_intensity - prev_intensity
+            diff = sum(later_half) - sum(prev_half)
             if diff > 0.5:
                 trend = "RISING"
             elif diff < -0.5:
@@ -1172,12 +1834,8 @@ class PredictiveAIEngine(threading.Thread):
             "realized_intensity": realized_intensity
         })
 
-        recent = list(self._self_reflection_history)[-5:]
-        if not recent:
-            return
-
-        high_preds = sum(1 for r in recent if r["anomaly_level"] == "HIGH")
-        total_realized = sum(r["realized_intensity"] for r in recent)
+        self._reflection_window.push((anomaly_level == "HIGH", realized_intensity))
+        high_preds, total_realized = self._reflection_window.sums()
 
         if high_preds >= 3 and total_realized < 3:
             self._sensitivity_factor = max(0.7, self._sensitivity_factor - 0.05)
@@ -1322,20 +1980,15 @@ class BorgNode:
             print(f"[{self.name}] Borg message handler error: {e}")
 
     def _broadcast_status(self):
-        mem_snap = self.memory.snapshot()
         cfg_snap = self.config.snapshot()
         payload = {
             "name": self.name,
             "is_queen": self.is_queen,
-            "memory_summary": {
-                "visited_sites": len(mem_snap["visited_sites"]),
-                "connection_count": mem_snap["connection_count"],
-                "known_endpoints": len(mem_snap["endpoint_frequency"]),
-                "system_history_len": mem_snap["system_history_len"],
-            },
+            "memory_summary": self.memory.summary(),
             "config": cfg_snap,
         }
-        self.comm_engine.send_message("status_update", payload, target="broadcast")
+        # Batched with the prediction update that follows
+        self.comm_engine.send_message("status_update", payload, target="broadcast", flush=False)
 
     def _broadcast_prediction(self):
         pred = self.predictive_engine.get_summary()
@@ -32,7 +32,7 @@ Major features:
 - Anomaly → action via risk score:
     - WATCH / QUARANTINE / KILL
 - Strategy engine (self-tuning thresholds/intervals via simulation)
-- Persistence (JSON brain file):
+- Persistence (compact brain file + append-only change log):
     - Admin password (salted hash + salt)
     - Paranoia level, strategy, profiles, signatures, trust, cluster labels,
       network backup path, swarm config, online-ML weights
@@ -55,6 +55,7 @@ Major features:
 Usage:
     python hive_guardian_queen.py           # GUI mode
     python hive_guardian_queen.py --service # service mode (no GUI)
+    python hive_guardian_queen.py --swarm-server [host:port]  # local swarm collector
 """
 
 import sys
@@ -67,9 +68,17 @@ import json
 import os
 import hashlib
 import getpass
+import concurrent.futures
+import heapq
+import itertools
+import errno
+import gzip
+import struct
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from dataclasses import dataclass, field
 from typing import Dict, List, Tuple, Optional
-from random import uniform
+import random
 from collections import deque
 
 # -------------- AUTO-LOADER FOR LIBRARIES -------------- #
@@ -79,6 +88,7 @@ REQUIRED_PACKAGES = [
     "matplotlib",
     "networkx",
     "requests",
+    "numpy",
 ]
 
 def ensure_package(pkg_name: str):
@@ -98,8 +108,10 @@ ensure_all_packages()
 import platform
 import psutil
 import networkx as nx
+import numpy as np
 import requests
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.collections import LineCollection
 from matplotlib.figure import Figure
 
 import tkinter as tk
@@ -113,6 +125,9 @@ def get_default_brain_path() -> str:
     os.makedirs(cfg_dir, exist_ok=True)
     return os.path.join(cfg_dir, "hive_guardian_brain.json")
 
+def get_exe_hash_cache_path(brain_path: str) -> str:
+    return os.path.splitext(brain_path)[0] + "_exe_hashes.json"
+
 # -------------- SIMPLE PASSWORD HASHING -------------- #
 
 def hash_password(password: str, salt: str) -> str:
@@ -120,6 +135,607 @@ def hash_password(password: str, salt: str) -> str:
     h.update((salt + password).encode("utf-8"))
     return h.hexdigest()
 
+# -------------- BRAIN STORE -------------- #
+
+def write_file_atomic(path: str, payload: bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class BrainStore:
+    """
+    Brain persistence as a compact base file plus an append-only change log.
+
+    Base:  MAGIC | generation (u32) | zlib(json state)
+    Log:   records of  length (u32) | crc32 (u32) | zlib(json delta)
+
+    A checkpoint diffs the state against what was last persisted and appends
+    only changed keys. Once the log grows past a limit, the full state is
+    compacted into a new base (written to a temp file, then renamed) and the
+    log restarts under the next generation. Log records from an older
+    generation are ignored, so a crash between rename and truncate is safe.
+    A torn trailing record is dropped on load.
+
+    Brain files in the older plain-JSON format are still read, and they are
+    converted on the first checkpoint.
+
+    When a mirror path is set, a background thread ships the same deltas
+    (and fresh bases after compaction) to it.
+    """
+
+    MAGIC = b"HGB1"
+    BASE_HEADER = struct.Struct(">4sI")
+    RECORD_HEADER = struct.Struct(">II")
+    MAP_SECTIONS = (
+        "process_profiles",
+        "trust_profiles",
+        "signature_hashes",
+        "cluster_labels",
+        "cluster_distances",
+        "swarm_state",
+    )
+
+    def __init__(self, path: str, compact_bytes: int = 4 * 1024 * 1024, compact_records: int = 500):
+        self.path = path
+        self.log_path = path + ".log"
+        self.compact_bytes = compact_bytes
+        self.compact_records = compact_records
+        self.lock = threading.Lock()
+        self.state: Optional[dict] = None
+        self.generation = 0
+        self.log_records = 0
+        self.log_bytes = 0
+        self.needs_compaction = True
+
+        self.mirror_path: Optional[str] = None
+        self.mirror_queue: "queue.Queue[tuple]" = queue.Queue(maxsize=64)
+        self.mirror_needs_base = True
+        self.mirror_thread = threading.Thread(target=self._mirror_loop, daemon=True)
+        self.mirror_thread.start()
+
+    # ---- encoding ---- #
+
+    @staticmethod
+    def _pack(obj) -> bytes:
+        return zlib.compress(json.dumps(obj, separators=(",", ":")).encode("utf-8"), 6)
+
+    def _encode_base(self, state: dict, generation: int) -> bytes:
+        return self.BASE_HEADER.pack(self.MAGIC, generation) + self._pack(state)
+
+    def _encode_record(self, delta: dict) -> bytes:
+        body = self._pack(delta)
+        return self.RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body
+
+    # ---- load ---- #
+
+    def load(self) -> Optional[dict]:
+        """Returns the persisted state (base + replayed log) or None."""
+        if not os.path.isfile(self.path):
+            return None
+        with open(self.path, "rb") as f:
+            raw = f.read()
+
+        if raw.startswith(self.MAGIC):
+            _, generation = self.BASE_HEADER.unpack_from(raw)
+            state = json.loads(zlib.decompress(raw[self.BASE_HEADER.size:]))
+            self.needs_compaction = False
+        else:
+            state = json.loads(raw.decode("utf-8"))
+            generation = 0
+            self.needs_compaction = True
+        for section in self.MAP_SECTIONS:
+            state.setdefault(section, {})
+
+        self.generation = generation
+        self.log_records, self.log_bytes = self._replay_log(state, generation)
+        self.state = state
+        return self._copy_state(state)
+
+    def _replay_log(self, state: dict, generation: int) -> Tuple[int, int]:
+        if not os.path.isfile(self.log_path):
+            return 0, 0
+        with open(self.log_path, "rb") as f:
+            raw = f.read()
+
+        header = self.RECORD_HEADER
+        off = 0
+        applied = 0
+        while off + header.size <= len(raw):
+            length, crc = header.unpack_from(raw, off)
+            body = raw[off + header.size: off + header.size + length]
+            if len(body) < length or zlib.crc32(body) != crc:
+                break
+            delta = json.loads(zlib.decompress(body))
+            if delta.get("gen") == generation:
+                self._apply_delta(state, delta)
+                applied += 1
+            off += header.size + length
+
+        if off < len(raw):
+            print(f"[PERSIST] Dropping {len(raw) - off} bytes of torn brain log.")
+            with open(self.log_path, "r+b") as f:
+                f.truncate(off)
+        return applied, off
+
+    def _apply_delta(self, state: dict, delta: dict):
+        state.update(delta.get("set", {}))
+        for section, changes in delta.get("maps", {}).items():
+            state.setdefault(section, {}).update(changes)
+        for section, keys in delta.get("del", {}).items():
+            target = state.get(section, {})
+            for key in keys:
+                target.pop(key, None)
+
+    def _copy_state(self, state: dict) -> dict:
+        copied = dict(state)
+        for section in self.MAP_SECTIONS:
+            copied[section] = dict(state.get(section, {}))
+        return copied
+
+    # ---- checkpoint ---- #
+
+    def _diff(self, data: dict) -> dict:
+        old = self.state or {}
+        delta: dict = {"gen": self.generation, "set": {}, "maps": {}, "del": {}}
+        for key, value in data.items():
+            if key in self.MAP_SECTIONS:
+                continue
+            if key not in old or old[key] != value:
+                delta["set"][key] = value
+        missing = object()
+        for section in self.MAP_SECTIONS:
+            new_map = data.get(section, {})
+            old_map = old.get(section, {})
+            changed = {k: v for k, v in new_map.items() if old_map.get(k, missing) != v}
+            removed = [k for k in old_map if k not in new_map]
+            if changed:
+                delta["maps"][section] = changed
+            if removed:
+                delta["del"][section] = removed
+        return delta
+
+    def checkpoint(self, data: dict) -> str:
+        """Persist data; returns "compacted", "delta" or "unchanged"."""
+        with self.lock:
+            if (
+                self.needs_compaction
+                or self.state is None
+                or self.log_records >= self.compact_records
+                or self.log_bytes >= self.compact_bytes
+            ):
+                self._compact(data)
+                return "compacted"
+
+            delta = self._diff(data)
+            if not (delta["set"] or delta["maps"] or delta["del"]):
+                return "unchanged"
+
+            record = self._encode_record(delta)
+            with open(self.log_path, "ab") as f:
+                f.write(record)
+                f.flush()
+                os.fsync(f.fileno())
+            self.log_records += 1
+            self.log_bytes += len(record)
+            self._apply_delta(self.state, delta)
+            self._mirror_record(record)
+            return "delta"
+
+    def _compact(self, data: dict):
+        generation = self.generation + 1
+        base = self._encode_base(data, generation)
+        write_file_atomic(self.path, base)
+        # Records left in the log belong to the previous generation and are
+        # skipped on load, so truncating after the rename is crash-safe.
+        with open(self.log_path, "wb"):
+            pass
+        self.generation = generation
+        self.state = self._copy_state(data)
+        self.log_records = 0
+        self.log_bytes = 0
+        self.needs_compaction = False
+        self._mirror_base(base)
+
+    # ---- network mirror ---- #
+
+    def set_mirror(self, path: Optional[str]):
+        with self.lock:
+            if path != self.mirror_path:
+                self.mirror_path = path
+                self.mirror_needs_base = True
+
+    def _mirror_record(self, record: bytes):
+        if not self.mirror_path:
+            return
+        if self.mirror_needs_base:
+            self._mirror_base(self._encode_base(self.state, self.generation))
+            return
+        self._mirror_put(("record", self.mirror_path, record))
+
+    def _mirror_base(self, base: bytes):
+        if not self.mirror_path:
+            return
+        self.mirror_needs_base = False
+        self._mirror_put(("base", self.mirror_path, base))
+
+    def _mirror_put(self, item: tuple):
+        try:
+            self.mirror_queue.put_nowait(item)
+        except queue.Full:
+            # Deltas lost to backpressure are recovered by a full base later.
+            self.mirror_needs_base = True
+
+    def _mirror_loop(self):
+        while True:
+            kind, path, payload = self.mirror_queue.get()
+            if kind == "stop":
+                return
+            try:
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                if kind == "base":
+                    write_file_atomic(path, payload)
+                    with open(path + ".log", "wb"):
+                        pass
+                    print(f"[PERSIST] Brain base mirrored to network: {path}")
+                else:
+                    with open(path + ".log", "ab") as f:
+                        f.write(payload)
+            except Exception as e:
+                print(f"[PERSIST] Failed to mirror brain to network: {e}")
+                with self.lock:
+                    self.mirror_needs_base = True
+
+    def close(self):
+        try:
+            self.mirror_queue.put(("stop", None, None), timeout=5)
+        except queue.Full:
+            return
+        self.mirror_thread.join(timeout=10)
+
+# -------------- EXECUTABLE HASH CACHE -------------- #
+
+class ExecutableHashCache:
+    """
+    SHA-256 content hashes keyed by (path, st_dev, st_ino, st_size, st_mtime_ns).
+
+    A file is re-hashed only when its stat key moves. Hashing runs on a small
+    bounded thread pool; results are delivered through on_hashed(path, sha256).
+    """
+
+    READ_CHUNK = 1024 * 1024
+
+    def __init__(self, path: str, on_hashed, max_workers: int = 2,
+                 max_pending: int = 64, stat_interval: float = 30.0):
+        self.path = path
+        self.on_hashed = on_hashed
+        self.max_pending = max_pending
+        self.stat_interval = stat_interval
+        self.lock = threading.Lock()
+        # exe_path -> {"key": [dev, ino, size, mtime_ns], "sha256": hex}
+        self.entries: Dict[str, dict] = {}
+        self.last_stat: Dict[str, float] = {}
+        self.pending: set = set()
+        self.dirty = False
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="exe-hash"
+        )
+
+    @staticmethod
+    def _stat_key(exe_path: str) -> Optional[List[int]]:
+        try:
+            st = os.stat(exe_path)
+        except OSError:
+            return None
+        return [st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns]
+
+    def get(self, exe_path: str) -> Optional[str]:
+        with self.lock:
+            entry = self.entries.get(exe_path)
+            return entry["sha256"] if entry else None
+
+    def check(self, exe_path: str):
+        """Schedule a hash if exe_path is unknown or its stat key changed."""
+        if not exe_path:
+            return
+        now = time.time()
+        with self.lock:
+            if exe_path in self.pending:
+                return
+            if now - self.last_stat.get(exe_path, 0.0) < self.stat_interval:
+                return
+            self.last_stat[exe_path] = now
+
+        key = self._stat_key(exe_path)
+        if key is None:
+            return
+
+        with self.lock:
+            entry = self.entries.get(exe_path)
+            if entry is not None and entry["key"] == key:
+                return
+            if len(self.pending) >= self.max_pending:
+                # Retry on a later pass instead of queueing without bound.
+                self.last_stat.pop(exe_path, None)
+                return
+            self.pending.add(exe_path)
+        try:
+            self.executor.submit(self._hash_file, exe_path, key)
+        except RuntimeError:
+            with self.lock:
+                self.pending.discard(exe_path)
+
+    def _hash_file(self, exe_path: str, key: List[int]):
+        try:
+            h = hashlib.sha256()
+            buf = bytearray(self.READ_CHUNK)
+            view = memoryview(buf)
+            with open(exe_path, "rb", buffering=0) as f:
+                while True:
+                    n = f.readinto(buf)
+                    if not n:
+                        break
+                    h.update(view[:n])
+            digest = h.hexdigest()
+            # A file rewritten mid-hash gets a fresh key and is retried later.
+            if self._stat_key(exe_path) != key:
+                return
+            with self.lock:
+                self.entries[exe_path] = {"key": key, "sha256": digest}
+                self.dirty = True
+        except OSError:
+            return
+        finally:
+            with self.lock:
+                self.pending.discard(exe_path)
+        try:
+            self.on_hashed(exe_path, digest)
+        except Exception as e:
+            print(f"[SIGNATURE] Hash callback failed for {exe_path}: {e}")
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[PERSIST] Failed to load exe hash cache: {e}")
+            return
+        entries = {}
+        for exe_path, entry in data.get("entries", {}).items():
+            key = entry.get("key")
+            digest = entry.get("sha256")
+            if isinstance(key, list) and len(key) == 4 and digest:
+                entries[exe_path] = {"key": [int(v) for v in key], "sha256": digest}
+        with self.lock:
+            self.entries = entries
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {"entries": dict(self.entries)}
+            self.dirty = False
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            with self.lock:
+                self.dirty = True
+            print(f"[PERSIST] Failed to save exe hash cache: {e}")
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+# -------------- RISK MODEL -------------- #
+
+# Base risk weights over the derived components
+# [behavior, time_anomaly, net_anomaly, recent_file_spikes, global_stress,
+#  signature_anomaly, cluster_anomaly].
+RISK_COMPONENT_WEIGHTS = np.array([1.2, 0.8, 1.0, 0.5, 0.7, 1.2, 1.0])
+
+# A detected signature change stays pending until a node running that
+# executable is scored, or until it is this old (seconds).
+SIGNATURE_CHANGE_TTL = 3600.0
+
+# -------------- BEHAVIOR CLUSTERING -------------- #
+
+class BehaviorClusterer:
+    """
+    k-means over identity feature rows with k-means++ seeding and a
+    convergence check. Between periodic full refits, centers follow the data
+    through mini-batch updates on rows that changed since the last pass.
+    Every full fit is matched back to the previous centers, so a reseed does
+    not renumber clusters whose groups did not change.
+
+    Small populations run in pure Python (numpy call overhead dominates
+    there); larger ones use vectorized numpy.
+    """
+
+    def __init__(self, max_iter: int = 50, tol: float = 1e-4, batch_size: int = 1024,
+                 refit_every: int = 10, python_max: int = 256):
+        self.max_iter = max_iter
+        self.tol = tol
+        self.batch_size = batch_size
+        self.refit_every = refit_every
+        self.python_max = python_max
+        self.centers: Optional[np.ndarray] = None
+        self.center_counts: Optional[np.ndarray] = None
+        self.published_centers = None
+        self.passes_since_refit = 0
+        self.last_rows: Dict[str, np.ndarray] = {}
+        self.rng = np.random.default_rng()
+        self.py_rng = random.Random()
+
+    def update(self, ids: List[str], features: List[List[float]], k: int) -> Tuple[List[int], List[float], str]:
+        """Returns (labels, distances, mode) aligned with ids."""
+        if len(features) <= self.python_max:
+            centers = self._fit_python(features, k)
+            centers = [centers[j] for j in self._match_previous(centers)]
+            self.published_centers = centers
+            labels, dists = self._assign_python(features, centers)
+            self.centers = None
+            self.last_rows = {}
+            return labels, dists, "full-py"
+
+        X = np.asarray(features, dtype=float)
+        need_refit = (
+            self.centers is None
+            or self.centers.shape != (k, X.shape[1])
+            or self.passes_since_refit >= self.refit_every
+        )
+        if need_refit:
+            self._fit(X, k)
+            order = self._match_previous(self.centers)
+            self.centers = self.centers[order]
+            self.center_counts = self.center_counts[order]
+            self.passes_since_refit = 0
+            mode = "full"
+        else:
+            changed = [
+                i for i, identity in enumerate(ids)
+                if not np.array_equal(self.last_rows.get(identity), X[i])
+            ]
+            if changed:
+                if len(changed) > self.batch_size:
+                    changed = self.rng.choice(changed, size=self.batch_size, replace=False)
+                self._partial_fit(X[changed])
+            self.passes_since_refit += 1
+            mode = f"mini-batch({len(changed)})"
+
+        self.last_rows = {identity: X[i] for i, identity in enumerate(ids)}
+        self.published_centers = self.centers
+        labels, d2 = self._assign(X, self.centers)
+        return labels.tolist(), np.sqrt(d2).tolist(), mode
+
+    def _match_previous(self, centers) -> List[int]:
+        """
+        Order of the new centers that keeps each previous cluster's label:
+        greedy nearest-centroid matching, closest pairs first.
+        """
+        prev = self.published_centers
+        k = len(centers)
+        if prev is None or len(prev) != k or len(prev[0]) != len(centers[0]):
+            return list(range(k))
+        pairs = sorted(
+            (self._dist2(p, c), i, j)
+            for i, p in enumerate(prev) for j, c in enumerate(centers)
+        )
+        order: List[Optional[int]] = [None] * k
+        taken = set()
+        for _, i, j in pairs:
+            if order[i] is None and j not in taken:
+                order[i] = j
+                taken.add(j)
+        return order
+
+    # ---- numpy path ---- #
+
+    @staticmethod
+    def _assign(X: np.ndarray, centers: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        d2 = (
+            (X * X).sum(axis=1)[:, None]
+            - 2.0 * (X @ centers.T)
+            + (centers * centers).sum(axis=1)[None, :]
+        )
+        np.maximum(d2, 0.0, out=d2)
+        labels = d2.argmin(axis=1)
+        return labels, d2[np.arange(len(X)), labels]
+
+    def _seed(self, X: np.ndarray, k: int) -> np.ndarray:
+        n = len(X)
+        centers = np.empty((k, X.shape[1]))
+        centers[0] = X[self.rng.integers(n)]
+        d2 = ((X - centers[0]) ** 2).sum(axis=1)
+        for j in range(1, k):
+            total = d2.sum()
+            idx = self.rng.integers(n) if total <= 0 else self.rng.choice(n, p=d2 / total)
+            centers[j] = X[idx]
+            d2 = np.minimum(d2, ((X - centers[j]) ** 2).sum(axis=1))
+        return centers
+
+    def _fit(self, X: np.ndarray, k: int):
+        centers = self._seed(X, k)
+        counts = np.zeros(k)
+        scale = max(float(np.abs(X).max()), 1.0)
+        for _ in range(self.max_iter):
+            labels, _ = self._assign(X, centers)
+            counts = np.bincount(labels, minlength=k).astype(float)
+            sums = np.zeros_like(centers)
+            np.add.at(sums, labels, X)
+            new_centers = centers.copy()
+            nonempty = counts > 0
+            new_centers[nonempty] = sums[nonempty] / counts[nonempty, None]
+            shift = float(np.abs(new_centers - centers).max())
+            centers = new_centers
+            if shift <= self.tol * scale:
+                break
+        self.centers = centers
+        self.center_counts = np.maximum(counts, 1.0)
+
+    def _partial_fit(self, batch: np.ndarray):
+        labels, _ = self._assign(batch, self.centers)
+        for j in np.unique(labels):
+            rows = batch[labels == j]
+            self.center_counts[j] += len(rows)
+            eta = len(rows) / self.center_counts[j]
+            self.centers[j] = (1.0 - eta) * self.centers[j] + eta * rows.mean(axis=0)
+
+    # ---- pure-Python path ---- #
+
+    @staticmethod
+    def _dist2(a, b) -> float:
+        return sum((ax - bx) ** 2 for ax, bx in zip(a, b))
+
+    def _assign_python(self, features, centers) -> Tuple[List[int], List[float]]:
+        labels, dists = [], []
+        for f in features:
+            d = [self._dist2(f, c) for c in centers]
+            j = min(range(len(d)), key=d.__getitem__)
+            labels.append(j)
+            dists.append(d[j] ** 0.5)
+        return labels, dists
+
+    def _fit_python(self, features, k: int):
+        rng = self.py_rng
+        centers = [list(rng.choice(features))]
+        d2 = [self._dist2(f, centers[0]) for f in features]
+        for _ in range(1, k):
+            total = sum(d2)
+            if total <= 0:
+                pick = rng.choice(features)
+            else:
+                pick = rng.choices(features, weights=d2, k=1)[0]
+            centers.append(list(pick))
+            d2 = [min(d, self._dist2(f, pick)) for d, f in zip(d2, features)]
+
+        dim = len(features[0])
+        for _ in range(self.max_iter):
+            labels, _ = self._assign_python(features, centers)
+            sums = [[0.0] * dim for _ in range(k)]
+            counts = [0] * k
+            for f, j in zip(features, labels):
+                counts[j] += 1
+                row = sums[j]
+                for d in range(dim):
+                    row[d] += f[d]
+            shift = 0.0
+            for j in range(k):
+                if counts[j]:
+                    new = [v / counts[j] for v in sums[j]]
+                    shift = max(shift, max(abs(a - b) for a, b in zip(new, centers[j])))
+                    centers[j] = new
+            if shift <= self.tol:
+                break
+        return centers
+
 # -------------- DATA MODELS -------------- #
 
 @dataclass
@@ -143,6 +759,13 @@ class SystemSnapshot:
     timestamp: float
     nodes: Dict[str, NodeInfo]
     edges: List[EdgeInfo]
+    # Delta against the previous snapshot of the same producer. seq=0 means
+    # a standalone full snapshot; the queen rebuilds its graph from `nodes`
+    # whenever the sequence is broken.
+    seq: int = 0
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
 
 @dataclass
 class WorkerStatus:
@@ -151,6 +774,10 @@ class WorkerStatus:
     last_result: str
     active: bool = True
     interval: float = 0.0
+    lag: float = 0.0       # seconds between due time and actual start
+    duration: float = 0.0  # seconds the last step took
+    overruns: int = 0      # steps that took longer than their interval
+    deferrals: int = 0     # runs postponed because the queen was behind
 
 @dataclass
 class ProcessProfile:
@@ -160,12 +787,13 @@ class ProcessProfile:
     count: int = 0
     hour_counts: Dict[int, int] = field(default_factory=lambda: {h: 0 for h in range(24)})
 
-    def update(self, cpu: float, mem: float, timestamp: float):
+    def update(self, cpu: float, mem: float, timestamp: float, hour: Optional[int] = None):
         self.count += 1
         alpha = 0.1
         self.avg_cpu = (1 - alpha) * self.avg_cpu + alpha * cpu
         self.avg_mem = (1 - alpha) * self.avg_mem + alpha * mem
-        hour = time.localtime(timestamp).tm_hour
+        if hour is None:
+            hour = time.localtime(timestamp).tm_hour
         self.hour_counts[hour] = self.hour_counts.get(hour, 0) + 1
 
     def activity_at_hour(self, hour: int) -> int:
@@ -178,6 +806,14 @@ class TrustProfile:
     dynamic_trust: float = 0.5  # 0..1
     good_events: int = 0
     bad_events: int = 0
+    # Mean dynamic_trust reported by swarm peers (None = no peer data).
+    # Kept apart from the local value so repeated merges stay idempotent.
+    swarm_trust: Optional[float] = None
+
+    def effective_dynamic_trust(self) -> float:
+        if self.swarm_trust is None:
+            return self.dynamic_trust
+        return (self.dynamic_trust + self.swarm_trust) / 2.0
 
     def trust_score(self) -> float:
         base_map = {
@@ -188,7 +824,7 @@ class TrustProfile:
             "unknown": 0.3,
         }
         base = base_map.get(self.base_tier, 0.3)
-        return max(0.0, min(1.0, 0.5 * base + 0.5 * self.dynamic_trust))
+        return max(0.0, min(1.0, 0.5 * base + 0.5 * self.effective_dynamic_trust()))
 
     def register_good(self):
         self.good_events += 1
@@ -206,12 +842,6 @@ class Strategy:
     mem_threshold: float
     enforcement_aggressiveness: float
 
-@dataclass
-class StrategyResult:
-    strategy: Strategy
-    score: float
-    notes: str
-
 @dataclass
 class ThreatEvent:
     time: float
@@ -233,19 +863,40 @@ class QueenBrain:
     def __init__(self, brain_path: Optional[str] = None):
         self.lock = threading.Lock()
         self.snapshots: List[SystemSnapshot] = []
+        # Columnar (cpu, mem) arrays per retained snapshot, for strategy what-ifs.
+        self.snapshot_columns: List[Tuple[np.ndarray, np.ndarray]] = []
         self.current_graph = nx.DiGraph()
+        self._graph_seq = 0
+        self._graph_cap = 0
         self.worker_status: Dict[str, WorkerStatus] = {}
         self.event_log: List[str] = []
-        self.telemetry_queue: "queue.Queue[SystemSnapshot]" = queue.Queue()
+        # Bounded: every snapshot carries the full process table, so when
+        # ingestion falls behind only the newest one is worth keeping.
+        self.telemetry_queue: "queue.Queue[SystemSnapshot]" = queue.Queue(maxsize=2)
+        self.snapshots_dropped = 0
         self.running = True
 
         self.brain_path = brain_path or get_default_brain_path()
+        self.brain_store = BrainStore(self.brain_path)
         self.network_backup_path: Optional[str] = None
 
         # Swarm config
         self.swarm_endpoint: Optional[str] = None
         self.swarm_node_id: str = platform.node()
         self.swarm_enabled: bool = False
+        # Delta sync state. Every local change to a trust profile or signature
+        # takes the next value of swarm_version; the collector acks the
+        # version up to which it holds all of our entries, and swarm_seen is
+        # our version vector over the other nodes. The per-key versions are
+        # persisted so a restart does not re-push the full state.
+        self.swarm_version: int = 0
+        self.swarm_acked: int = 0
+        self.swarm_seen: Dict[str, int] = {}
+        # identity -> {origin node -> last-writer-wins entry}
+        self.swarm_state: Dict[str, Dict[str, dict]] = {}
+        self._swarm_trust_versions: Dict[str, Tuple[tuple, int]] = {}
+        self._swarm_sig_versions: Dict[str, Tuple[str, int]] = {}
+        self._swarm_last_action_time: float = 0.0
 
         self.enforce_actions_for_real = False
 
@@ -280,9 +931,20 @@ class QueenBrain:
         self.process_profiles: Dict[str, ProcessProfile] = {}
         self.trust_profiles: Dict[str, TrustProfile] = {}
         self.signature_hashes: Dict[str, str] = {}
+        # Hashing runs off the scoring path: hot executables are checked
+        # against the stat-keyed cache and detected changes are picked up by
+        # the first scoring pass that sees a node running the changed executable.
+        self.signature_changed: Dict[str, float] = {}
+        self.exe_hash_cache = ExecutableHashCache(
+            get_exe_hash_cache_path(self.brain_path), self._on_executable_hashed
+        )
+        self.exe_hash_cache.load()
         self.cluster_labels: Dict[str, int] = {}
         self.cluster_distances: Dict[str, float] = {}
+        self.clusterer = BehaviorClusterer()
 
+        self.strategy_population = 200
+        self.strategy_rng = np.random.default_rng()
         self.current_strategy = Strategy(
             name="default",
             scan_interval_factor=1.0,
@@ -306,7 +968,7 @@ class QueenBrain:
 
         self.process_network_activity: Dict[str, Dict[str, int]] = {}
         self.listening_ports: List[Tuple[str, int]] = []
-        self.file_spike_events: List[Tuple[str, str, int, int]] = []
+        self.file_spike_events: List[Tuple[str, str, int, int, int]] = []
 
         self.admin_salt: Optional[str] = None
         self.admin_password_hash: Optional[str] = None
@@ -341,19 +1003,18 @@ class QueenBrain:
     # -------- Persistence -------- #
 
     def _load_brain(self):
-        if not os.path.isfile(self.brain_path):
-            print(f"[PERSIST] No brain file at {self.brain_path}. Initializing new brain.")
-            self._initialize_admin_credentials()
-            return
-
         try:
-            with open(self.brain_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            data = self.brain_store.load()
         except Exception as e:
             print(f"[PERSIST] Failed to load brain file: {e}")
             self._initialize_admin_credentials()
             return
 
+        if data is None:
+            print(f"[PERSIST] No brain file at {self.brain_path}. Initializing new brain.")
+            self._initialize_admin_credentials()
+            return
+
         self.admin_salt = data.get("admin_salt")
         self.admin_password_hash = data.get("admin_password_hash")
         self.network_backup_path = data.get("network_backup_path")
@@ -407,6 +1068,21 @@ class QueenBrain:
         if len(self.ml_weights) != 9:
             self.ml_weights = [0.0] * 9
 
+        self.swarm_version = int(data.get("swarm_version", 0))
+        self.swarm_acked = int(data.get("swarm_acked", 0))
+        self.swarm_seen = {k: int(v) for k, v in data.get("swarm_seen", {}).items()}
+        self.swarm_state = data.get("swarm_state", {})
+        self._swarm_trust_versions = {
+            identity: (tuple(current), int(version))
+            for identity, (current, version) in data.get("swarm_trust_versions", {}).items()
+        }
+        self._swarm_sig_versions = {
+            exe_path: (hval, int(version))
+            for exe_path, (hval, version) in data.get("swarm_sig_versions", {}).items()
+        }
+        for identity in self.swarm_state:
+            self._refresh_swarm_trust(identity)
+
         print("[PERSIST] Brain data loaded.")
 
     def _initialize_admin_credentials(self):
@@ -458,6 +1134,11 @@ class QueenBrain:
         self.log(f"[ADMIN] Network backup path updated to: {self.network_backup_path}")
 
     def set_swarm_endpoint(self, endpoint: Optional[str]):
+        if (endpoint or None) != self.swarm_endpoint:
+            # A different collector knows nothing about us yet.
+            with self.lock:
+                self.swarm_acked = 0
+                self.swarm_seen = {}
         self.swarm_endpoint = endpoint or None
         self.swarm_enabled = bool(self.swarm_endpoint)
         self._save_brain()
@@ -474,11 +1155,26 @@ class QueenBrain:
             "admin_password_hash": self.admin_password_hash,
             "network_backup_path": self.network_backup_path,
             "swarm_endpoint": self.swarm_endpoint,
+            "swarm_version": self.swarm_version,
+            "swarm_acked": self.swarm_acked,
+            "swarm_seen": dict(self.swarm_seen),
+            "swarm_trust_versions": {
+                identity: [list(current), version]
+                for identity, (current, version) in self._swarm_trust_versions.items()
+            },
+            "swarm_sig_versions": {
+                exe_path: [hval, version]
+                for exe_path, (hval, version) in self._swarm_sig_versions.items()
+            },
+            "swarm_state": {
+                identity: {node: dict(entry) for node, entry in peers.items()}
+                for identity, peers in self.swarm_state.items()
+            },
             "paranoia_level": self.paranoia_level,
             "security_weight": self.security_weight,
             "ops_weight": self.ops_weight,
             "ml_enabled": self.ml_enabled,
-            "ml_weights": self.ml_weights,
+            "ml_weights": list(self.ml_weights),
             "strategy": {
                 "name": self.current_strategy.name,
                 "scan_interval_factor": self.current_strategy.scan_interval_factor,
@@ -488,9 +1184,9 @@ class QueenBrain:
             },
             "process_profiles": {},
             "trust_profiles": {},
-            "signature_hashes": self.signature_hashes,
-            "cluster_labels": self.cluster_labels,
-            "cluster_distances": self.cluster_distances,
+            "signature_hashes": dict(self.signature_hashes),
+            "cluster_labels": dict(self.cluster_labels),
+            "cluster_distances": dict(self.cluster_distances),
         }
         for name, p in self.process_profiles.items():
             data["process_profiles"][name] = {
@@ -509,23 +1205,18 @@ class QueenBrain:
         return data
 
     def _save_brain(self):
-        data = self._brain_to_dict()
+        with self.lock:
+            data = self._brain_to_dict()
+        self.exe_hash_cache.save()
+        # Network mirroring of the same deltas happens on the store's thread.
+        self.brain_store.set_mirror(self.network_backup_path)
         try:
-            with open(self.brain_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
-            print(f"[PERSIST] Brain saved to {self.brain_path}")
+            mode = self.brain_store.checkpoint(data)
+            if mode != "unchanged":
+                print(f"[PERSIST] Brain saved to {self.brain_path} ({mode})")
         except Exception as e:
             print(f"[PERSIST] Failed to save brain: {e}")
 
-        if self.network_backup_path:
-            try:
-                os.makedirs(os.path.dirname(self.network_backup_path), exist_ok=True)
-                with open(self.network_backup_path, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=2)
-                print(f"[PERSIST] Brain mirrored to network: {self.network_backup_path}")
-            except Exception as e:
-                print(f"[PERSIST] Failed to save network backup: {e}")
-
     def _persistence_loop(self):
         while self.running:
             time.sleep(60)
@@ -553,12 +1244,22 @@ class QueenBrain:
             self.listening_ports = listening_ports
 
     def update_file_signals(self, events: List[tuple]):
+        """events: (root, created, deleted[, renamed]) counters for one window."""
+        ts = time.strftime("%H:%M:%S")
+        lines = []
         with self.lock:
-            ts = time.strftime("%H:%M:%S")
-            for (root, created, deleted) in events:
-                self.file_spike_events.append((ts, root, created, deleted))
-                self.log(f"[FILE-SEC] Spike in {root}: created={created}, deleted={deleted}")
+            for ev in events:
+                root, created, deleted = ev[0], ev[1], ev[2]
+                renamed = ev[3] if len(ev) > 3 else 0
+                self.file_spike_events.append((ts, root, created, deleted, renamed))
+                lines.append(
+                    f"[FILE-SEC] Spike in {root}: created={created}, "
+                    f"deleted={deleted}, renamed={renamed}"
+                )
             self.file_spike_events = self.file_spike_events[-50:]
+        # log() takes self.lock itself.
+        for line in lines:
+            self.log(line)
 
     # -------- Audits -------- #
 
@@ -634,10 +1335,34 @@ class QueenBrain:
                 if interval is not None:
                     self.worker_status[name].interval = interval
 
+    def update_worker_timing(self, name: str, lag: float, duration: float,
+                             overruns: int, deferrals: int):
+        with self.lock:
+            ws = self.worker_status.get(name)
+            if ws is not None:
+                ws.lag = lag
+                ws.duration = duration
+                ws.overruns = overruns
+                ws.deferrals = deferrals
+
     # -------- Telemetry -------- #
 
     def submit_snapshot(self, snapshot: SystemSnapshot):
-        self.telemetry_queue.put(snapshot)
+        while True:
+            try:
+                self.telemetry_queue.put_nowait(snapshot)
+                return
+            except queue.Full:
+                pass
+            try:
+                self.telemetry_queue.get_nowait()
+                with self.lock:
+                    self.snapshots_dropped += 1
+            except queue.Empty:
+                pass
+
+    def telemetry_backlog(self) -> int:
+        return self.telemetry_queue.qsize()
 
     def update_global_metrics(self, cpu: float, mem: float, disk: float):
         with self.lock:
@@ -674,6 +1399,9 @@ class QueenBrain:
         return tp
 
     def _update_habit_profiles_from_snapshot(self, snapshot: SystemSnapshot):
+        timestamp = snapshot.timestamp
+        hour = time.localtime(timestamp).tm_hour
+        profiles = self.process_profiles
         for node in snapshot.nodes.values():
             name = node.extra.get("name", None)
             if not name:
@@ -683,127 +1411,136 @@ class QueenBrain:
                 else:
                     name = label
 
-            profile = self.process_profiles.get(name)
+            profile = profiles.get(name)
             if profile is None:
                 profile = ProcessProfile(name=name)
-                self.process_profiles[name] = profile
-            profile.update(node.cpu, node.memory, snapshot.timestamp)
-
-    def _maybe_hash_executable(self, exe_path: str) -> Tuple[Optional[str], bool]:
-        if not exe_path or not os.path.isfile(exe_path):
-            return None, False
-
-        known_hash = self.signature_hashes.get(exe_path)
-        do_hash = False
-        if known_hash is None:
-            do_hash = True
-        else:
-            do_hash = (uniform(0, 1) < 0.05)
-
-        if not do_hash:
-            return known_hash, False
+                profiles[name] = profile
+            profile.update(node.cpu, node.memory, timestamp, hour)
 
-        try:
-            h = hashlib.sha256()
-            with open(exe_path, "rb") as f:
-                for chunk in iter(lambda: f.read(8192), b""):
-                    h.update(chunk)
-            new_hash = h.hexdigest()
-        except Exception:
-            return None, False
-
-        changed = (known_hash is not None and new_hash != known_hash)
-        self.signature_hashes[exe_path] = new_hash
-        return new_hash, changed
+    def _on_executable_hashed(self, exe_path: str, new_hash: str):
+        with self.lock:
+            known_hash = self.signature_hashes.get(exe_path)
+            self.signature_hashes[exe_path] = new_hash
+            changed = known_hash is not None and known_hash != new_hash
+            if changed:
+                self.signature_changed[exe_path] = time.time()
+        if changed:
+            self.log(f"[SIGNATURE] Executable changed on disk: {exe_path}")
+
+    def _queue_signature_checks(self, exe_paths):
+        for exe_path in exe_paths:
+            self.exe_hash_cache.check(exe_path)
 
     # -------- Strategy evolution -------- #
 
-    def _simulate_strategy(self, strategy: Strategy) -> StrategyResult:
+    def _evaluate_strategies(self, cpu_thr: np.ndarray, mem_thr: np.ndarray,
+                             scan_factor: np.ndarray) -> Optional[dict]:
+        """
+        Score a population of strategies against the retained snapshots in
+        one broadcast pass. Threshold arrays have one entry per strategy.
+        """
         with self.lock:
-            snapshots = list(self.snapshots)
+            columns = list(self.snapshot_columns)
+            security_weight = self.security_weight
+            ops_weight = self.ops_weight
 
-        if not snapshots:
-            return StrategyResult(strategy, score=0.0, notes="No data yet")
-
-        cpu_thr = strategy.cpu_threshold
-        mem_thr = strategy.mem_threshold
-
-        anomaly_count = 0
-        heavy_anomalies = 0
-        scan_cost = len(snapshots) / max(strategy.scan_interval_factor, 0.1)
-
-        for snap in snapshots:
-            for node in snap.nodes.values():
-                if node.cpu > cpu_thr or node.memory > mem_thr:
-                    anomaly_count += 1
-                    if node.cpu > cpu_thr * 2 or node.memory > mem_thr * 2:
-                        heavy_anomalies += 1
+        if not columns:
+            return None
 
+        cpu = np.concatenate([c for c, _ in columns])
+        mem = np.concatenate([m for _, m in columns])
+        # Nodes under every threshold in the population can never count.
+        keep = (cpu > cpu_thr.min()) | (mem > mem_thr.min())
+        cpu = cpu[keep]
+        mem = mem[keep]
+
+        count = len(cpu_thr)
+        anomalies = np.zeros(count, dtype=np.int64)
+        heavy = np.zeros(count, dtype=np.int64)
+        chunk = 32  # bounds the strategies x nodes boolean matrix
+        for start in range(0, count, chunk):
+            stop = start + chunk
+            c = cpu_thr[start:stop, None]
+            m = mem_thr[start:stop, None]
+            anomalies[start:stop] = ((cpu > c) | (mem > m)).sum(axis=1)
+            heavy[start:stop] = ((cpu > c * 2) | (mem > m * 2)).sum(axis=1)
+
+        scan_cost = len(columns) / np.maximum(scan_factor, 0.1)
         penalty = (
-            self.security_weight * heavy_anomalies * 3.0 +
-            self.security_weight * anomaly_count * 1.0 +
-            self.ops_weight * scan_cost * 0.1
+            security_weight * heavy * 3.0 +
+            security_weight * anomalies * 1.0 +
+            ops_weight * scan_cost * 0.1
         )
-        score = -penalty
-        notes = (
-            f"anomalies={anomaly_count}, heavy={heavy_anomalies}, "
-            f"scan_cost≈{scan_cost:.1f}, score={score:.1f}"
+        return {
+            "score": -penalty,
+            "anomalies": anomalies,
+            "heavy": heavy,
+            "scan_cost": scan_cost,
+        }
+
+    @staticmethod
+    def _strategy_notes(result: dict, i: int) -> str:
+        return (
+            f"anomalies={int(result['anomalies'][i])}, heavy={int(result['heavy'][i])}, "
+            f"scan_cost≈{float(result['scan_cost'][i]):.1f}, score={float(result['score'][i]):.1f}"
         )
-        return StrategyResult(strategy=strategy, score=score, notes=notes)
 
-    def _generate_candidate_strategies(self, n: int = 4) -> List[Strategy]:
+    def _generate_candidate_arrays(self, n: int) -> Dict[str, np.ndarray]:
+        """Row 0 is the current strategy; rows 1..n are random perturbations."""
         base = self.current_strategy
-        candidates: List[Strategy] = []
-
-        for i in range(n):
-            s = Strategy(
-                name=f"auto_{int(time.time())}_{i}",
-                scan_interval_factor=max(0.5, min(2.5, base.scan_interval_factor * uniform(0.7, 1.3))),
-                cpu_threshold=max(40.0, min(95.0, base.cpu_threshold * uniform(0.8, 1.2))),
-                mem_threshold=max(30.0, min(90.0, base.mem_threshold * uniform(0.8, 1.2))),
-                enforcement_aggressiveness=max(
-                    0.0,
-                    min(1.0, base.enforcement_aggressiveness + uniform(-0.1, 0.1))
-                ),
-            )
-            candidates.append(s)
-        return candidates
+        rng = self.strategy_rng
+        cand = {
+            "scan_interval_factor": np.clip(base.scan_interval_factor * rng.uniform(0.7, 1.3, n), 0.5, 2.5),
+            "cpu_threshold": np.clip(base.cpu_threshold * rng.uniform(0.8, 1.2, n), 40.0, 95.0),
+            "mem_threshold": np.clip(base.mem_threshold * rng.uniform(0.8, 1.2, n), 30.0, 90.0),
+            "enforcement_aggressiveness": np.clip(
+                base.enforcement_aggressiveness + rng.uniform(-0.1, 0.1, n), 0.0, 1.0
+            ),
+        }
+        current = {
+            "scan_interval_factor": base.scan_interval_factor,
+            "cpu_threshold": base.cpu_threshold,
+            "mem_threshold": base.mem_threshold,
+            "enforcement_aggressiveness": base.enforcement_aggressiveness,
+        }
+        return {key: np.concatenate(([current[key]], arr)) for key, arr in cand.items()}
 
     def evolve_strategy_if_needed(self):
         with self.lock:
             if len(self.snapshots) < 10:
                 return
 
-        candidates = self._generate_candidate_strategies(n=5)
-        best_result = self._simulate_strategy(self.current_strategy)
-
-        for s in candidates:
-            r = self._simulate_strategy(s)
-            if r.score > best_result.score:
-                best_result = r
+        cand = self._generate_candidate_arrays(self.strategy_population)
+        result = self._evaluate_strategies(
+            cand["cpu_threshold"], cand["mem_threshold"], cand["scan_interval_factor"]
+        )
+        if result is None:
+            return
 
-        if best_result.strategy.name != self.current_strategy.name:
+        # argmax returns the first maximum, so the current strategy wins ties.
+        best = int(np.argmax(result["score"]))
+        notes = self._strategy_notes(result, best)
+
+        if best != 0:
+            strategy = Strategy(
+                name=f"auto_{int(time.time())}_{best}",
+                scan_interval_factor=float(cand["scan_interval_factor"][best]),
+                cpu_threshold=float(cand["cpu_threshold"][best]),
+                mem_threshold=float(cand["mem_threshold"][best]),
+                enforcement_aggressiveness=float(cand["enforcement_aggressiveness"][best]),
+            )
             self.log(
-                f"[STRATEGY] Adopting new strategy {best_result.strategy.name}: "
-                f"{best_result.notes}"
+                f"[STRATEGY] Adopting new strategy {strategy.name}: {notes} "
+                f"(best of {len(result['score'])})"
             )
-            self.current_strategy = best_result.strategy
+            self.current_strategy = strategy
         else:
             self.log(
-                f"[STRATEGY] Keeping current strategy {self.current_strategy.name}: "
-                f"{best_result.notes}"
+                f"[STRATEGY] Keeping current strategy {self.current_strategy.name}: {notes}"
             )
 
     # -------- Online Learning Helpers -------- #
 
-    def _apply_ml_adjustment(self, base_risk: float, features: List[float]) -> float:
-        if not self.ml_enabled:
-            return base_risk
-        if len(features) != len(self.ml_weights):
-            return base_risk
-        adjustment = sum(w * x for w, x in zip(self.ml_weights, features))
-        return max(0.0, min(20.0, base_risk + adjustment))
-
     def _update_ml_weights(self, risk: float, features: List[float], action: str):
         if not self.ml_enabled:
             return
@@ -877,52 +1614,19 @@ class QueenBrain:
             return
 
         k = min(5, max(2, len(features) // 20))
-        centers = [features[i][:] for i in range(k)]
-
-        def dist2(a, b):
-            return sum((ax - bx) ** 2 for ax, bx in zip(a, b))
-
-        for _ in range(5):
-            assignments = [[] for _ in range(k)]
-            for idx, f in enumerate(features):
-                best_j = 0
-                best_d = dist2(f, centers[0])
-                for j in range(1, k):
-                    d = dist2(f, centers[j])
-                    if d < best_d:
-                        best_d = d
-                        best_j = j
-                assignments[best_j].append(idx)
-
-            new_centers = []
-            for j in range(k):
-                if not assignments[j]:
-                    new_centers.append(centers[j])
-                    continue
-                dim = len(features[0])
-                avg = [0.0] * dim
-                for idx in assignments[j]:
-                    for d in range(dim):
-                        avg[d] += features[idx][d]
-                count = len(assignments[j])
-                avg = [v / count for v in avg]
-                new_centers.append(avg)
-            centers = new_centers
-
+        labels, dists, mode = self.clusterer.update(ids, features, k)
+
+        # Build new maps off-lock and swap them in with a single assignment;
+        # identities that were not clustered this pass keep their old values.
+        new_labels = dict(self.cluster_labels)
+        new_distances = dict(self.cluster_distances)
+        new_labels.update(zip(ids, (int(j) for j in labels)))
+        new_distances.update(zip(ids, (float(d) for d in dists)))
         with self.lock:
-            for idx, identity in enumerate(ids):
-                f = features[idx]
-                best_j = 0
-                best_d = dist2(f, centers[0])
-                for j in range(1, k):
-                    d = dist2(f, centers[j])
-                    if d < best_d:
-                        best_d = d
-                        best_j = j
-                self.cluster_labels[identity] = best_j
-                self.cluster_distances[identity] = best_d ** 0.5
-
-        self.log(f"[CLUSTER] Updated clusters for {len(ids)} identities into {k} groups.")
+            self.cluster_labels = new_labels
+            self.cluster_distances = new_distances
+
+        self.log(f"[CLUSTER] Updated clusters for {len(ids)} identities into {k} groups ({mode}).")
 
     # -------- Swarm sync -------- #
 
@@ -935,59 +1639,120 @@ class QueenBrain:
             except Exception as e:
                 self.log(f"[SWARM] Error: {e}")
 
+    def _bump_swarm_versions(self):
+        """Assign a fresh version to every trust profile / signature that changed."""
+        for identity, tp in self.trust_profiles.items():
+            current = (tp.base_tier, round(tp.dynamic_trust, 4), tp.good_events, tp.bad_events)
+            known = self._swarm_trust_versions.get(identity)
+            if known is None or known[0] != current:
+                self.swarm_version += 1
+                self._swarm_trust_versions[identity] = (current, self.swarm_version)
+        for exe_path, hval in self.signature_hashes.items():
+            known = self._swarm_sig_versions.get(exe_path)
+            if known is None or known[0] != hval:
+                self.swarm_version += 1
+                self._swarm_sig_versions[exe_path] = (hval, self.swarm_version)
+
     def _build_swarm_payload(self) -> dict:
+        """Only entries newer than what the collector has acked are sent."""
         with self.lock:
-            trust_summary = {
-                identity: {
-                    "base_tier": tp.base_tier,
-                    "dynamic_trust": tp.dynamic_trust,
-                    "good_events": tp.good_events,
-                    "bad_events": tp.bad_events,
-                }
-                for identity, tp in self.trust_profiles.items()
+            self._bump_swarm_versions()
+            acked = self.swarm_acked
+            trust_delta = {}
+            for identity, (current, version) in self._swarm_trust_versions.items():
+                if version > acked:
+                    base_tier, dynamic_trust, good, bad = current
+                    trust_delta[identity] = {
+                        "base_tier": base_tier,
+                        "dynamic_trust": dynamic_trust,
+                        "good_events": good,
+                        "bad_events": bad,
+                        "v": version,
+                    }
+            sig_delta = {
+                exe_path: {"h": hval, "v": version}
+                for exe_path, (hval, version) in self._swarm_sig_versions.items()
+                if version > acked
+            }
+            actions = [
+                a for a in self.recent_actions[-50:]
+                if a["time"] > self._swarm_last_action_time
+            ]
+            return {
+                "proto": 2,
+                "node_id": self.swarm_node_id,
+                "version": self.swarm_version,
+                "base": acked,
+                "since": dict(self.swarm_seen),
+                "trust": trust_delta,
+                "sigs": sig_delta,
+                "recent_actions": actions,
             }
-            sigs = self.signature_hashes.copy()
-            actions = list(self.recent_actions[-50:])
-        return {
-            "node_id": self.swarm_node_id,
-            "trust_profiles": trust_summary,
-            "signature_hashes": sigs,
-            "recent_actions": actions,
-        }
 
-    def _merge_swarm_state(self, data: dict):
-        remote_trust = data.get("trust_profiles", {})
-        remote_sigs = data.get("signature_hashes", {})
+    def _refresh_swarm_trust(self, identity: str):
+        peers = self.swarm_state.get(identity)
+        tp = self.trust_profiles.get(identity)
+        if not peers:
+            if tp is not None:
+                tp.swarm_trust = None
+            return
+        if tp is None:
+            any_entry = next(iter(peers.values()))
+            tp = TrustProfile(identity=identity, base_tier=any_entry.get("base_tier", "unknown"))
+            self.trust_profiles[identity] = tp
+        tp.swarm_trust = sum(e.get("dynamic_trust", 0.5) for e in peers.values()) / len(peers)
 
+    def _merge_swarm_state(self, data: dict):
+        """
+        Last-writer-wins per (identity, origin node) by version number, so
+        applying the same response twice (or out of order) is a no-op.
+        """
+        merged = 0
         with self.lock:
-            for identity, t in remote_trust.items():
-                local = self.trust_profiles.get(identity)
-                if local is None:
-                    self.trust_profiles[identity] = TrustProfile(
-                        identity=identity,
-                        base_tier=t.get("base_tier", "unknown"),
-                        dynamic_trust=t.get("dynamic_trust", 0.5),
-                        good_events=t.get("good_events", 0),
-                        bad_events=t.get("bad_events", 0),
-                    )
-                else:
-                    local.good_events = max(local.good_events, t.get("good_events", 0))
-                    local.bad_events += t.get("bad_events", 0)
-                    local.dynamic_trust = (local.dynamic_trust + t.get("dynamic_trust", 0.5)) / 2.0
-
-            for exe_path, hval in remote_sigs.items():
-                if exe_path not in self.signature_hashes:
-                    self.signature_hashes[exe_path] = hval
+            ack = data.get("ack")
+            if isinstance(ack, int):
+                # A collector that lost state acks lower; we then resend.
+                self.swarm_acked = ack
 
-        self.log("[SWARM] Merged remote trust/signature data.")
+            for node_id, node_data in data.get("nodes", {}).items():
+                if node_id == self.swarm_node_id:
+                    continue
+                seen = self.swarm_seen.get(node_id, 0)
+                for identity, entry in node_data.get("trust", {}).items():
+                    version = int(entry.get("v", 0))
+                    seen = max(seen, version)
+                    peers = self.swarm_state.setdefault(identity, {})
+                    current = peers.get(node_id)
+                    if current is not None and current.get("v", 0) >= version:
+                        continue
+                    peers[node_id] = entry
+                    self._refresh_swarm_trust(identity)
+                    merged += 1
+                for exe_path, entry in node_data.get("sigs", {}).items():
+                    seen = max(seen, int(entry.get("v", 0)))
+                    if exe_path not in self.signature_hashes and entry.get("h"):
+                        self.signature_hashes[exe_path] = entry["h"]
+                        merged += 1
+                self.swarm_seen[node_id] = seen
+
+        self.log(f"[SWARM] Merged {merged} remote trust/signature updates.")
 
     def _swarm_sync_once(self):
         payload = self._build_swarm_payload()
+        body = encode_swarm_message(payload)
         try:
-            resp = requests.post(self.swarm_endpoint, json=payload, timeout=5)
+            resp = requests.post(
+                self.swarm_endpoint,
+                data=body,
+                headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+                timeout=5,
+            )
             if resp.status_code == 200:
+                # requests transparently gunzips Content-Encoding: gzip replies.
                 data = resp.json()
                 self._merge_swarm_state(data)
+                if payload["recent_actions"]:
+                    self._swarm_last_action_time = payload["recent_actions"][-1]["time"]
             else:
                 self.log(f"[SWARM] Non-200 response: {resp.status_code}")
         except Exception as e:
@@ -995,99 +1760,120 @@ class QueenBrain:
 
     # -------- Risk scoring & threat timeline -------- #
 
-    def _compute_risk_features(self, node: NodeInfo) -> Tuple[List[float], float, float]:
-        name = node.extra.get("name", node.label)
-        profile = self.process_profiles.get(name)
-        cpu = node.cpu
-        mem = node.memory
-
-        identity = self._get_identity_for_node(node)
-        trust_profile = self.trust_profiles.get(identity)
-        trust_score = trust_profile.trust_score() if trust_profile else 0.5
-
-        cpu_ratio = 1.0
-        mem_ratio = 1.0
-        if profile and profile.avg_cpu > 0:
-            cpu_ratio = (cpu + 1.0) / (profile.avg_cpu + 1.0)
-        if profile and profile.avg_mem > 0:
-            mem_ratio = (mem + 1.0) / (profile.avg_mem + 1.0)
-
-        now_hour = time.localtime().tm_hour
-        time_anomaly = 0.0
-        if profile and profile.count > 30:
-            hour_activity = profile.activity_at_hour(now_hour)
-            if hour_activity < (profile.count * 0.02):
-                time_anomaly = 1.0
-
+    def _risk_context(self) -> dict:
+        """Snapshot-wide risk terms, computed once per scoring pass."""
         with self.lock:
-            net_info = self.process_network_activity.get(node.id, {"outgoing": 0, "listening": 0})
-        outgoing = net_info.get("outgoing", 0)
-        listening = net_info.get("listening", 0)
-
-        net_anomaly = 0.0
-        if outgoing > 20:
-            net_anomaly += 1.0
-        if listening > 0:
-            net_anomaly += 1.0
-
-        cpu_trend = self._estimate_trend(self.global_cpu_history)
-        mem_trend = self._estimate_trend(self.global_mem_history)
-        disk_trend = self._estimate_trend(self.global_disk_history)
-
-        global_stress = 0.0
-        if self.last_global_cpu > 80 or cpu_trend > 10:
-            global_stress += 0.5
-        if self.last_global_mem > 70 or mem_trend > 10:
-            global_stress += 0.5
-        if self.last_global_disk > 90 or disk_trend > 10:
-            global_stress += 0.3
-
-        recent_file_spikes = 1.0 if self.file_spike_events else 0.0
-
-        exe_path = node.extra.get("exe") or ""
-        _, sig_changed = self._maybe_hash_executable(exe_path)
-        signature_anomaly = 1.5 if sig_changed else 0.0
-
-        cluster_distance = self.cluster_distances.get(identity, 0.0)
-        cluster_anomaly = min(1.5, cluster_distance / 50.0)
-
-        behavior_component = max(cpu_ratio, mem_ratio) - 1.0
-        behavior_component = max(0.0, behavior_component)
-
-        base = 0.0
-        base += behavior_component * 1.2
-        base += time_anomaly * 0.8
-        base += net_anomaly * 1.0
-        base += recent_file_spikes * 0.5
-        base += global_stress * 0.7
-        base += signature_anomaly * 1.2
-        base += cluster_anomaly * 1.0
-
-        trust_factor = 1.5 - trust_score
-        base *= trust_factor
-
-        base *= (0.5 + self.paranoia_level)
-        base *= (0.5 + self.current_strategy.enforcement_aggressiveness)
+            cpu_trend = self._estimate_trend(self.global_cpu_history)
+            mem_trend = self._estimate_trend(self.global_mem_history)
+            disk_trend = self._estimate_trend(self.global_disk_history)
+
+            global_stress = 0.0
+            if self.last_global_cpu > 80 or cpu_trend > 10:
+                global_stress += 0.5
+            if self.last_global_mem > 70 or mem_trend > 10:
+                global_stress += 0.5
+            if self.last_global_disk > 90 or disk_trend > 10:
+                global_stress += 0.3
+
+            cutoff = time.time() - SIGNATURE_CHANGE_TTL
+            for exe_path in [e for e, ts in self.signature_changed.items() if ts < cutoff]:
+                del self.signature_changed[exe_path]
+            signature_changed = dict(self.signature_changed)
+
+            return {
+                "hour": time.localtime().tm_hour,
+                "global_stress": global_stress,
+                "recent_file_spikes": 1.0 if self.file_spike_events else 0.0,
+                "net_activity": self.process_network_activity,
+                "signature_changed": signature_changed,
+                "paranoia": self.paranoia_level,
+                "aggressiveness": self.current_strategy.enforcement_aggressiveness,
+                "ml_enabled": self.ml_enabled,
+                "ml_weights": np.asarray(self.ml_weights, dtype=float),
+            }
 
-        base = max(0.0, min(base, 20.0))
+    def _compute_risk_batch(self, nodes: List[NodeInfo]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score many nodes at once. Returns (risks, features) where features is
+        the node x 9 matrix in ml_weights order.
+        """
+        n = len(nodes)
+        if n == 0:
+            return np.zeros(0), np.zeros((0, 9))
+
+        ctx = self._risk_context()
+        hour = ctx["hour"]
+        net_activity = ctx["net_activity"]
+        signature_changed = ctx["signature_changed"]
+
+        # Gather raw per-node columns; all arithmetic happens on arrays below.
+        raw = np.zeros((n, 10))
+        for i, node in enumerate(nodes):
+            row = raw[i]
+            row[0] = node.cpu
+            row[1] = node.memory
+            profile = self.process_profiles.get(node.extra.get("name", node.label))
+            if profile is not None:
+                row[2] = profile.avg_cpu
+                row[3] = profile.avg_mem
+                row[4] = profile.count
+                row[5] = profile.activity_at_hour(hour)
+            net_info = net_activity.get(node.id)
+            if net_info:
+                row[6] = net_info.get("outgoing", 0)
+                row[7] = net_info.get("listening", 0)
+            identity = self._get_identity_for_node(node)
+            trust_profile = self.trust_profiles.get(identity)
+            row[8] = trust_profile.trust_score() if trust_profile else 0.5
+            row[9] = self.cluster_distances.get(identity, 0.0)
+
+        cpu, mem = raw[:, 0], raw[:, 1]
+        avg_cpu, avg_mem, count = raw[:, 2], raw[:, 3], raw[:, 4]
+        trust_score = raw[:, 8]
+
+        cpu_ratio = np.where(avg_cpu > 0, (cpu + 1.0) / (avg_cpu + 1.0), 1.0)
+        mem_ratio = np.where(avg_mem > 0, (mem + 1.0) / (avg_mem + 1.0), 1.0)
+        time_anomaly = ((count > 30) & (raw[:, 5] < count * 0.02)).astype(float)
+        net_anomaly = (raw[:, 6] > 20).astype(float) + (raw[:, 7] > 0).astype(float)
+        signature_anomaly = np.array(
+            [1.5 if (node.extra.get("exe") or "") in signature_changed else 0.0 for node in nodes]
+        )
+        cluster_anomaly = np.minimum(1.5, raw[:, 9] / 50.0)
 
-        features = [
+        features = np.column_stack((
             cpu_ratio,
             mem_ratio,
             time_anomaly,
             net_anomaly,
-            recent_file_spikes,
-            global_stress,
+            np.full(n, ctx["recent_file_spikes"]),
+            np.full(n, ctx["global_stress"]),
             signature_anomaly,
             cluster_anomaly,
             trust_score,
-        ]
-        return features, base, trust_score
-
-    def _compute_risk_score(self, node: NodeInfo) -> Tuple[float, List[float]]:
-        features, base_risk, _ = self._compute_risk_features(node)
-        risk = self._apply_ml_adjustment(base_risk, features)
-        return risk, features
+        ))
+
+        behavior = np.maximum(0.0, np.maximum(cpu_ratio, mem_ratio) - 1.0)
+        components = np.column_stack((behavior, features[:, 2:8]))
+        base = components @ RISK_COMPONENT_WEIGHTS
+        base *= (1.5 - trust_score)
+        base *= (0.5 + ctx["paranoia"]) * (0.5 + ctx["aggressiveness"])
+        risks = np.clip(base, 0.0, 20.0)
+
+        ml_weights = ctx["ml_weights"]
+        if ctx["ml_enabled"] and ml_weights.shape == (9,):
+            risks = np.clip(risks + features @ ml_weights, 0.0, 20.0)
+
+        # Only changes that were actually applied to a node are consumed.
+        scored_changed = {node.extra.get("exe") or "" for node in nodes}.intersection(signature_changed)
+        if scored_changed:
+            with self.lock:
+                for exe_path in scored_changed:
+                    if self.signature_changed.get(exe_path) == signature_changed[exe_path]:
+                        del self.signature_changed[exe_path]
+
+        # Hashing happens on the background thread; results feed a later pass.
+        self._queue_signature_checks(node.extra.get("exe") or "" for node in nodes)
+        return risks, features
 
     def _risk_to_action(self, risk: float, name: str, identity: str) -> str:
         is_critical = name in self.critical_process_whitelist
@@ -1178,57 +1964,50 @@ class QueenBrain:
             f"Queen brain started. Total RAM ~ {self.total_mem_gb:.1f} GB. "
             f"Soft cap at {self.mem_cap_fraction*100:.0f}% usage."
         )
-        last_evolve = time.time()
         evolve_interval = 60.0
+        next_evolve = time.time() + evolve_interval
 
         while self.running:
+            timeout = max(0.05, min(1.0, next_evolve - time.time()))
             try:
-                snapshot: SystemSnapshot = self.telemetry_queue.get(timeout=1.0)
-                self._ingest_snapshot(snapshot)
+                snapshot: Optional[SystemSnapshot] = self.telemetry_queue.get(timeout=timeout)
             except queue.Empty:
-                pass
+                snapshot = None
+
+            if snapshot is not None:
+                # Skip straight to the newest snapshot; it supersedes older ones.
+                while True:
+                    try:
+                        snapshot = self.telemetry_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    with self.lock:
+                        self.snapshots_dropped += 1
+                self._ingest_snapshot(snapshot)
 
             now = time.time()
-            if now - last_evolve > evolve_interval:
+            if now >= next_evolve:
                 self.evolve_strategy_if_needed()
-                last_evolve = now
-
-            time.sleep(0.1)
+                next_evolve = now + evolve_interval
 
     def _ingest_snapshot(self, snapshot: SystemSnapshot):
         self._update_habit_profiles_from_snapshot(snapshot)
 
+        n = len(snapshot.nodes)
+        columns = (
+            np.fromiter((node.cpu for node in snapshot.nodes.values()), dtype=np.float32, count=n),
+            np.fromiter((node.memory for node in snapshot.nodes.values()), dtype=np.float32, count=n),
+        )
+
         with self.lock:
             max_snapshots = self.max_snapshots_low_mem if self.low_memory_mode else self.max_snapshots_normal
             self.snapshots.append(snapshot)
+            self.snapshot_columns.append(columns)
             while len(self.snapshots) > max_snapshots:
                 self.snapshots.pop(0)
+                self.snapshot_columns.pop(0)
 
-            graph = nx.DiGraph()
-            nodes_list = list(snapshot.nodes.values())
-
-            if self.low_memory_mode:
-                nodes_list = nodes_list[: min(len(nodes_list), 200)]
-            else:
-                nodes_list = nodes_list[: min(len(nodes_list), 1000)]
-
-            used_ids = set()
-
-            for node in nodes_list:
-                graph.add_node(
-                    node.id,
-                    label=node.label,
-                    type=node.type,
-                    cpu=node.cpu,
-                    memory=node.memory,
-                )
-                used_ids.add(node.id)
-
-            for edge in snapshot.edges:
-                if edge.src in used_ids and edge.dst in used_ids:
-                    graph.add_edge(edge.src, edge.dst, type=edge.type)
-
-            self.current_graph = graph
+            self._apply_snapshot_to_graph(snapshot)
 
         cpu_thr = self.current_strategy.cpu_threshold
         mem_thr = self.current_strategy.mem_threshold
@@ -1239,13 +2018,17 @@ class QueenBrain:
         ]
 
         for node in hot_nodes:
+            identity = self._get_identity_for_node(node)
+            self._get_or_create_trust_profile(identity, node.extra.get("trust", "unknown"))
+
+        risks, feature_matrix = self._compute_risk_batch(hot_nodes)
+
+        for i, node in enumerate(hot_nodes):
             name = node.extra.get("name", node.label)
             identity = self._get_identity_for_node(node)
             exe_path = node.extra.get("exe") or ""
-            base_tier = node.extra.get("trust", "unknown")
-            self._get_or_create_trust_profile(identity, base_tier)
-
-            risk, features = self._compute_risk_score(node)
+            risk = float(risks[i])
+            features = feature_matrix[i].tolist()
             action = self._risk_to_action(risk, name, identity)
 
             signals = {
@@ -1265,6 +2048,84 @@ class QueenBrain:
             if action in ("QUARANTINE", "KILL"):
                 self._attempt_enforcement(node, action)
 
+    def _graph_node_cap(self) -> int:
+        return 200 if self.low_memory_mode else 1000
+
+    def _apply_snapshot_to_graph(self, snapshot: SystemSnapshot):
+        """Patch current_graph in place from a delta snapshot; rebuild on gaps."""
+        cap = self._graph_node_cap()
+        in_sequence = (
+            snapshot.seq > 0
+            and snapshot.seq == self._graph_seq + 1
+            and cap == self._graph_cap
+        )
+        self._graph_seq = snapshot.seq
+        self._graph_cap = cap
+        if not in_sequence:
+            self._rebuild_graph(snapshot, cap)
+            return
+
+        graph = self.current_graph
+        nodes = snapshot.nodes
+
+        for pid in snapshot.removed:
+            if pid in graph:
+                graph.remove_node(pid)
+
+        for pid in snapshot.added:
+            if pid not in graph and graph.number_of_nodes() >= cap:
+                continue
+            node = nodes[pid]
+            graph.add_node(
+                pid,
+                label=node.label,
+                type=node.type,
+                cpu=node.cpu,
+                memory=node.memory,
+            )
+
+        for pid in snapshot.changed:
+            if pid in graph:
+                node = nodes[pid]
+                attrs = graph.nodes[pid]
+                attrs["cpu"] = node.cpu
+                attrs["memory"] = node.memory
+
+        # Re-link parents only for nodes whose identity or ppid may have moved.
+        for pids in (snapshot.added, snapshot.changed):
+            for pid in pids:
+                if pid not in graph:
+                    continue
+                ppid = nodes[pid].extra.get("ppid")
+                for parent in list(graph.predecessors(pid)):
+                    if parent != ppid:
+                        graph.remove_edge(parent, pid)
+                if ppid and ppid in graph and not graph.has_edge(ppid, pid):
+                    graph.add_edge(ppid, pid, type="parent_child")
+
+    def _rebuild_graph(self, snapshot: SystemSnapshot, cap: int):
+        graph = nx.DiGraph()
+        nodes_list = list(snapshot.nodes.values())
+        nodes_list = nodes_list[: min(len(nodes_list), cap)]
+
+        used_ids = set()
+
+        for node in nodes_list:
+            graph.add_node(
+                node.id,
+                label=node.label,
+                type=node.type,
+                cpu=node.cpu,
+                memory=node.memory,
+            )
+            used_ids.add(node.id)
+
+        for edge in snapshot.edges:
+            if edge.src in used_ids and edge.dst in used_ids:
+                graph.add_edge(edge.src, edge.dst, type=edge.type)
+
+        self.current_graph = graph
+
     def _attempt_enforcement(self, node: NodeInfo, action: str):
         pid_str = node.id
         try:
@@ -1352,29 +2213,27 @@ class QueenBrain:
             self._save_brain()
         except Exception as e:
             self.log(f"[PERSIST] Error saving brain on stop: {e}")
+        self.exe_hash_cache.close()
+        self.brain_store.close()
 
 # -------------- WORKERS -------------- #
 
-class BaseWorker(threading.Thread):
+class BaseWorker:
+    # Producers of telemetry snapshots are held back while the queen is behind.
+    produces_snapshots = False
+
     def __init__(self, name: str, queen: QueenBrain, base_interval: float = 5.0):
-        super().__init__(daemon=True)
         self.name = name
         self.queen = queen
         self.base_interval = base_interval
         self.current_interval = base_interval
         self.running = True
+        self.lag = 0.0
+        self.overruns = 0
+        self.deferrals = 0
+        self.deferred_for = 0.0
         self.queen.register_worker(name, base_interval)
 
-    def run(self):
-        self.queen.log(f"Worker {self.name} started.")
-        while self.running:
-            try:
-                self._adapt_interval()
-                self.step()
-            except Exception as e:
-                self.queen.log(f"[ERROR] Worker {self.name}: {e}")
-            time.sleep(self.current_interval)
-
     def _adapt_interval(self):
         cpu, mem, disk, low_mem, low_disk = self.queen.get_global_state()
         strategy = self.queen.current_strategy
@@ -1402,60 +2261,233 @@ class BaseWorker(threading.Thread):
         self.running = False
         self.queen.log(f"Worker {self.name} stopped.")
 
+class WorkerScheduler:
+    """
+    Runs every BaseWorker from one heap-ordered timer thread instead of a
+    thread-and-sleep loop per worker. Due steps are handed to a small thread
+    pool (never more than one run per worker in flight); the next run is
+    scheduled interval +/- jitter after the previous one finishes. A step
+    that takes longer than its interval counts as a deadline overrun.
+    Snapshot producers are deferred while the queen still has unprocessed
+    telemetry, for at most one interval.
+    """
+
+    def __init__(self, queen: QueenBrain, jitter: float = 0.1, max_threads: int = 4,
+                 backpressure_delay: float = 0.5):
+        self.queen = queen
+        self.jitter = jitter
+        self.max_threads = max_threads
+        self.backpressure_delay = backpressure_delay
+        self.workers: List[BaseWorker] = []
+        self.heap: List[Tuple[float, int, BaseWorker]] = []
+        self.counter = itertools.count()
+        self.cond = threading.Condition()
+        self.running = False
+        self.pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self.thread: Optional[threading.Thread] = None
+        self.rng = random.Random()
+
+    def add(self, worker: BaseWorker):
+        self.workers.append(worker)
+        # Stagger first runs so workers do not all fire on the same tick.
+        self._schedule(worker, time.time() + self.rng.uniform(0.0, min(1.0, worker.base_interval)))
+
+    def _schedule(self, worker: BaseWorker, due: float):
+        with self.cond:
+            heapq.heappush(self.heap, (due, next(self.counter), worker))
+            self.cond.notify()
+
+    def start(self):
+        self.running = True
+        self.pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, min(self.max_threads, len(self.workers))),
+            thread_name_prefix="hive-worker",
+        )
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        for worker in self.workers:
+            self.queen.log(f"Worker {worker.name} started.")
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                while self.running and (not self.heap or self.heap[0][0] > time.time()):
+                    timeout = self.heap[0][0] - time.time() if self.heap else None
+                    self.cond.wait(timeout)
+                if not self.running:
+                    return
+                due, _, worker = heapq.heappop(self.heap)
+
+            if not worker.running:
+                continue
+
+            now = time.time()
+            if (
+                worker.produces_snapshots
+                and self.queen.telemetry_backlog() > 0
+                and worker.deferred_for < worker.current_interval
+            ):
+                worker.deferred_for += self.backpressure_delay
+                worker.deferrals += 1
+                self.queen.update_worker_status(worker.name, "Deferred (queen backlog)")
+                self._schedule(worker, now + self.backpressure_delay)
+                continue
+
+            worker.lag = max(0.0, now - due - worker.deferred_for)
+            worker.deferred_for = 0.0
+            self.pool.submit(self._run_worker, worker)
+
+    def _run_worker(self, worker: BaseWorker):
+        start = time.time()
+        try:
+            worker._adapt_interval()
+            worker.step()
+        except Exception as e:
+            self.queen.log(f"[ERROR] Worker {worker.name}: {e}")
+        duration = time.time() - start
+
+        if duration > worker.current_interval:
+            worker.overruns += 1
+            self.queen.log(
+                f"[SCHED] Worker {worker.name} overran its deadline: "
+                f"{duration:.2f}s > {worker.current_interval:.1f}s"
+            )
+        self.queen.update_worker_timing(
+            worker.name, worker.lag, duration, worker.overruns, worker.deferrals
+        )
+
+        if self.running and worker.running:
+            interval = worker.current_interval * self.rng.uniform(1.0 - self.jitter, 1.0 + self.jitter)
+            self._schedule(worker, time.time() + interval)
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        for worker in self.workers:
+            worker.stop()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
+
 class ProcessScannerWorker(BaseWorker):
+    produces_snapshots = True
+
     def __init__(self, queen: QueenBrain, base_interval: float = 5.0):
         super().__init__("ProcessScanner", queen, base_interval)
+        # Persistent pid-keyed process table. NodeInfo objects are replaced,
+        # never mutated, so snapshots already handed to the queen stay intact
+        # while unchanged processes are shared between consecutive snapshots.
+        self.table: Dict[str, NodeInfo] = {}
+        self.create_times: Dict[str, float] = {}
+        self.edges: Dict[str, EdgeInfo] = {}
+        self.change_epsilon = 0.5  # cpu/mem percentage points
+        self.seq = 0
+
+    @staticmethod
+    def _classify_trust(exe_path: str) -> str:
+        exe_low = exe_path.lower()
+        if "windows" in exe_low or "system32" in exe_low or "/usr" in exe_low:
+            return "system"
+        elif "program files" in exe_low or "/opt" in exe_low:
+            return "installed"
+        elif "temp" in exe_low or "download" in exe_low:
+            return "temp"
+        return "user"
+
+    def _new_node(self, proc, pid: str, name: str, ppid: str, cpu: float, mem: float) -> NodeInfo:
+        try:
+            exe_path = proc.exe() or ""
+        except (psutil.Error, OSError):
+            exe_path = ""
+        return NodeInfo(
+            id=pid,
+            label=f"{name} ({pid})",
+            type="process",
+            cpu=cpu,
+            memory=mem,
+            extra={
+                "name": name,
+                "exe": exe_path,
+                "trust": self._classify_trust(exe_path),
+                "ppid": ppid,
+            },
+        )
 
     def step(self):
         timestamp = time.time()
-        nodes: Dict[str, NodeInfo] = {}
-        edges: List[EdgeInfo] = []
-
-        for proc in psutil.process_iter(attrs=["pid", "name", "cpu_percent", "memory_percent", "ppid", "exe"]):
+        table = self.table
+        create_times = self.create_times
+        edges = self.edges
+        eps = self.change_epsilon
+        seen = set()
+        added: List[str] = []
+        changed: List[str] = []
+
+        # exe is resolved only for new processes; everything requested here
+        # comes from the same /proc stat reads psutil does anyway.
+        attrs = ["pid", "name", "create_time", "cpu_percent", "memory_percent", "ppid"]
+        for proc in psutil.process_iter(attrs=attrs):
             info = proc.info
             pid = str(info["pid"])
-            ppid = str(info.get("ppid", 0))
+            seen.add(pid)
+            ppid = str(info.get("ppid") or 0)
             cpu = float(info.get("cpu_percent") or 0.0)
             mem = float(info.get("memory_percent") or 0.0)
-            name = info.get("name", "proc")
-            exe_path = info.get("exe") or ""
-            label = f"{name} ({pid})"
-
-            trust = "unknown"
-            exe_low = exe_path.lower()
-            if "windows" in exe_low or "system32" in exe_low or "/usr" in exe_low:
-                trust = "system"
-            elif "program files" in exe_low or "/opt" in exe_low:
-                trust = "installed"
-            elif "temp" in exe_low or "download" in exe_low:
-                trust = "temp"
-            else:
-                trust = "user"
-
-            nodes[pid] = NodeInfo(
-                id=pid,
-                label=label,
-                type="process",
-                cpu=cpu,
-                memory=mem,
-                extra={"name": name, "exe": exe_path, "trust": trust},
-            )
-
-            if ppid != "0":
-                edges.append(EdgeInfo(
-                    src=ppid,
-                    dst=pid,
-                    type="parent_child",
-                    extra={},
-                ))
-
+            ctime = info.get("create_time") or 0.0
+
+            node = table.get(pid)
+            if node is None or create_times.get(pid) != ctime:
+                # New process or pid reuse: classify trust once per (pid, create_time).
+                table[pid] = self._new_node(proc, pid, info.get("name") or "proc", ppid, cpu, mem)
+                create_times[pid] = ctime
+                added.append(pid)
+            elif (
+                abs(node.cpu - cpu) >= eps
+                or abs(node.memory - mem) >= eps
+                or node.extra.get("ppid") != ppid
+            ):
+                extra = node.extra
+                if extra.get("ppid") != ppid:
+                    extra = dict(extra, ppid=ppid)
+                table[pid] = NodeInfo(
+                    id=pid,
+                    label=node.label,
+                    type=node.type,
+                    cpu=cpu,
+                    memory=mem,
+                    extra=extra,
+                )
+                changed.append(pid)
+
+            edge = edges.get(pid)
+            if ppid == "0":
+                if edge is not None:
+                    del edges[pid]
+            elif edge is None or edge.src != ppid:
+                edges[pid] = EdgeInfo(src=ppid, dst=pid, type="parent_child", extra={})
+
+        removed = [pid for pid in table if pid not in seen]
+        for pid in removed:
+            del table[pid]
+            create_times.pop(pid, None)
+            edges.pop(pid, None)
+
+        self.seq += 1
         snapshot = SystemSnapshot(
             timestamp=timestamp,
-            nodes=nodes,
-            edges=edges,
+            nodes=dict(table),
+            edges=list(edges.values()),
+            seq=self.seq,
+            added=added,
+            removed=removed,
+            changed=changed,
         )
         self.queen.submit_snapshot(snapshot)
-        self.queen.update_worker_status(self.name, f"Scanned {len(nodes)} processes")
+        self.queen.update_worker_status(
+            self.name,
+            f"Scanned {len(table)} processes "
+            f"(+{len(added)} / -{len(removed)} / ~{len(changed)})",
+        )
 
 class SystemMetricsWorker(BaseWorker):
     def __init__(self, queen: QueenBrain, base_interval: float = 3.0):
@@ -1517,20 +2549,275 @@ class NetworkScannerWorker(BaseWorker):
         total_procs = len(proc_conn_counts)
         self.queen.update_worker_status(self.name, f"Scanned net for {total_procs} procs")
 
+class InotifyTreeWatcher:
+    """
+    Recursive ctypes inotify watch (Linux only). poll() drains pending events
+    without blocking and returns create/delete/rename counters since the last
+    call. Raises OSError if inotify is unavailable or the watch limit is hit.
+    """
+
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_DONT_FOLLOW = 0x02000000
+    IN_EXCL_UNLINK = 0x04000000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, root: str):
+        import ctypes, ctypes.util
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify requires Linux")
+        self._ctypes = ctypes
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.mask = (
+            self.IN_CREATE | self.IN_DELETE | self.IN_MOVED_FROM | self.IN_MOVED_TO
+            | self.IN_ONLYDIR | self.IN_DONT_FOLLOW | self.IN_EXCL_UNLINK
+        )
+        self.root = root
+        self.wd_paths: Dict[int, str] = {}
+        try:
+            self._add_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, path: str) -> bool:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), self.mask)
+        if wd < 0:
+            err = self._ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify watch limit reached")
+            return False
+        self.wd_paths[wd] = path
+        return True
+
+    def _add_tree(self, top: str):
+        stack = [top]
+        while stack:
+            path = stack.pop()
+            if not self._add_watch(path):
+                continue
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                        except OSError:
+                            pass
+            except OSError:
+                pass
+
+    def poll(self) -> Dict[str, int]:
+        counts = {"created": 0, "deleted": 0, "renamed": 0, "overflow": 0}
+        moved_from = set()
+        header = self.EVENT_HEADER
+        while True:
+            try:
+                buf = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+            off = 0
+            while off + header.size <= len(buf):
+                wd, mask, cookie, name_len = header.unpack_from(buf, off)
+                name = buf[off + header.size: off + header.size + name_len].rstrip(b"\0")
+                off += header.size + name_len
+
+                if mask & self.IN_Q_OVERFLOW:
+                    counts["overflow"] += 1
+                elif mask & self.IN_IGNORED:
+                    self.wd_paths.pop(wd, None)
+                elif mask & self.IN_CREATE:
+                    counts["created"] += 1
+                    if mask & self.IN_ISDIR and not self._watch_child(wd, name):
+                        counts["overflow"] += 1
+                elif mask & self.IN_DELETE:
+                    counts["deleted"] += 1
+                elif mask & self.IN_MOVED_FROM:
+                    moved_from.add(cookie)
+                elif mask & self.IN_MOVED_TO:
+                    if cookie in moved_from:
+                        moved_from.discard(cookie)
+                        counts["renamed"] += 1
+                    else:
+                        counts["created"] += 1
+                    if mask & self.IN_ISDIR and not self._watch_child(wd, name):
+                        counts["overflow"] += 1
+        # Moves whose destination is outside the tree look like deletes.
+        counts["deleted"] += len(moved_from)
+        return counts
+
+    def _watch_child(self, wd: int, name: bytes) -> bool:
+        """Watch a new subdirectory; False if the watch limit was hit."""
+        parent = self.wd_paths.get(wd)
+        if parent is not None:
+            try:
+                self._add_tree(os.path.join(parent, os.fsdecode(name)))
+            except OSError as e:
+                if e.errno != errno.ENOSPC:
+                    raise
+                return False
+        return True
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+class IncrementalTreeScanner:
+    """
+    Portable fallback: keeps only a per-directory (mtime_ns, entry_count,
+    names_digest) index and re-lists directories whose mtime moved. The
+    digest packs NAME_LANES small XOR-of-name-hash lanes into one int, so a
+    re-list can estimate how many names changed without remembering them.
+    At most stat_budget directories are checked per poll; the sweep resumes
+    where it stopped.
+    """
+
+    NAME_LANES = 32
+    LANE_BITS = 16
+
+    def __init__(self, root: str, stat_budget: int = 20000):
+        self.root = root
+        self.stat_budget = stat_budget
+        self.dirs: Dict[str, Tuple[int, int, int]] = {}
+        self.order: deque = deque()
+        self._index_tree(root)
+
+    def _list_dir(self, path: str) -> Optional[Tuple[Tuple[int, int, int], List[str]]]:
+        lane_mask = (1 << self.LANE_BITS) - 1
+        lanes = [0] * self.NAME_LANES
+        count = 0
+        subdirs: List[str] = []
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            with os.scandir(path) as it:
+                for entry in it:
+                    h = hash(entry.name)
+                    lanes[h % self.NAME_LANES] ^= ((h >> 5) & lane_mask) or 1
+                    count += 1
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                    except OSError:
+                        pass
+        except OSError:
+            return None
+        digest = 0
+        for i, lane in enumerate(lanes):
+            digest |= lane << (i * self.LANE_BITS)
+        return (mtime_ns, count, digest), subdirs
+
+    def _changed_lanes(self, old_digest: int, new_digest: int) -> int:
+        diff = old_digest ^ new_digest
+        lane_mask = (1 << self.LANE_BITS) - 1
+        changed = 0
+        while diff:
+            if diff & lane_mask:
+                changed += 1
+            diff >>= self.LANE_BITS
+        return changed
+
+    def _estimate_name_changes(self, changed_lanes: int, entry_count: int) -> int:
+        """Linear-counting estimate of names added or removed in a directory."""
+        if changed_lanes >= self.NAME_LANES:
+            # Saturated: up to every name went out and came back in.
+            return 2 * entry_count
+        return int(round(-self.NAME_LANES * np.log1p(-changed_lanes / self.NAME_LANES)))
+
+    def _index_tree(self, top: str):
+        stack = [top]
+        while stack:
+            path = stack.pop()
+            listing = self._list_dir(path)
+            if listing is None:
+                continue
+            self.dirs[path], subdirs = listing
+            self.order.append(path)
+            stack.extend(subdirs)
+
+    def poll(self) -> Dict[str, int]:
+        counts = {"created": 0, "deleted": 0, "renamed": 0, "overflow": 0}
+        if not self.dirs:
+            self._index_tree(self.root)
+            return counts
+
+        checks = min(self.stat_budget, len(self.order))
+        for _ in range(checks):
+            path = self.order.popleft()
+            known = self.dirs.get(path)
+            if known is None:
+                continue
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                # Directory vanished; its parent's listing accounts for it.
+                del self.dirs[path]
+                continue
+            self.order.append(path)
+            if mtime_ns == known[0]:
+                continue
+
+            listing = self._list_dir(path)
+            if listing is None:
+                continue
+            state, subdirs = listing
+            delta = state[1] - known[1]
+            if delta > 0:
+                counts["created"] += delta
+            else:
+                counts["deleted"] -= delta
+            # Name changes beyond the net size change are names swapped in
+            # place; a rename is one name out and one in.
+            changed = self._estimate_name_changes(
+                self._changed_lanes(known[2], state[2]), max(known[1], state[1])
+            )
+            if changed > abs(delta):
+                counts["renamed"] += max(1, (changed - abs(delta)) // 2)
+            self.dirs[path] = state
+            for sub in subdirs:
+                if sub not in self.dirs:
+                    self._index_tree(sub)
+        return counts
+
+    def close(self):
+        self.dirs.clear()
+        self.order.clear()
+
 class FileActivityWorker(BaseWorker):
     def __init__(self, queen: QueenBrain, base_interval: float = 10.0):
         super().__init__("FileActivity", queen, base_interval)
         self.protected_paths = [
             os.path.expanduser("~"),
         ]
-        self.last_snapshots: Dict[str, set] = {}
+        self.spike_threshold = 50  # create+delete+rename events per window
+        self.backends: Dict[str, object] = {}
 
-    def _snapshot_dir(self, root: str) -> set:
-        files = set()
-        for dirpath, dirnames, filenames in os.walk(root):
-            for f in filenames:
-                files.add(os.path.join(dirpath, f))
-        return files
+    def _get_backend(self, root: str):
+        backend = self.backends.get(root)
+        if backend is not None:
+            return backend
+        try:
+            backend = InotifyTreeWatcher(root)
+            self.queen.log(f"[FILE-SEC] Watching {root} via inotify ({len(backend.wd_paths)} dirs)")
+        except OSError as e:
+            backend = IncrementalTreeScanner(root)
+            self.queen.log(f"[FILE-SEC] inotify unavailable for {root} ({e}); using incremental scan")
+        self.backends[root] = backend
+        return backend
 
     def step(self):
         suspicious_events = []
@@ -1539,29 +2826,32 @@ class FileActivityWorker(BaseWorker):
                 continue
 
             try:
-                current = self._snapshot_dir(root)
+                counts = self._get_backend(root).poll()
             except Exception as e:
-                self.queen.log(f"[ERROR] FileActivity snapshot {root}: {e}")
+                self.queen.log(f"[ERROR] FileActivity poll {root}: {e}")
                 continue
 
-            prev = self.last_snapshots.get(root, set())
-            created = current - prev
-            deleted = prev - current
-
-            if len(created) + len(deleted) > 50:
-                suspicious_events.append((root, len(created), len(deleted)))
-
-            self.last_snapshots[root] = current
+            created = counts["created"]
+            deleted = counts["deleted"]
+            renamed = counts["renamed"]
+            # A queue overflow means more events than the kernel could hold.
+            if counts["overflow"] or created + deleted + renamed > self.spike_threshold:
+                suspicious_events.append((root, created, deleted, renamed))
 
         if suspicious_events:
             self.queen.update_file_signals(suspicious_events)
             msg = "; ".join(
-                f"{root}: +{c} / -{d}" for (root, c, d) in suspicious_events
+                f"{root}: +{c} / -{d} / ~{r}" for (root, c, d, r) in suspicious_events
             )
             self.queen.update_worker_status(self.name, f"Spike: {msg}")
         else:
             self.queen.update_worker_status(self.name, "No suspicious spikes")
 
+    def stop(self):
+        super().stop()
+        for backend in self.backends.values():
+            backend.close()
+
 # -------------- MAIN GUI WITH ADMIN TAB & RISK GRAPH -------------- #
 
 class HiveGUI:
@@ -1612,13 +2902,18 @@ class HiveGUI:
         self.workers_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.workers_frame, text="Workers")
 
-        columns = ("name", "interval", "last_run", "last_result", "active")
+        columns = ("name", "interval", "last_run", "lag", "duration", "overruns", "last_result", "active")
         self.tree_workers = ttk.Treeview(
             self.workers_frame, columns=columns, show="headings", height=20
         )
         for col in columns:
             self.tree_workers.heading(col, text=col)
-            width = 180 if col != "last_result" else 360
+            if col == "last_result":
+                width = 360
+            elif col in ("lag", "duration", "overruns"):
+                width = 90
+            else:
+                width = 160
             self.tree_workers.column(col, width=width, anchor="w")
         self.tree_workers.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
 
@@ -1650,6 +2945,16 @@ class HiveGUI:
         self.canvas_widget = self.canvas.get_tk_widget()
         self.canvas_widget.pack(fill=tk.BOTH, expand=True)
 
+        # Incremental map state: positions are cached per pid and artists are
+        # created once, then updated in place on every refresh.
+        self.map_pos: Dict[str, Tuple[float, float]] = {}
+        self.map_rng = random.Random()
+        self.map_edges_artist = None
+        self.map_nodes_artist = None
+        self.map_label_artists: List = []
+        self.map_lod_threshold = 300  # above this, collapse into parent groups
+        self.map_label_max = 60
+
     def _build_threats_tab(self):
         self.threats_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.threats_frame, text="Threat Timeline")
@@ -1863,6 +3168,7 @@ class HiveGUI:
         lines.append(f"Strategy: {self.queen.get_strategy_summary()}")
         lines.append(f"Swarm: {'ENABLED' if self.queen.swarm_enabled else 'DISABLED'}")
         lines.append(f"Online ML risk: {'ENABLED' if self.queen.ml_enabled else 'DISABLED'}")
+        lines.append(f"Stale snapshots dropped: {self.queen.snapshots_dropped}")
         lines.append("")
 
         if snapshot is None:
@@ -1919,6 +3225,9 @@ class HiveGUI:
                     ws.name,
                     f"{ws.interval:.1f}s",
                     last_run_str,
+                    f"{ws.lag * 1000:.0f}ms",
+                    f"{ws.duration * 1000:.0f}ms",
+                    f"{ws.overruns} (+{ws.deferrals} deferred)",
                     ws.last_result,
                     "yes" if ws.active else "no",
                 )
@@ -1930,47 +3239,177 @@ class HiveGUI:
         self.txt_events.insert(tk.END, "\n".join(events))
         self.txt_events.see(tk.END)
 
-    def _update_map(self):
-        graph = self.queen.get_graph()
-        self.ax.clear()
-        self.ax.set_title("Process Cave Map")
-        self.ax.axis("off")
+    @staticmethod
+    def _short_label(text: str) -> str:
+        return text[:11] + "..." if len(text) > 14 else text
+
+    def _place_new_map_nodes(self, graph: nx.DiGraph):
+        pos = self.map_pos
+        for pid in [pid for pid in pos if pid not in graph]:
+            del pos[pid]
 
-        if graph.number_of_nodes() == 0:
-            self.canvas.draw()
+        new_nodes = [n for n in graph.nodes() if n not in pos]
+        if not new_nodes:
             return
 
-        try:
-            pos = nx.spring_layout(graph, k=0.5, iterations=25)
-        except Exception:
-            pos = nx.random_layout(graph)
+        if not pos and len(new_nodes) > 1:
+            # First sight of the graph: one bounded spring layout seeds the cache.
+            try:
+                layout = nx.spring_layout(graph, k=0.5, iterations=25)
+            except Exception:
+                layout = nx.random_layout(graph)
+            for n, xy in layout.items():
+                pos[n] = (float(xy[0]), float(xy[1]))
+            return
 
-        cpu_values = nx.get_node_attributes(graph, "cpu")
-        mem_values = nx.get_node_attributes(graph, "memory")
-        colors = []
+        # Parents before children so new process chains stay together.
+        rng = self.map_rng
+        new_nodes.sort(key=lambda n: int(n) if n.isdigit() else 0)
+        for n in new_nodes:
+            anchor = None
+            for parent in graph.predecessors(n):
+                anchor = pos.get(parent)
+                break
+            if anchor is None:
+                pos[n] = (rng.uniform(-1.0, 1.0), rng.uniform(-1.0, 1.0))
+            else:
+                pos[n] = (anchor[0] + rng.uniform(-0.08, 0.08), anchor[1] + rng.uniform(-0.08, 0.08))
+
+    def _map_scene_nodes(self, graph: nx.DiGraph, cpu_thr: float, mem_thr: float):
+        pos = self.map_pos
+        nodes = list(graph.nodes(data=True))
+        index = {n: i for i, (n, _) in enumerate(nodes)}
+        xy = [pos[n] for n, _ in nodes]
+        hot = [
+            attrs.get("cpu", 0.0) > cpu_thr or attrs.get("memory", 0.0) > mem_thr
+            for _, attrs in nodes
+        ]
+        colors = ["red" if h else "skyblue" for h in hot]
+        sizes = [280.0] * len(nodes)
+        segments = [(xy[index[u]], xy[index[v]]) for u, v in graph.edges()]
 
-        cpu_thr = self.queen.current_strategy.cpu_threshold
-        mem_thr = self.queen.current_strategy.mem_threshold
+        if len(nodes) <= self.map_label_max:
+            labelled = range(len(nodes))
+        else:
+            # Label hot nodes first, then the busiest ones.
+            labelled = sorted(
+                range(len(nodes)),
+                key=lambda i: (not hot[i], -nodes[i][1].get("cpu", 0.0)),
+            )[: self.map_label_max]
+        labels = [(xy[i], self._short_label(nodes[i][1].get("label", nodes[i][0]))) for i in labelled]
+        return xy, colors, sizes, segments, labels
+
+    def _map_scene_groups(self, graph: nx.DiGraph, cpu_thr: float, mem_thr: float):
+        """Level of detail: one marker per parent process and its children."""
+        pos = self.map_pos
+        groups: Dict[str, List[str]] = {}
+        hot_groups = set()
+        for n, attrs in graph.nodes(data=True):
+            key = n
+            for parent in graph.predecessors(n):
+                key = parent
+                break
+            groups.setdefault(key, []).append(n)
+            if attrs.get("cpu", 0.0) > cpu_thr or attrs.get("memory", 0.0) > mem_thr:
+                hot_groups.add(key)
+
+        keys = list(groups)
+        index = {k: i for i, k in enumerate(keys)}
+        xy = []
+        for k in keys:
+            if k in pos:
+                xy.append(pos[k])
+            else:
+                members = groups[k]
+                xy.append((
+                    sum(pos[m][0] for m in members) / len(members),
+                    sum(pos[m][1] for m in members) / len(members),
+                ))
+        colors = ["red" if k in hot_groups else "skyblue" for k in keys]
+        sizes = [min(1200.0, 120.0 + 40.0 * len(groups[k])) for k in keys]
+
+        segments = []
+        for k in keys:
+            if k not in graph:
+                continue
+            for parent in graph.predecessors(k):
+                # Link a group to the group its own parent belongs to.
+                owner = parent if parent in index else None
+                if owner is None:
+                    for grandparent in graph.predecessors(parent):
+                        owner = grandparent if grandparent in index else None
+                        break
+                if owner is not None and owner != k:
+                    segments.append((xy[index[owner]], xy[index[k]]))
+                break
 
-        for node in graph.nodes():
-            cpu = cpu_values.get(node, 0.0)
-            mem = mem_values.get(node, 0.0)
-            if cpu > cpu_thr or mem > mem_thr:
-                colors.append("red")
+        ranked = sorted(
+            range(len(keys)),
+            key=lambda i: (keys[i] not in hot_groups, -len(groups[keys[i]])),
+        )[: self.map_label_max]
+        labels = []
+        for i in ranked:
+            k = keys[i]
+            name = graph.nodes[k].get("label", k) if k in graph else k
+            labels.append((xy[i], f"{self._short_label(name)} x{len(groups[k])}"))
+        return xy, colors, sizes, segments, labels
+
+    def _render_map(self, xy, colors, sizes, segments, labels, title: str):
+        ax = self.ax
+        if self.map_nodes_artist is None:
+            ax.clear()
+            ax.axis("off")
+            self.map_edges_artist = LineCollection([], colors="gray", alpha=0.4, linewidths=0.8, zorder=1)
+            ax.add_collection(self.map_edges_artist)
+            self.map_nodes_artist = ax.scatter([], [], zorder=2)
+
+        ax.set_title(title)
+        self.map_edges_artist.set_segments(segments)
+        self.map_nodes_artist.set_offsets(np.asarray(xy, dtype=float).reshape(-1, 2))
+        self.map_nodes_artist.set_facecolors(colors)
+        self.map_nodes_artist.set_sizes(sizes)
+
+        pool = self.map_label_artists
+        while len(pool) < len(labels):
+            pool.append(ax.text(0.0, 0.0, "", fontsize=7, ha="center", va="center", zorder=3))
+        for i, text in enumerate(pool):
+            if i < len(labels):
+                (x, y), label = labels[i]
+                text.set_position((x, y))
+                text.set_text(label)
+                text.set_visible(True)
             else:
-                colors.append("skyblue")
+                text.set_visible(False)
 
-        nx.draw_networkx_nodes(graph, pos, ax=self.ax, node_color=colors, node_size=280)
-        nx.draw_networkx_edges(graph, pos, ax=self.ax, arrows=False, alpha=0.4)
+        if xy:
+            arr = np.asarray(xy, dtype=float)
+            lo = arr.min(axis=0)
+            hi = arr.max(axis=0)
+            pad = np.maximum((hi - lo) * 0.05, 0.05)
+            ax.set_xlim(lo[0] - pad[0], hi[0] + pad[0])
+            ax.set_ylim(lo[1] - pad[1], hi[1] + pad[1])
 
-        labels = nx.get_node_attributes(graph, "label")
-        short_labels = {
-            k: (v[:11] + "..." if len(v) > 14 else v)
-            for k, v in labels.items()
-        }
-        nx.draw_networkx_labels(graph, pos, labels=short_labels, ax=self.ax, font_size=7)
+        self.canvas.draw_idle()
+
+    def _update_map(self):
+        # Nothing to do while the map tab is not on screen.
+        if self.notebook.select() != str(self.map_frame):
+            return
+
+        graph = self.queen.get_graph()
+        self._place_new_map_nodes(graph)
+
+        cpu_thr = self.queen.current_strategy.cpu_threshold
+        mem_thr = self.queen.current_strategy.mem_threshold
 
-        self.canvas.draw()
+        count = graph.number_of_nodes()
+        if count > self.map_lod_threshold:
+            scene = self._map_scene_groups(graph, cpu_thr, mem_thr)
+            title = f"Process Cave Map ({count} processes, grouped by parent)"
+        else:
+            scene = self._map_scene_nodes(graph, cpu_thr, mem_thr)
+            title = "Process Cave Map"
+        self._render_map(*scene, title=title)
 
     def _update_threats(self):
         for item in self.tree_threats.get_children():
@@ -2091,9 +3530,106 @@ class HiveGUI:
     def run(self):
         self.root.mainloop()
 
+# -------------- SWARM COLLECTOR (LOCAL STAND-IN) -------------- #
+
+def encode_swarm_message(obj: dict) -> bytes:
+    return gzip.compress(json.dumps(obj, separators=(",", ":")).encode("utf-8"), 6)
+
+def decode_swarm_message(body: bytes, content_encoding: str = "") -> dict:
+    if content_encoding == "gzip" or body[:2] == b"\x1f\x8b":
+        body = gzip.decompress(body)
+    return json.loads(body.decode("utf-8"))
+
+class SwarmCollector:
+    """
+    In-memory swarm collector speaking the delta protocol: stores the latest
+    entry per (node, key) by version and answers each node with everything
+    other nodes published past that node's version vector.
+
+    The ack is a contiguous watermark: a push carries everything above its
+    "base", so it only extends what we hold if base <= synced. Otherwise
+    (we restarted, or lost a push) we ack what we have and the node resends
+    everything above it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # node_id -> {"trust": {...}, "sigs": {...}, "max_v": int, "synced": int}
+        self.nodes: Dict[str, dict] = {}
+
+    def handle(self, payload: dict) -> dict:
+        node_id = payload.get("node_id") or "unknown"
+        since = payload.get("since", {})
+        with self.lock:
+            store = self.nodes.setdefault(node_id, {"trust": {}, "sigs": {}, "max_v": 0, "synced": 0})
+            for kind in ("trust", "sigs"):
+                table = store[kind]
+                for key, entry in payload.get(kind, {}).items():
+                    version = int(entry.get("v", 0))
+                    current = table.get(key)
+                    if current is None or current.get("v", 0) < version:
+                        table[key] = entry
+                    store["max_v"] = max(store["max_v"], version)
+            base = payload.get("base")
+            if base is not None and int(base) <= store["synced"]:
+                store["synced"] = int(payload.get("version", store["max_v"]))
+
+            out = {}
+            for other, other_store in self.nodes.items():
+                if other == node_id:
+                    continue
+                floor = int(since.get(other, 0))
+                if other_store["max_v"] <= floor:
+                    continue
+                out[other] = {
+                    kind: {k: e for k, e in other_store[kind].items() if e.get("v", 0) > floor}
+                    for kind in ("trust", "sigs")
+                }
+            return {"proto": 2, "ack": store["synced"], "nodes": out}
+
+def run_swarm_server(host: str = "127.0.0.1", port: int = 8765):
+    collector = SwarmCollector()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = decode_swarm_message(
+                    self.rfile.read(length), self.headers.get("Content-Encoding", "")
+                )
+                body = encode_swarm_message(collector.handle(payload))
+            except Exception as e:
+                self.send_error(400, str(e))
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            print(f"[SWARM-SERVER] {self.address_string()} {fmt % args}")
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"[SWARM-SERVER] Listening on http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
 # -------------- MAIN ENTRY -------------- #
 
 def main():
+    if "--swarm-server" in sys.argv:
+        idx = sys.argv.index("--swarm-server")
+        addr = sys.argv[idx + 1] if idx + 1 < len(sys.argv) else "127.0.0.1:8765"
+        host, _, port = addr.rpartition(":")
+        run_swarm_server(host or "127.0.0.1", int(port))
+        return
+
     service_mode = "--service" in sys.argv
 
     queen = QueenBrain()
@@ -2103,10 +3639,10 @@ def main():
     w3 = NetworkScannerWorker(queen, base_interval=7.0)
     w4 = FileActivityWorker(queen, base_interval=10.0)
 
-    w1.start()
-    w2.start()
-    w3.start()
-    w4.start()
+    scheduler = WorkerScheduler(queen)
+    for w in (w1, w2, w3, w4):
+        scheduler.add(w)
+    scheduler.start()
 
     if service_mode:
         print("[MODE] Running in service mode (no GUI). Press Ctrl+C to stop.")
@@ -2117,20 +3653,14 @@ def main():
             pass
         finally:
             queen.stop()
-            w1.stop()
-            w2.stop()
-            w3.stop()
-            w4.stop()
+            scheduler.stop()
     else:
         gui = HiveGUI(queen)
         try:
             gui.run()
         finally:
             queen.stop()
-            w1.stop()
-            w2.stop()
-            w3.stop()
-            w4.stop()
+            scheduler.stop()
 
 if __name__ == "__main__":
     main()
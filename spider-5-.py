@@ -25,9 +25,11 @@ GUI:
 - Host risk tab (via /predict/hosts)
 """
 
-import sys, os, time, signal, subprocess, logging, json, threading, queue, hashlib, math, re, argparse, socket, ipaddress
-from logging.handlers import RotatingFileHandler
-from collections import defaultdict, deque
+import sys, os, time, signal, subprocess, logging, json, threading, queue, math, re, argparse, socket, ipaddress
+import multiprocessing, zlib, asyncio, struct, random, tempfile
+from logging.handlers import RotatingFileHandler, QueueHandler
+from collections import defaultdict, deque, OrderedDict
+from array import array
 
 RUNNING = True
 
@@ -44,6 +46,7 @@ REQUIRED_LIBS = {
     "pandas": ["pandas", "pandas==2.2.3"],
     "sklearn": ["scikit-learn", "scikit-learn==1.5.2"],
     "matplotlib": ["matplotlib"],  # optional for GUI graphs
+    "ahocorasick": ["pyahocorasick"],  # optional C automaton for KeywordMatcher
 }
 
 def _install_package(pkg):
@@ -90,14 +93,22 @@ def autoload_all(log):
 DEFAULT_CONFIG = {
     "service": {
         "interface": "auto",
-        "backend": "auto",  # scapy | pyshark | auto
+        "backend": "auto",  # scapy | pyshark | auto | replay
+        "replay_path": "",
+        "replay_speed": 0.0,  # 0 = as fast as possible, else time-scale factor
         "capture_filter": "",
         "max_queue": 5000,
+        "batch_max_packets": 256,  # 1 disables micro-batching
+        "batch_max_ms": 50,
+        "shards": 0,  # >1 runs detectors in that many worker processes
+        "shard_queue_max": 256,
+        "shard_snapshot_sec": 5,
         "heartbeat_sec": 10,
         "ai_retrain_interval_sec": 1800,
         "scan_interval_sec": 900,
         "scanner_timeout_sec": 0.7,
         "scanner_max_ports": 100,
+        "scanner_concurrency": 256,  # max in-flight connects across a scan
         "mesh_port": 8787,
         "cidr": "auto",
         "broadcast_port": 9787,
@@ -109,9 +120,11 @@ DEFAULT_CONFIG = {
         "rotate_max_mb": 20,
         "rotate_keep": 5,
         "console": True,
+        "async_queue_max": 20000,  # records buffered for the writer thread
+        "flush_interval_ms": 200,
         "webhook": {"enabled": False, "url": "", "headers": {}},
     },
-    "alerts": {"min_severity": 2, "dedup_window_sec": 120},
+    "alerts": {"min_severity": 2, "dedup_window_sec": 120, "dedup_max_entries": 100000},
     "plugins": {
         "ports_anomaly": {
             "enabled": True,
@@ -138,6 +151,8 @@ DEFAULT_CONFIG = {
             "window_sec": 300,
             "min_repeats": 5,
             "jitter_tolerance_sec": 3,
+            "max_samples": 32,   # timestamps kept per flow
+            "max_flows": 50000,  # LRU cap on tracked (src, dst) flows
         },
         "dns_suspicion": {
             "enabled": True,
@@ -191,7 +206,7 @@ DEFAULT_CONFIG = {
 class JsonFormatter(logging.Formatter):
     def format(self, record):
         payload = {
-            "ts": int(time.time()),
+            "ts": int(record.created),
             "level": record.levelname,
             "msg": record.msg if isinstance(record.msg, dict) else {"text": record.getMessage()},
         }
@@ -214,30 +229,178 @@ class WebhookHandler(logging.Handler):
         except Exception:
             pass
 
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that buffers: emit() formats and encodes a record
+    once into a pending batch, and real_flush() (called by AsyncLogWriter
+    once per batch) writes the whole batch in one call. The file size is
+    tracked here, so rollover needs no seek/stat per record.
+    """
+    def __init__(self, filename, maxBytes=0, backupCount=0):
+        self._pending = []
+        self._pending_bytes = 0
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount)
+        self._size = self.stream.seek(0, 2) if self.stream else 0
+
+    def _open(self):
+        return open(self.baseFilename, "ab")
+
+    def shouldRollover(self, record=None, nbytes=0):
+        used = self._size + self._pending_bytes
+        return bool(self.maxBytes) and used > 0 and used + nbytes > self.maxBytes
+
+    def doRollover(self):
+        super().doRollover()
+        self._size = 0
+
+    def emit(self, record):
+        try:
+            data = (self.format(record) + self.terminator).encode("utf-8")
+            if self.shouldRollover(nbytes=len(data)):
+                self.real_flush()
+                self.doRollover()
+            self._pending.append(data)
+            self._pending_bytes += len(data)
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        pass
+
+    def real_flush(self):
+        self.acquire()
+        try:
+            if self._pending:
+                if self.stream is None:
+                    self.stream = self._open()
+                self.stream.write(b"".join(self._pending))
+                self._size += self._pending_bytes
+                self._pending = []
+                self._pending_bytes = 0
+            if self.stream:
+                self.stream.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self.real_flush()
+        super().close()
+
+class BoundedQueueHandler(QueueHandler):
+    """Non-blocking enqueue into a bounded queue; records are dropped (and counted) when full."""
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # formatting happens in the writer thread; msg dicts are passed through
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class AsyncLogWriter:
+    """
+    Drains log records in batches on a background thread and flushes the
+    file handlers once per batch (at most every flush_interval_ms while
+    records keep arriving) instead of once per record.
+    """
+    def __init__(self, q, handlers, flush_interval_ms=200, batch_max=1000):
+        self.q = q
+        self.handlers = handlers
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.batch_max = batch_max
+        self.stop_flag = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _flush(self):
+        for h in self.handlers:
+            try:
+                if hasattr(h, "real_flush"):
+                    h.real_flush()
+                else:
+                    h.flush()
+            except Exception:
+                pass
+
+    def _handle(self, record):
+        for h in self.handlers:
+            if record.levelno >= h.level:
+                h.handle(record)
+
+    def _run(self):
+        last_flush = time.time()
+        while True:
+            try:
+                rec = self.q.get(timeout=self.flush_interval)
+            except queue.Empty:
+                rec = None
+            if rec is not None:
+                self._handle(rec)
+                for _ in range(self.batch_max):
+                    try:
+                        rec = self.q.get_nowait()
+                    except queue.Empty:
+                        break
+                    self._handle(rec)
+            now = time.time()
+            if self.q.empty() or now - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = now
+            if self.stop_flag and self.q.empty():
+                break
+        self._flush()
+
+    def stop(self, timeout=5):
+        self.stop_flag = True
+        self.thread.join(timeout)
+
+_LOG_WRITER = None
+
 def get_logger(cfg, requests_mod=None):
+    global _LOG_WRITER
     os.makedirs(os.path.dirname(cfg["file_path"]), exist_ok=True)
     log = logging.getLogger("netmesh")
     log.setLevel(getattr(logging, cfg["level"]))
     log.handlers.clear()
+    shutdown_logging()
 
-    fh = RotatingFileHandler(
+    handlers = []
+    fh = BufferedRotatingFileHandler(
         cfg["file_path"],
         maxBytes=cfg["rotate_max_mb"] * 1024 * 1024,
         backupCount=cfg["rotate_keep"],
     )
     fh.setFormatter(JsonFormatter())
-    log.addHandler(fh)
+    handlers.append(fh)
 
     if cfg.get("console", True):
         ch = logging.StreamHandler()
         ch.setFormatter(JsonFormatter())
-        log.addHandler(ch)
+        handlers.append(ch)
 
     wb = cfg.get("webhook", {})
     if wb.get("enabled") and requests_mod:
-        log.addHandler(WebhookHandler(wb["url"], headers=wb.get("headers", {}), requests_mod=requests_mod))
+        handlers.append(WebhookHandler(wb["url"], headers=wb.get("headers", {}), requests_mod=requests_mod))
+
+    q = queue.Queue(maxsize=int(cfg.get("async_queue_max", 20000)))
+    log.addHandler(BoundedQueueHandler(q))
+    _LOG_WRITER = AsyncLogWriter(q, handlers, flush_interval_ms=cfg.get("flush_interval_ms", 200))
+    _LOG_WRITER.start()
     return log
 
+def shutdown_logging():
+    global _LOG_WRITER
+    if _LOG_WRITER is not None:
+        _LOG_WRITER.stop()
+        _LOG_WRITER = None
+
 def json_safe(val):
     try:
         return str(val)
@@ -270,16 +433,98 @@ def handle_shutdown(signum, frame):
     global RUNNING
     RUNNING = False
 
+RELOAD_REQUESTED = threading.Event()
+
+def handle_reload(signum, frame):
+    RELOAD_REQUESTED.set()
+
 # =============================================================================
 # Pipeline
 # =============================================================================
 
+class DedupCache:
+    """
+    Alert dedup with TTL expiry on a time wheel and a hard entry cap.
+    Keys are recorded in the wheel slot of their timestamp; advancing the
+    wheel drops whole slots once they are older than the window. The cap is
+    enforced on every insert by evicting the oldest entries, even when they
+    all sit in the current slot.
+    """
+    def __init__(self, window_sec, max_entries=100000, resolution_sec=1.0):
+        self.window = float(window_sec)
+        self.max_entries = max(1, int(max_entries))
+        self.res = float(resolution_sec)
+        self.entries = {}     # key -> ts of first sighting in current window
+        self.wheel = deque()  # [slot_id, deque(keys)] oldest first
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def _drop_slot(self):
+        sid, keys = self.wheel.popleft()
+        dropped = 0
+        for k in keys:
+            ts = self.entries.get(k)
+            if ts is not None and int(ts // self.res) == sid:
+                del self.entries[k]
+                dropped += 1
+        return dropped
+
+    def _evict_oldest(self):
+        """Drop the oldest recorded key (front of the oldest slot)."""
+        while self.wheel:
+            sid, keys = self.wheel[0]
+            while keys:
+                k = keys.popleft()
+                ts = self.entries.get(k)
+                if ts is not None and int(ts // self.res) == sid:
+                    del self.entries[k]
+                    return 1
+            self.wheel.popleft()
+        return 0
+
+    def _advance(self, now):
+        cutoff = int((now - self.window) // self.res)
+        while self.wheel and self.wheel[0][0] < cutoff:
+            self.expired += self._drop_slot()
+
+    def seen(self, key, now=None):
+        """True if key was recorded within the window; otherwise record it."""
+        now = time.time() if now is None else now
+        with self.lock:
+            self._advance(now)
+            prev = self.entries.get(key)
+            if prev is not None and (now - prev) < self.window:
+                self.hits += 1
+                return True
+            self.misses += 1
+            self.entries[key] = now
+            sid = int(now // self.res)
+            if not self.wheel or self.wheel[-1][0] < sid:
+                self.wheel.append([sid, deque()])
+            self.wheel[-1][1].append(key)
+            while len(self.entries) > self.max_entries:
+                self.evictions += self._evict_oldest()
+            return False
+
+    def stats(self):
+        return {
+            "size": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
+
 class Pipeline:
     def __init__(self, cfg, log):
         self.log = log
         self.min_severity = cfg.get("min_severity", 2)
         self.dedup_window = cfg.get("dedup_window_sec", 120)
-        self.recent = {}
+        self.dedup = DedupCache(self.dedup_window, cfg.get("dedup_max_entries", 100000))
         self.counts = defaultdict(int)
         self.payload_samples = deque(maxlen=1500)
         self.dns_labels = deque(maxlen=1500)
@@ -288,21 +533,17 @@ class Pipeline:
         self.alert_history = deque(maxlen=5000)
 
     def _fingerprint(self, ev):
-        key = (
-            json_safe(ev.get("signal", ""))
-            + json_safe(ev.get("src", ""))
-            + json_safe(ev.get("dst", ""))
-            + json_safe(ev.get("extra", ""))
-        )
-        return hashlib.sha256(key.encode()).hexdigest()
+        # the tuple itself is the dedup key: a bare hash() can collide and
+        # silently suppress a different alert
+        key = (ev.get("signal", ""), ev.get("src", ""), ev.get("dst", ""), ev.get("extra", ""))
+        try:
+            hash(key)
+            return key
+        except TypeError:
+            return key[:3] + (json_safe(key[3]),)
 
     def _is_duplicate(self, fp):
-        now = time.time()
-        prev = self.recent.get(fp)
-        if prev and (now - prev) < self.dedup_window:
-            return True
-        self.recent[fp] = now
-        return False
+        return self.dedup.seen(fp)
 
     def ingest(self, ev):
         sev = int(ev.get("severity", 1))
@@ -341,38 +582,122 @@ class Pipeline:
 # Host-level temporal profiling and risk scoring
 # =============================================================================
 
+class _HostWindow:
+    """
+    Windowed aggregates for one host: running totals over time buckets.
+    Each bucket keeps only its own deltas, so expiry subtracts it in O(1)
+    and the per-port counter shrinks as ports age out.
+    """
+    __slots__ = ("buckets", "packets", "bytes", "anomalies", "beacons", "dns_sum", "dns_n", "ports", "last_ts")
+
+    def __init__(self):
+        self.buckets = deque()  # [bucket_id, packets, bytes, anomalies, beacons, dns_sum, dns_n, {port: n}]
+        self.packets = 0
+        self.bytes = 0
+        self.anomalies = 0
+        self.beacons = 0
+        self.dns_sum = 0.0
+        self.dns_n = 0
+        self.ports = {}
+        self.last_ts = 0.0
+
+    def add(self, bid, ts, length, anomaly, dns_entropy, port, beacon):
+        b = self.buckets[-1] if self.buckets else None
+        if b is None or b[0] < bid:
+            b = [bid, 0, 0, 0, 0, 0.0, 0, None]
+            self.buckets.append(b)
+        b[1] += 1; self.packets += 1
+        b[2] += length; self.bytes += length
+        if anomaly:
+            b[3] += 1; self.anomalies += 1
+        if beacon:
+            b[4] += 1; self.beacons += 1
+        if dns_entropy:
+            b[5] += dns_entropy; self.dns_sum += dns_entropy
+            b[6] += 1; self.dns_n += 1
+        if port:
+            if b[7] is None:
+                b[7] = {}
+            b[7][port] = b[7].get(port, 0) + 1
+            self.ports[port] = self.ports.get(port, 0) + 1
+        if ts > self.last_ts:
+            self.last_ts = ts
+
+    def expire(self, cutoff_bid):
+        buckets = self.buckets
+        while buckets and buckets[0][0] < cutoff_bid:
+            _, pk, by, an, be, ds, dn, ports = buckets.popleft()
+            self.packets -= pk
+            self.bytes -= by
+            self.anomalies -= an
+            self.beacons -= be
+            self.dns_sum -= ds
+            self.dns_n -= dn
+            if ports:
+                for port, n in ports.items():
+                    left = self.ports[port] - n
+                    if left > 0:
+                        self.ports[port] = left
+                    else:
+                        del self.ports[port]
+        if not self.dns_n:
+            self.dns_sum = 0.0
+
 class HostProfiler:
     """
     Maintains rolling statistics per host over time windows.
     Feeds HostRiskModel.
+
+    Aggregates are kept incrementally in bucket_sec-wide time buckets, so
+    observe_packet is O(1) and snapshot_features is O(hosts); memory per host
+    is bounded by window/bucket_sec buckets plus its distinct ports.
     """
-    def __init__(self, log, window_sec=600):
+    def __init__(self, log, window_sec=600, bucket_sec=10):
         self.log = log
         self.window = window_sec
-        self.history = defaultdict(deque)  # host -> deque of feature dicts
+        self.bucket_sec = max(1, int(bucket_sec))
+        self.history = {}  # host -> _HostWindow
+        self.lock = threading.Lock()
 
-    def observe_packet(self, src, dst, length, anomaly=False, dns_entropy=None, dst_port=None, beacon=False):
-        now = time.time()
-        for host, role in ((src, "src"), (dst, "dst")):
-            if not host:
-                continue
-            feats = {
-                "ts": now,
-                "packets": 1,
-                "bytes": length or 0,
-                "anomalies": 1 if anomaly and role == "src" else 0,
-                "dns_entropy": dns_entropy if dns_entropy is not None and role == "src" else 0.0,
-                "ports": {dst_port} if dst_port and role == "src" else set(),
-                "beacon": 1 if beacon and role == "src" else 0,
-            }
-            self.history[host].append(feats)
-            self._prune(host, now)
+    def _cutoff(self, now):
+        return int((now - self.window) // self.bucket_sec)
+
+    def observe_packet(self, view, src=None, dst=None, anomaly=False, dns_entropy=None, dst_port=None, beacon=False):
+        """
+        Record one packet (PacketView). src/dst/dst_port default to the
+        view's own fields; callers may override them from an alert.
+        """
+        self.observe(
+            view.ts,
+            view.length or 0,
+            view.src if src is None else src,
+            view.dst if dst is None else dst,
+            anomaly,
+            dns_entropy,
+            view.dport if dst_port is None else dst_port,
+            beacon,
+        )
 
-    def _prune(self, host, now):
-        dq = self.history[host]
-        cutoff = now - self.window
-        while dq and dq[0]["ts"] < cutoff:
-            dq.popleft()
+    def observe(self, now, length, src, dst, anomaly, dns_entropy, dst_port, beacon):
+        """Field-level form of observe_packet; also used to merge shard observations."""
+        bid = int(now // self.bucket_sec)
+        cutoff = self._cutoff(now)
+        with self.lock:
+            for host, role in ((src, "src"), (dst, "dst")):
+                if not host:
+                    continue
+                w = self.history.get(host)
+                if w is None:
+                    w = self.history[host] = _HostWindow()
+                is_src = role == "src"
+                w.add(
+                    bid, now, length,
+                    anomaly and is_src,
+                    dns_entropy if dns_entropy is not None and is_src else 0.0,
+                    dst_port if dst_port and is_src else None,
+                    beacon and is_src,
+                )
+                w.expire(cutoff)
 
     def snapshot_features(self):
         """
@@ -380,30 +705,24 @@ class HostProfiler:
         Returns dict: host -> feature dict.
         """
         snap = {}
-        now = time.time()
-        for host, dq in list(self.history.items()):
-            self._prune(host, now)
-            if not dq:
-                continue
-            packets = sum(x["packets"] for x in dq)
-            bytes_ = sum(x["bytes"] for x in dq)
-            anomalies = sum(x["anomalies"] for x in dq)
-            beacons = sum(x["beacon"] for x in dq)
-            dns_vals = [x["dns_entropy"] for x in dq if x["dns_entropy"] > 0]
-            avg_dns = sum(dns_vals) / len(dns_vals) if dns_vals else 0.0
-            ports = set()
-            for x in dq:
-                ports |= x["ports"]
-            uniq_ports = len(ports)
-            snap[host] = {
-                "packets": packets,
-                "bytes": bytes_,
-                "anomalies": anomalies,
-                "beacons": beacons,
-                "avg_dns_entropy": avg_dns,
-                "uniq_ports": uniq_ports,
-                "last_ts": dq[-1]["ts"],
-            }
+        cutoff = self._cutoff(time.time())
+        with self.lock:
+            for host in list(self.history):
+                w = self.history[host]
+                w.expire(cutoff)
+                if not w.buckets:
+                    del self.history[host]
+                    continue
+                snap[host] = {
+                    "packets": w.packets,
+                    "bytes": w.bytes,
+                    "anomalies": w.anomalies,
+                    "beacons": w.beacons,
+                    "avg_dns_entropy": w.dns_sum / w.dns_n if w.dns_n else 0.0,
+                    "dns_samples": w.dns_n,
+                    "uniq_ports": len(w.ports),
+                    "last_ts": w.last_ts,
+                }
         return snap
 
 class HostRiskModel:
@@ -489,7 +808,11 @@ class Capture:
         self.backend = cfg.get("backend", "auto")
         self.filter = cfg.get("capture_filter", "")
         self.q = queue.Queue(maxsize=cfg.get("max_queue", 5000))
+        self.replay_path = cfg.get("replay_path", "")
+        self.replay_speed = float(cfg.get("replay_speed", 0.0) or 0.0)
         self.stop = False
+        self.eof = False  # set by the replay backend after the last packet
+        self.dropped = 0
         self.worker = None
         self._init_backend()
 
@@ -504,6 +827,10 @@ class Capture:
         self.backend = backend
         self.log.info({"event": "capture_backend", "backend": backend})
 
+        if backend == "replay":
+            self._start_replay()
+            return
+
         if self.iface == "auto":
             self.iface = self._guess_iface()
         self.log.info({"event": "capture_interface", "iface": self.iface})
@@ -535,6 +862,7 @@ class Capture:
                         try:
                             self.q.put(pkt, timeout=0.1)
                         except queue.Full:
+                            self.dropped += 1
                             continue
                 except Exception as e:
                     self.log.error({"event": "pyshark_error", "error": str(e)})
@@ -549,7 +877,7 @@ class Capture:
             try:
                 self.q.put(pkt, timeout=0.1)
             except queue.Full:
-                pass
+                self.dropped += 1
 
         def worker():
             while not self.stop and RUNNING:
@@ -567,195 +895,648 @@ class Capture:
         self.worker = threading.Thread(target=worker, daemon=True)
         self.worker.start()
 
+    def _start_replay(self):
+        """
+        Feed packets from a pcap file. Timestamps are rebased so the first
+        packet is "now". At replay_speed 0 the queue applies backpressure
+        (nothing is dropped); with a time scale, packets are paced and
+        dropped on a full queue exactly like live capture.
+        """
+        self.log.info({"event": "capture_replay", "path": self.replay_path, "speed": self.replay_speed})
+
+        def worker():
+            try:
+                start = time.time()
+                first = None
+                for ts, pkt in iter_pcap_packets(self.replay_path):
+                    if self.stop or not RUNNING:
+                        break
+                    if first is None:
+                        first = ts
+                    rebased = start + (ts - first)
+                    if isinstance(pkt, PacketView):
+                        pkt.ts = rebased
+                    else:
+                        pkt.time = rebased
+                    if self.replay_speed > 0:
+                        delay = start + (ts - first) / self.replay_speed - time.time()
+                        if delay > 0:
+                            time.sleep(delay)
+                        try:
+                            self.q.put(pkt, timeout=0.1)
+                        except queue.Full:
+                            self.dropped += 1
+                    else:
+                        while not self.stop and RUNNING:
+                            try:
+                                self.q.put(pkt, timeout=0.5)
+                                break
+                            except queue.Full:
+                                continue
+            except Exception as e:
+                self.log.error({"event": "replay_error", "error": str(e)})
+            finally:
+                self.eof = True
+
+        self.worker = threading.Thread(target=worker, daemon=True)
+        self.worker.start()
+
+    def exhausted(self):
+        return self.eof and self.q.empty()
+
     def next_packet(self, timeout=0.5):
         try:
             return self.q.get(timeout=timeout)
         except queue.Empty:
             return None
 
+    def next_batch(self, max_n, max_ms, timeout=0.5):
+        """
+        Drain up to max_n packets, waiting at most max_ms after the first
+        one arrives. Returns [] if nothing arrived within timeout.
+        """
+        first = self.next_packet(timeout)
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.time() + max_ms / 1000.0
+        while len(batch) < max_n:
+            try:
+                batch.append(self.q.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
     def close(self):
         self.stop = True
 
+# =============================================================================
+# Packet decoding (single pass, shared by all consumers)
+# =============================================================================
+
+def _pyshark_bytes(field):
+    """pyshark renders payload fields as hex ("aa:bb:.." or "aabb.."); return raw bytes."""
+    text = str(field)
+    try:
+        return bytes.fromhex(text.replace(":", ""))
+    except ValueError:
+        return text.encode("utf-8", errors="ignore")
+
+class PacketView:
+    """
+    Normalized view of one captured packet, decoded once for either backend.
+    Detectors, extensions, AIJudge and HostProfiler all consume this instead
+    of probing the raw pyshark/scapy object themselves. The original object
+    stays available as `raw` for extensions that need other layers.
+    """
+    __slots__ = (
+        "raw", "ts", "length", "proto", "src", "dst",
+        "transport", "sport", "dport", "payload", "app_payload", "dns_qname",
+    )
+
+    def __init__(self, raw=None, ts=None):
+        self.raw = raw
+        self.ts = ts if ts is not None else time.time()
+        self.length = 0
+        self.proto = 0
+        self.src = ""
+        self.dst = ""
+        self.transport = None  # "TCP" | "UDP" | None
+        self.sport = None
+        self.dport = None
+        self.payload = b""      # transport payload bytes (payload_signals)
+        self.app_payload = b""  # HTTP body / data layer bytes (hidden_text_commands)
+        self.dns_qname = None
+
+    def to_tuple(self):
+        """Picklable form without the raw packet (for shard workers)."""
+        return (
+            self.ts, self.length, self.proto, self.src, self.dst, self.transport,
+            self.sport, self.dport, self.payload, self.app_payload, self.dns_qname,
+        )
+
+    @classmethod
+    def from_tuple(cls, t):
+        view = cls(None, t[0])
+        (view.length, view.proto, view.src, view.dst, view.transport,
+         view.sport, view.dport, view.payload, view.app_payload, view.dns_qname) = t[1:]
+        return view
+
+    def flow_key(self):
+        return (self.src, self.dst)
+
+    @classmethod
+    def from_packet(cls, pkt):
+        if isinstance(pkt, PacketView):
+            return pkt  # already decoded (stdlib pcap replay)
+        view = cls(pkt)
+        if hasattr(pkt, "highest_layer"):
+            view._decode_pyshark(pkt)
+        elif hasattr(pkt, "haslayer"):
+            view._decode_scapy(pkt)
+        return view
+
+    def _decode_pyshark(self, pkt):
+        try:
+            self.ts = float(pkt.sniff_timestamp)
+        except Exception:
+            pass
+        try:
+            self.length = int(pkt.length)
+        except Exception:
+            pass
+        try:
+            ip = getattr(pkt, "ip", None)
+            if ip is not None:
+                self.src = getattr(ip, "src", "")
+                self.dst = getattr(ip, "dst", "")
+                self.proto = int(getattr(ip, "proto", 0))
+        except Exception:
+            pass
+        try:
+            layer = getattr(pkt, "transport_layer", None)
+            if layer in ("TCP", "UDP"):
+                tl = getattr(pkt, layer.lower())
+                self.transport = layer
+                self.sport = int(getattr(tl, "srcport", -1))
+                self.dport = int(getattr(tl, "dstport", -1))
+                if hasattr(tl, "payload"):
+                    self.payload = _pyshark_bytes(tl.payload)
+        except Exception:
+            pass
+        try:
+            if hasattr(pkt, "http") and hasattr(pkt.http, "file_data"):
+                self.app_payload = str(pkt.http.file_data).encode("utf-8", errors="ignore")
+            elif hasattr(pkt, "data") and hasattr(pkt.data, "data"):
+                self.app_payload = _pyshark_bytes(pkt.data.data)
+        except Exception:
+            pass
+        try:
+            if hasattr(pkt, "dns") and hasattr(pkt.dns, "qry_name"):
+                self.dns_qname = str(pkt.dns.qry_name)
+        except Exception:
+            pass
+
+    def _decode_scapy(self, pkt):
+        try:
+            self.ts = float(pkt.time)
+        except Exception:
+            pass
+        try:
+            self.length = int(pkt.wirelen)
+        except Exception:
+            try:
+                self.length = len(pkt)
+            except Exception:
+                pass
+        try:
+            if pkt.haslayer("IP"):
+                ip = pkt["IP"]
+                self.src = ip.src
+                self.dst = ip.dst
+                self.proto = int(ip.proto)
+        except Exception:
+            pass
+        try:
+            for layer in ("TCP", "UDP"):
+                if pkt.haslayer(layer):
+                    tl = pkt[layer]
+                    self.transport = layer
+                    self.sport = int(tl.sport)
+                    self.dport = int(tl.dport)
+                    break
+        except Exception:
+            pass
+        try:
+            if pkt.haslayer("Raw"):
+                self.payload = bytes(pkt["Raw"].load)
+                self.app_payload = self.payload
+        except Exception:
+            pass
+        try:
+            if pkt.haslayer("DNS") and pkt["DNS"].qd is not None:
+                self.dns_qname = pkt["DNS"].qd.qname.decode()
+        except Exception:
+            pass
+
 # =============================================================================
 # Detectors
 # =============================================================================
 
 DETECTOR_ENABLED = {}  # runtime toggles
 
+_AHOCORASICK = False  # resolved on first use: module or None
+
+def _ahocorasick_mod():
+    """pyahocorasick's C automaton when importable (optional), else None."""
+    global _AHOCORASICK
+    if _AHOCORASICK is False:
+        try:
+            import ahocorasick
+            _AHOCORASICK = ahocorasick
+        except Exception:
+            _AHOCORASICK = None
+    return _AHOCORASICK
+
+class KeywordMatcher:
+    """
+    Aho-Corasick multi-pattern matcher over payload bytes.
+
+    Keywords are compiled into a byte trie with failure links, flattened
+    into a DFA whose states keep only their non-root transitions and the
+    keywords ending there (own plus inherited through failure links). A
+    scan is one transition per payload byte regardless of how many
+    keywords are loaded; bytes outside the keywords' alphabet always lead
+    back to the root, so only alphabet runs at least as long as the
+    shortest keyword are walked. The pyahocorasick package, when
+    importable, runs the same automaton in C (use_c=False forces the
+    pure-Python one).
+    """
+    def __init__(self, keywords, ignore_case=False, use_c=True):
+        self.keywords = sorted({k for k in keywords if k})
+        self.ignore_case = ignore_case
+        self.backend = None
+        self._ac = None
+        if not self.keywords:
+            return
+        # normalized pattern -> keywords it reports ("CMD" and "cmd" share one)
+        patterns = {}
+        for k in self.keywords:
+            n = k.encode("utf-8")
+            if ignore_case:
+                n = n.lower()
+            patterns.setdefault(n, []).append(k)
+
+        mod = _ahocorasick_mod() if use_c else None
+        if mod is not None:
+            # latin-1 maps bytes 1:1 onto code points, so the unicode build
+            # of pyahocorasick matches raw bytes
+            self._ac = mod.Automaton()
+            for n, ks in patterns.items():
+                self._ac.add_word(n.decode("latin-1"), tuple(ks))
+            self._ac.make_automaton()
+            self.backend = "pyahocorasick"
+            return
+        self._build(patterns)
+        self.backend = "python"
+
+    def _build(self, patterns):
+        goto = [{}]
+        out = [()]
+        for n, ks in patterns.items():
+            s = 0
+            for c in n:
+                nxt = goto[s].get(c)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[s][c] = nxt
+                    goto.append({})
+                    out.append(())
+                s = nxt
+            out[s] = out[s] + tuple(ks)
+
+        # BFS: failure links, inherited outputs, and the flattened DFA. A
+        # state's transitions are its failure state's plus its own trie
+        # edges; each state stores only those that differ from the root's
+        # (looked up as the fallback), which keeps the table near trie size.
+        root = goto[0]
+        fail = [0] * len(goto)
+        delta = [{} for _ in goto]
+        order = deque(root.values())
+        while order:
+            s = order.popleft()
+            f = fail[s]
+            out[s] = out[s] + out[f]
+            if f:
+                delta[s].update(delta[f])
+            for c, t in goto[s].items():
+                delta[s][c] = t
+                fail[t] = delta[f].get(c) or root.get(c, 0)
+                order.append(t)
+        self._root = root
+        self._delta = delta
+        self._out = [o or None for o in out]
+        alphabet = sorted({c for n in patterns for c in n})
+        min_len = min(len(n) for n in patterns)
+        cls = b"".join(re.escape(bytes([c])) for c in alphabet)
+        self._runs = re.compile(b"[" + cls + b"]{%d,}" % min_len)
+
+    def find(self, data):
+        """Return the set of keywords occurring anywhere in data (bytes)."""
+        if self.backend is None or not data:
+            return set()
+        if self.ignore_case:
+            data = data.lower()
+        found = set()
+        total = len(self.keywords)
+        if self._ac is not None:
+            for _, ks in self._ac.iter(data.decode("latin-1")):
+                found.update(ks)
+                if len(found) == total:
+                    break
+            return found
+        delta = self._delta
+        root = self._root
+        out = self._out
+        for run in self._runs.finditer(data):
+            s = 0
+            for c in run.group():
+                s = delta[s].get(c) or root.get(c, 0)
+                if out[s] is not None:
+                    found.update(out[s])
+                    if len(found) == total:
+                        return found
+        return found
+
+def bench_keyword_matcher(counts=(5, 20, 100, 400, 1600, 6400), payload_len=1400, rounds=200, seed=7):
+    """
+    Benchmark: KeywordMatcher vs a per-keyword `in` loop over random
+    payloads as the keyword count grows. Reports microseconds per payload.
+    """
+    rng = random.Random(seed)
+    payloads = [
+        bytes(rng.choice(b"abcdefghijklmnopqrstuvwxyz0123456789 /=") for _ in range(payload_len))
+        for _ in range(8)
+    ]
+    rows = []
+    for k in counts:
+        kws = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(8)) for _ in range(k)]
+        row = {"keywords": k}
+        matchers = {"python": KeywordMatcher(kws, use_c=False)}
+        if _ahocorasick_mod() is not None:
+            matchers["pyahocorasick"] = KeywordMatcher(kws)
+        for label, m in matchers.items():
+            t = time.perf_counter()
+            for i in range(rounds):
+                m.find(payloads[i % len(payloads)])
+            row[label + "_us"] = round((time.perf_counter() - t) / rounds * 1e6, 1)
+        enc = [kw.encode() for kw in kws]
+        t = time.perf_counter()
+        for i in range(rounds):
+            p = payloads[i % len(payloads)]
+            [kw for kw in enc if kw in p]
+        row["naive_in_us"] = round((time.perf_counter() - t) / rounds * 1e6, 1)
+        rows.append(row)
+    report = {"event": "keyword_matcher_bench", "payload_len": payload_len, "results": rows}
+    print(json.dumps(report, indent=2))
+    return report
+
+def _text(b, limit):
+    return b[:limit].decode("utf-8", errors="ignore")
+
 class PortsAnomalyDetector:
     name = "ports_anomaly"
-    def __init__(self, cfg, log):
+    def __init__(self, cfg, log, np_mod=None):
         self.log = log
+        self.np = np_mod
         self.allowed_tcp = set(cfg.get("allowed_tcp", []))
         self.allowed_udp = set(cfg.get("allowed_udp", []))
+        self._allowed_tcp_arr = list(self.allowed_tcp)
+        self._allowed_udp_arr = list(self.allowed_udp)
 
-    def process(self, pkt):
-        try:
-            if hasattr(pkt, "transport_layer"):
-                layer = pkt.transport_layer
-                src = getattr(getattr(pkt, "ip", None), "src", "")
-                dst = getattr(getattr(pkt, "ip", None), "dst", "")
-                if layer == "TCP":
-                    dport = int(getattr(pkt.tcp, "dstport", -1))
-                    if dport > 0 and dport not in self.allowed_tcp:
-                        return [{
-                            "signal": "unusual_tcp_port",
-                            "severity": 2,
-                            "dst_port": dport,
-                            "src": src,
-                            "dst": dst,
-                        }]
-                elif layer == "UDP":
-                    dport = int(getattr(pkt.udp, "dstport", -1))
-                    if dport > 0 and dport not in self.allowed_udp:
-                        return [{
-                            "signal": "unusual_udp_port",
-                            "severity": 2,
-                            "dst_port": dport,
-                            "src": src,
-                            "dst": dst,
-                        }]
-            else:
-                src = dst = ""
-                if hasattr(pkt, "haslayer") and pkt.haslayer("IP"):
-                    src = pkt["IP"].src
-                    dst = pkt["IP"].dst
-                if hasattr(pkt, "haslayer") and pkt.haslayer("TCP"):
-                    dport = int(pkt["TCP"].dport)
-                    if dport not in self.allowed_tcp:
-                        return [{
-                            "signal": "unusual_tcp_port",
-                            "severity": 2,
-                            "dst_port": dport,
-                            "src": src,
-                            "dst": dst,
-                        }]
-                if hasattr(pkt, "haslayer") and pkt.haslayer("UDP"):
-                    dport = int(pkt["UDP"].dport)
-                    if dport not in self.allowed_udp:
-                        return [{
-                            "signal": "unusual_udp_port",
-                            "severity": 2,
-                            "dst_port": dport,
-                            "src": src,
-                            "dst": dst,
-                        }]
-        except Exception:
+    def process(self, view):
+        if view.dport is None or view.dport <= 0:
             return None
-        return None
+        if view.transport == "TCP":
+            allowed, sig = self.allowed_tcp, "unusual_tcp_port"
+        elif view.transport == "UDP":
+            allowed, sig = self.allowed_udp, "unusual_udp_port"
+        else:
+            return None
+        if view.dport in allowed:
+            return None
+        return [{
+            "signal": sig,
+            "severity": 2,
+            "dst_port": view.dport,
+            "src": view.src,
+            "dst": view.dst,
+        }]
+
+    def process_batch(self, views):
+        """Columnar port check over a micro-batch; one result per view."""
+        if self.np is None:
+            return [self.process(v) for v in views]
+        np = self.np
+        dports = np.fromiter((v.dport if v.dport is not None else -1 for v in views), dtype=np.int64, count=len(views))
+        tcp = np.fromiter((v.transport == "TCP" for v in views), dtype=bool, count=len(views))
+        udp = np.fromiter((v.transport == "UDP" for v in views), dtype=bool, count=len(views))
+        bad = (dports > 0) & (
+            (tcp & ~np.isin(dports, self._allowed_tcp_arr))
+            | (udp & ~np.isin(dports, self._allowed_udp_arr))
+        )
+        out = [None] * len(views)
+        for i in np.flatnonzero(bad):
+            out[i] = self.process(views[i])
+        return out
 
 class PayloadSignalsDetector:
     name = "payload_signals"
     def __init__(self, cfg, log):
         self.log = log
+        self.reconfigure(cfg)
+
+    def reconfigure(self, cfg):
         self.keywords = set(cfg.get("keywords", []))
         self.b64_min = int(cfg.get("base64_min_len", 24))
         self.hex_min = int(cfg.get("hex_min_len", 24))
-        self.b64rx = re.compile(r"[A-Za-z0-9+/=]{%d,}" % self.b64_min)
-        self.hexrx = re.compile(r"[A-Fa-f0-9]{%d,}" % self.hex_min)
-
-    def _payload(self, pkt):
-        try:
-            if hasattr(pkt, "highest_layer"):
-                if hasattr(pkt, "tcp") and hasattr(pkt.tcp, "payload"):
-                    return str(pkt.tcp.payload)
-                if hasattr(pkt, "udp") and hasattr(pkt.udp, "payload"):
-                    return str(pkt.udp.payload)
-            else:
-                if hasattr(pkt, "haslayer") and pkt.haslayer("Raw"):
-                    return pkt["Raw"].load.decode(errors="ignore")
-        except Exception:
-            return ""
-        return ""
-
-    def process(self, pkt):
-        p = self._payload(pkt)
+        self.matcher = KeywordMatcher(self.keywords)
+        # hex digits are a subset of the base64 alphabet, so every hex blob
+        # lies inside a base64-alphabet run: one scan finds both
+        self.blobrx = re.compile(rb"[A-Za-z0-9+/=]{%d,}" % min(self.b64_min, self.hex_min))
+        self.hexrx = re.compile(rb"[A-Fa-f0-9]{%d,}" % self.hex_min)
+
+    def process(self, view):
+        p = view.payload
         if not p:
             return None
         findings = []
-        for kw in self.keywords:
-            if kw in p:
-                findings.append({
-                    "signal": "keyword_in_payload",
-                    "severity": 3,
-                    "keyword": kw,
-                    "payload": p[:256],
-                })
-        for m in self.b64rx.findall(p):
+        for kw in self.matcher.find(p):
             findings.append({
-                "signal": "base64_blob",
-                "severity": 2,
-                "len": len(m),
-                "payload": m[:256],
+                "signal": "keyword_in_payload",
+                "severity": 3,
+                "keyword": kw,
+                "payload": _text(p, 256),
             })
-        for m in self.hexrx.findall(p):
+        hex_blobs = []
+        for m in self.blobrx.findall(p):
+            if len(m) >= self.b64_min:
+                findings.append({
+                    "signal": "base64_blob",
+                    "severity": 2,
+                    "len": len(m),
+                    "payload": _text(m, 256),
+                })
+            if len(m) >= self.hex_min:
+                hex_blobs.extend(self.hexrx.findall(m))
+        for m in hex_blobs:
             findings.append({
                 "signal": "hex_blob",
                 "severity": 2,
                 "len": len(m),
-                "payload": m[:256],
+                "payload": _text(m, 256),
             })
         if not findings:
             return None
-
-        src = dst = ""
-        try:
-            if hasattr(pkt, "ip"):
-                src = getattr(pkt.ip, "src", "")
-                dst = getattr(pkt.ip, "dst", "")
-            elif hasattr(pkt, "haslayer") and pkt.haslayer("IP"):
-                src = pkt["IP"].src
-                dst = pkt["IP"].dst
-        except Exception:
-            pass
         for f in findings:
-            f["src"] = src
-            f["dst"] = dst
+            f["src"] = view.src
+            f["dst"] = view.dst
         return findings
 
+class _FlowTimes:
+    """
+    Fixed-size ring of arrival timestamps for one flow, with running sum and
+    sum of squares of the inter-arrival intervals currently in the ring.
+    """
+    __slots__ = ("buf", "head", "n", "isum", "isq")
+
+    def __init__(self, size):
+        self.buf = array("d", bytes(8 * size))
+        self.head = 0
+        self.n = 0
+        self.isum = 0.0
+        self.isq = 0.0
+
+    def last(self):
+        return self.buf[(self.head + self.n - 1) % len(self.buf)]
+
+    def push(self, ts):
+        size = len(self.buf)
+        if self.n == size:
+            self.pop()
+        if self.n:
+            d = ts - self.last()
+            self.isum += d
+            self.isq += d * d
+        self.buf[(self.head + self.n) % size] = ts
+        self.n += 1
+
+    def pop(self):
+        size = len(self.buf)
+        if self.n >= 2:
+            d = self.buf[(self.head + 1) % size] - self.buf[self.head]
+            self.isum -= d
+            self.isq -= d * d
+        self.head = (self.head + 1) % size
+        self.n -= 1
+        if self.n <= 1:
+            self.isum = self.isq = 0.0
+
+    def expire(self, cutoff):
+        while self.n and self.buf[self.head] < cutoff:
+            self.pop()
+
 class BeaconingDetector:
+    """
+    Flags (src, dst) flows whose inter-arrival times are near-constant:
+    at least min_repeats packets in the window and an interval standard
+    deviation within jitter_tolerance_sec. Per-flow state is a bounded
+    ring with online interval statistics; flows are kept in LRU order,
+    idle ones are evicted and the total is capped at max_flows.
+    """
     name = "beaconing"
-    def __init__(self, cfg, log):
+    def __init__(self, cfg, log, np_mod=None):
         self.log = log
+        self.np = np_mod
         self.win = int(cfg.get("window_sec", 300))
         self.min_rep = int(cfg.get("min_repeats", 5))
         self.jitter = int(cfg.get("jitter_tolerance_sec", 3))
-        self.seen = defaultdict(list)
+        self.max_samples = max(self.min_rep, int(cfg.get("max_samples", 32)))
+        self.max_flows = max(1, int(cfg.get("max_flows", 50000)))
+        self.seen = OrderedDict()  # (src, dst) -> _FlowTimes, least recently seen first
+        self.evicted = 0
+
+    def _record(self, key, ts):
+        flow = self.seen.get(key)
+        if flow is None:
+            flow = self.seen[key] = _FlowTimes(self.max_samples)
+        else:
+            self.seen.move_to_end(key)
+        flow.push(ts)
+        cutoff = ts - self.win
+        flow.expire(cutoff)
+        # LRU front: drop flows idle past the window, then enforce the cap
+        while self.seen:
+            old_key, old = next(iter(self.seen.items()))
+            if old is flow or (old.n and old.last() >= cutoff and len(self.seen) <= self.max_flows):
+                break
+            del self.seen[old_key]
+            self.evicted += 1
 
-    def process(self, pkt):
-        ts = time.time()
-        src = dst = ""
-        try:
-            if hasattr(pkt, "ip"):
-                src = getattr(pkt.ip, "src", "")
-                dst = getattr(pkt.ip, "dst", "")
-            elif hasattr(pkt, "haslayer") and pkt.haslayer("IP"):
-                src = pkt["IP"].src
-                dst = pkt["IP"].dst
-        except Exception:
-            return None
+    def process(self, view):
+        src, dst = view.src, view.dst
         if not src or not dst:
             return None
         key = (src, dst)
-        arr = self.seen[key]
-        arr.append(ts)
-        cutoff = ts - self.win
-        while arr and arr[0] < cutoff:
-            arr.pop(0)
-        if len(arr) >= self.min_rep:
-            intervals = [arr[i+1] - arr[i] for i in range(len(arr)-1)]
-            if intervals:
-                mean = sum(intervals) / len(intervals)
-                devs = [abs(x - mean) for x in intervals]
-                if sum(1 for d in devs if d <= self.jitter) >= max(1, len(devs)-1):
-                    return [{
-                        "signal": "periodic_beaconing",
-                        "severity": 4,
-                        "src": src,
-                        "dst": dst,
-                        "period_sec": round(mean, 2),
-                    }]
-        return None
+        self._record(key, view.ts)
+        return self._check(key)
+
+    def process_batch(self, views):
+        """
+        Record the batch in order, snapshotting each flow's (n, isum, isq)
+        right after its packet; the jitter test then runs columnar over the
+        snapshots. Alerts land on the same packets as with process().
+        """
+        count = len(views)
+        keys = [None] * count
+        ns = array("d", bytes(8 * count))
+        sums = array("d", bytes(8 * count))
+        sqs = array("d", bytes(8 * count))
+        for i, v in enumerate(views):
+            if not v.src or not v.dst:
+                continue
+            key = (v.src, v.dst)
+            self._record(key, v.ts)
+            flow = self.seen[key]
+            keys[i] = key
+            ns[i], sums[i], sqs[i] = flow.n, flow.isum, flow.isq
+        if self.np is None:
+            return [self._evaluate(keys[i], ns[i], sums[i], sqs[i]) if keys[i] else None
+                    for i in range(count)]
+        np = self.np
+        n = np.frombuffer(ns, dtype=np.float64)
+        k = np.maximum(n - 1.0, 1.0)
+        mean = np.frombuffer(sums, dtype=np.float64) / k
+        var = np.maximum(0.0, np.frombuffer(sqs, dtype=np.float64) / k - mean * mean)
+        hit = (n >= self.min_rep) & (np.sqrt(var) <= self.jitter)
+        out = [None] * count
+        for i in np.flatnonzero(hit):
+            out[i] = self._alert(keys[i], float(mean[i]))
+        return out
+
+    def _check(self, key):
+        flow = self.seen.get(key)
+        if flow is None:
+            return None
+        return self._evaluate(key, flow.n, flow.isum, flow.isq)
+
+    def _evaluate(self, key, n, isum, isq):
+        if n < self.min_rep:
+            return None
+        k = n - 1
+        mean = isum / k
+        var = max(0.0, isq / k - mean * mean)
+        if math.sqrt(var) > self.jitter:
+            return None
+        return self._alert(key, mean)
+
+    def _alert(self, key, mean):
+        src, dst = key
+        return [{
+            "signal": "periodic_beaconing",
+            "severity": 4,
+            "src": src,
+            "dst": dst,
+            "period_sec": round(mean, 2),
+        }]
 
 def shannon_entropy(s):
     if not s:
@@ -768,27 +1549,20 @@ def shannon_entropy(s):
 
 class DnsSuspicionDetector:
     name = "dns_suspicion"
-    def __init__(self, cfg, log):
+    def __init__(self, cfg, log, np_mod=None):
         self.log = log
+        self.np = np_mod
         self.th = float(cfg.get("entropy_threshold", 4.0))
         self.long_label = int(cfg.get("long_label_len", 20))
 
-    def process(self, pkt):
-        domain = None
-        try:
-            if hasattr(pkt, "dns") and hasattr(pkt.dns, "qry_name"):
-                domain = pkt.dns.qry_name
-            elif hasattr(pkt, "haslayer") and pkt.haslayer("DNS"):
-                domain = pkt["DNS"].qd.qname.decode()
-        except Exception:
-            domain = None
+    def process(self, view, entropies=None):
+        domain = view.dns_qname
         if not domain:
             return None
-        domain = str(domain)
         labels = domain.split(".")
         suspicious = []
         for L in labels:
-            ent = shannon_entropy(L)
+            ent = entropies[L] if entropies is not None else shannon_entropy(L)
             if ent >= self.th or len(L) >= self.long_label:
                 suspicious.append({"label": L, "entropy": round(ent, 2)})
         if suspicious:
@@ -800,91 +1574,103 @@ class DnsSuspicionDetector:
             }]
         return None
 
+    def process_batch(self, views):
+        """
+        Entropy is computed once per distinct label across the batch, in one
+        columnar pass when NumPy is available; only queries with a label
+        over either threshold build a result.
+        """
+        labels = {}
+        for v in views:
+            if v.dns_qname:
+                for L in v.dns_qname.split("."):
+                    labels.setdefault(L, None)
+        if not labels:
+            return [None] * len(views)
+        if self.np is None:
+            entropies = {L: shannon_entropy(L) for L in labels}
+        else:
+            entropies = dict(zip(labels, self._entropies(list(labels)).tolist()))
+        flagged = {L for L, ent in entropies.items() if ent >= self.th or len(L) >= self.long_label}
+        out = [None] * len(views)
+        for i, v in enumerate(views):
+            if v.dns_qname and not flagged.isdisjoint(v.dns_qname.split(".")):
+                out[i] = self.process(v, entropies)
+        return out
+
+    def _entropies(self, labels):
+        """Shannon entropy of each label from one (label, char) count table."""
+        np = self.np
+        lengths = np.fromiter((len(L) for L in labels), dtype=np.int64, count=len(labels))
+        codes = np.frombuffer("".join(labels).encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+        rows = np.repeat(np.arange(len(labels), dtype=np.int64), lengths)
+        pairs, counts = np.unique((rows << 21) | codes, return_counts=True)
+        p = counts / lengths[pairs >> 21]
+        return 0.0 - np.bincount(pairs >> 21, weights=p * np.log2(p), minlength=len(labels))
+
 class HiddenTextCommandsDetector:
     name = "hidden_text_commands"
     def __init__(self, cfg, log):
         self.log = log
-        self.cmd_keywords = set(cfg.get("cmd_keywords", []))
-        self.rx_zero_width = re.compile(r"[\u200B-\u200D\u2060\uFEFF]")
-        self.rx_html_comment = re.compile(r"<!--(.*?)-->", re.DOTALL | re.IGNORECASE)
-        self.rx_js_eval = re.compile(r"(eval|Function|atob|decodeURIComponent)\s*\(", re.IGNORECASE)
-        self.rx_js_unicode = re.compile(r"\\u[0-9A-Fa-f]{4}")
-        self.rx_hex_blob = re.compile(r"[A-Fa-f0-9]{24,}")
+        # UTF-8 encodings of U+200B..U+200D, U+2060, U+FEFF
+        self.rx_zero_width = re.compile(b"\xe2\x80[\x8b-\x8d]|\xe2\x81\xa0|\xef\xbb\xbf")
+        # one search per indicator class: a combined alternation would let a
+        # hex run consume the start of a JS indicator (e.g. "...aaeval(")
+        self.rx_js = re.compile(
+            rb"(?:eval|Function|atob|decodeURIComponent)\s*\(|\\u[0-9A-Fa-f]{4}",
+            re.IGNORECASE,
+        )
+        self.rx_hex = re.compile(rb"[A-Fa-f0-9]{24,}")
         self.max_report = 512
+        self.reconfigure(cfg)
 
-    def _payload(self, pkt):
-        try:
-            if hasattr(pkt, "highest_layer"):
-                if hasattr(pkt, "http") and hasattr(pkt.http, "file_data"):
-                    return str(pkt.http.file_data)
-                if hasattr(pkt, "data") and hasattr(pkt.data, "data"):
-                    return str(pkt.data.data)
-            else:
-                if hasattr(pkt, "haslayer") and pkt.haslayer("Raw"):
-                    return pkt["Raw"].load.decode(errors="ignore")
-        except Exception:
-            return ""
-        return ""
-
-    def _deobfuscate(self, s):
-        s = self.rx_zero_width.sub("", s)
-        for m in self.rx_html_comment.finditer(s):
-            content = m.group(1)
-            if any(kw in content for kw in self.cmd_keywords):
-                s += "\n" + content
-        return s
-
-    def process(self, pkt):
-        p = self._payload(pkt)
+    def reconfigure(self, cfg):
+        self.cmd_keywords = set(cfg.get("cmd_keywords", []))
+        self.matcher = KeywordMatcher(self.cmd_keywords, ignore_case=True)
+
+    def _deobfuscate(self, b):
+        # HTML comment bodies are part of the payload already, so stripping
+        # zero-width characters is all the keyword scan needs
+        return self.rx_zero_width.sub(b"", b)
+
+    def process(self, view):
+        p = view.app_payload
         if not p:
             return None
         raw = p
         p = self._deobfuscate(p)
         hits = []
-        if self.rx_js_eval.search(p) or self.rx_js_unicode.search(p):
+        if self.rx_js.search(p):
             hits.append("obfuscated_js")
-        if self.rx_hex_blob.search(p):
+        if self.rx_hex.search(p):
             hits.append("hex_obfuscation")
-        lower = p.lower()
-        for kw in self.cmd_keywords:
-            if kw in lower:
-                hits.append("cmd_keyword:" + kw)
+        for kw in sorted(self.matcher.find(p)):
+            hits.append("cmd_keyword:" + kw)
         if not hits:
             return None
 
-        src = dst = ""
-        try:
-            if hasattr(pkt, "ip"):
-                src = getattr(pkt.ip, "src", "")
-                dst = getattr(pkt.ip, "dst", "")
-            elif hasattr(pkt, "haslayer") and pkt.haslayer("IP"):
-                src = pkt["IP"].src
-                dst = pkt["IP"].dst
-        except Exception:
-            pass
-
         return [{
             "signal": "hidden_text_command",
             "severity": 4,
-            "src": src,
-            "dst": dst,
+            "src": view.src,
+            "dst": view.dst,
             "indicators": hits,
-            "payload": raw[:self.max_report],
+            "payload": _text(raw, self.max_report),
         }]
 
-def load_detectors(cfg_plugins, log):
+def load_detectors(cfg_plugins, log, np_mod=None):
     dets = []
     if cfg_plugins.get("ports_anomaly", {}).get("enabled", True):
-        d = PortsAnomalyDetector(cfg_plugins["ports_anomaly"], log)
+        d = PortsAnomalyDetector(cfg_plugins["ports_anomaly"], log, np_mod=np_mod)
         dets.append(d); DETECTOR_ENABLED[d.name] = True
     if cfg_plugins.get("payload_signals", {}).get("enabled", True):
         d = PayloadSignalsDetector(cfg_plugins["payload_signals"], log)
         dets.append(d); DETECTOR_ENABLED[d.name] = True
     if cfg_plugins.get("beaconing", {}).get("enabled", True):
-        d = BeaconingDetector(cfg_plugins["beaconing"], log)
+        d = BeaconingDetector(cfg_plugins["beaconing"], log, np_mod=np_mod)
         dets.append(d); DETECTOR_ENABLED[d.name] = True
     if cfg_plugins.get("dns_suspicion", {}).get("enabled", True):
-        d = DnsSuspicionDetector(cfg_plugins["dns_suspicion"], log)
+        d = DnsSuspicionDetector(cfg_plugins["dns_suspicion"], log, np_mod=np_mod)
         dets.append(d); DETECTOR_ENABLED[d.name] = True
     if cfg_plugins.get("hidden_text_commands", {}).get("enabled", True):
         d = HiddenTextCommandsDetector(cfg_plugins["hidden_text_commands"], log)
@@ -892,6 +1678,52 @@ def load_detectors(cfg_plugins, log):
     log.info({"event": "detectors_loaded", "count": len(dets)})
     return dets
 
+def reload_detector_config(dets, cfg_plugins, log):
+    """Push reloaded plugin config into detectors that support it (rebuilds matchers)."""
+    for d in dets:
+        name = getattr(d, "name", "")
+        if hasattr(d, "reconfigure") and name in cfg_plugins:
+            try:
+                d.reconfigure(cfg_plugins[name])
+            except Exception as e:
+                log.error({"event": "detector_reconfigure_error", "name": name, "error": str(e)})
+    log.info({"event": "detectors_reconfigured"})
+
+def _process_each(d, views, log):
+    """Per-view fallback: a failing view only loses its own result."""
+    results = []
+    for v in views:
+        try:
+            results.append(d.process(v))
+        except Exception as e:
+            log.error({"event": "detector_error", "error": str(e)})
+            results.append(None)
+    return results
+
+def run_detectors_batch(dets, views, log):
+    """
+    Run detectors over a micro-batch. Detectors with process_batch() see the
+    whole batch at once; others (including extensions) run per view. If a
+    batch call fails, that detector is re-run per view so one bad packet
+    doesn't drop the rest of the batch. Returns one event list per view.
+    """
+    events = [[] for _ in views]
+    for d in dets:
+        if not DETECTOR_ENABLED.get(getattr(d, "name", ""), True):
+            continue
+        if hasattr(d, "process_batch"):
+            try:
+                results = d.process_batch(views)
+            except Exception as e:
+                log.error({"event": "detector_error", "error": str(e), "fallback": "per_view"})
+                results = _process_each(d, views, log)
+        else:
+            results = _process_each(d, views, log)
+        for i, ev in enumerate(results):
+            if ev:
+                events[i].extend(ev if isinstance(ev, list) else [ev])
+    return events
+
 # =============================================================================
 # AI judge
 # =============================================================================
@@ -908,40 +1740,23 @@ class AIJudge:
         self.features = []
         self.trained = False
 
-    def _features_from_pkt(self, pkt):
-        length = 0
-        proto = 0
-        src = dst = ""
-        try:
-            if hasattr(pkt, "length"):
-                length = int(pkt.length)
-            elif hasattr(pkt, "wirelen"):
-                length = int(pkt.wirelen)
-        except Exception:
-            pass
-        try:
-            if hasattr(pkt, "ip"):
-                src = getattr(pkt.ip, "src", "")
-                dst = getattr(pkt.ip, "dst", "")
-                proto = int(getattr(pkt.ip, "proto", 0))
-            elif hasattr(pkt, "haslayer") and pkt.haslayer("IP"):
-                ip = pkt["IP"]
-                src = ip.src
-                dst = ip.dst
-                proto = int(ip.proto)
-        except Exception:
-            pass
-        return [length, proto], f"{src}>{dst}"
+    def _features_from_view(self, view):
+        return [view.length, view.proto], f"{view.src}>{view.dst}"
 
-    def observe(self, pkt):
+    def observe(self, view):
         if not self.enabled:
             return None
-        feats, fid = self._features_from_pkt(pkt)
-        self.features.append((feats, fid, time.time()))
+        feats, fid = self._features_from_view(view)
+        self.features.append((feats, fid, view.ts))
         if len(self.features) > self.bootstrap * 4:
             self.features = self.features[-self.bootstrap * 4 :]
         return feats, fid
 
+    def observe_batch(self, views):
+        if not self.enabled:
+            return None
+        return [self.observe(v) for v in views]
+
     def maybe_train(self):
         if not self.enabled or self.trained:
             return
@@ -973,6 +1788,18 @@ class AIJudge:
             self.log.error({"event": "ai_score_error", "error": str(e)})
             return {"iforest": 0.0}
 
+    def score_batch(self, obs_list):
+        """Score a whole batch with a single decision_function call."""
+        if not self.enabled or not self.trained or self.model is None:
+            return [{"iforest": 0.0} for _ in obs_list]
+        try:
+            X = self.np.array([o[0] for o in obs_list], dtype=float)
+            scores = -self.model.decision_function(X)
+            return [{"iforest": float(sc), "fid": o[1]} for sc, o in zip(scores, obs_list)]
+        except Exception as e:
+            self.log.error({"event": "ai_score_error", "error": str(e)})
+            return [{"iforest": 0.0} for _ in obs_list]
+
 def ensemble_severity(rule_sev, ai_scores, weights, baseline_scale):
     if not ai_scores:
         return rule_sev, {"rule": rule_sev, "iforest": 0.0, "baseline": 0.0}
@@ -985,19 +1812,338 @@ def ensemble_severity(rule_sev, ai_scores, weights, baseline_scale):
     sev = max(1, min(5, int(round(raw))))
     return sev, {"rule": rule_sev, "iforest": ifor, "baseline": base, "raw": raw}
 
+# =============================================================================
+# Packet processing (detectors -> AI ensemble -> host profiling -> pipeline)
+# =============================================================================
+
+class PacketProcessor:
+    """
+    Runs one packet, or a micro-batch of packets, through the detector stack.
+    `extensions` is the live list owned by the improver worker, so newly
+    loaded extensions are picked up without rebuilding the processor.
+    """
+    def __init__(self, log, detectors, extensions, aijudge, host_profiler, pipeline, weights, baseline_scale):
+        self.log = log
+        self.detectors = detectors
+        self.extensions = extensions
+        self.aijudge = aijudge
+        self.host_profiler = host_profiler
+        self.pipeline = pipeline
+        self.weights = weights
+        self.baseline_scale = baseline_scale
+
+    def process_one(self, pkt):
+        view = PacketView.from_packet(pkt)
+        ai_scores = None
+        if self.aijudge:
+            obs = self.aijudge.observe(view)
+            if obs:
+                ai_scores = self.aijudge.score(obs)
+        events = []
+        for d in self.detectors + self.extensions:
+            if not DETECTOR_ENABLED.get(getattr(d, "name", ""), True):
+                continue
+            try:
+                ev = d.process(view)
+                if ev:
+                    events.extend(ev if isinstance(ev, list) else [ev])
+            except Exception as e:
+                self.log.error({"event": "detector_error", "error": str(e)})
+        self._emit(view, events, ai_scores)
+
+    def process_batch(self, pkts):
+        self.process_views([PacketView.from_packet(p) for p in pkts])
+
+    def process_views(self, views):
+        ai_scores = [None] * len(views)
+        if self.aijudge:
+            obs = self.aijudge.observe_batch(views)
+            if obs:
+                ai_scores = self.aijudge.score_batch(obs)
+        events = run_detectors_batch(self.detectors + self.extensions, views, self.log)
+        for view, evs, scores in zip(views, events, ai_scores):
+            if evs:
+                self._emit(view, evs, scores)
+
+    def _emit(self, view, events, ai_scores):
+        for ev in events:
+            rule = ev.get("severity", 1)
+            sev, breakdown = ensemble_severity(rule, ai_scores, self.weights, self.baseline_scale)
+            ev["severity"] = sev
+            ev["explain"] = breakdown
+
+            # host profiling: anomaly + DNS/beacon info
+            sig = ev.get("signal", "")
+            dns_entropy = None
+            beacon_flag = False
+            if sig == "suspicious_dns_label":
+                dets = ev.get("details", [])
+                if dets:
+                    dns_entropy = max(d.get("entropy", 0) for d in dets)
+            if sig == "periodic_beaconing":
+                beacon_flag = True
+
+            self.host_profiler.observe_packet(
+                view,
+                src=ev.get("src"),
+                dst=ev.get("dst"),
+                anomaly=True,
+                dns_entropy=dns_entropy,
+                dst_port=ev.get("dst_port"),
+                beacon=beacon_flag,
+            )
+
+            self.pipeline.ingest(ev)
+
+# =============================================================================
+# Sharded processing (worker processes with per-flow affinity)
+# =============================================================================
+
+class _ShardSink:
+    """Stands in for Pipeline inside a shard; alerts are shipped to the parent."""
+    def __init__(self):
+        self.events = []
+
+    def ingest(self, ev):
+        self.events.append(ev)
+
+class _ShardProfiler:
+    """
+    Stands in for HostProfiler inside a shard. Flows are sharded by (src, dst),
+    so one host's packets span shards; observations are shipped to the parent's
+    HostProfiler, which keeps the only per-host aggregates.
+    """
+    def __init__(self):
+        self.obs = []
+
+    def observe_packet(self, view, src=None, dst=None, anomaly=False, dns_entropy=None, dst_port=None, beacon=False):
+        self.obs.append((
+            view.ts,
+            view.length or 0,
+            view.src if src is None else src,
+            view.dst if dst is None else dst,
+            anomaly,
+            dns_entropy,
+            view.dport if dst_port is None else dst_port,
+            beacon,
+        ))
+
+class _ShardLogHandler(BoundedQueueHandler):
+    """Ships shard log records to the parent, which writes them through its own log pipeline."""
+    def __init__(self, q, idx):
+        super().__init__(q)
+        self.idx = idx
+
+    def prepare(self, record):
+        if isinstance(record.msg, dict):
+            record.msg = dict(record.msg, shard=self.idx)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.args = None
+        return record
+
+def _shard_main(idx, cfg, in_q, out_q, log_q):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)  # parent forwards reloads
+    log = logging.getLogger(f"netmesh.shard{idx}")
+    log.handlers.clear()
+    log.propagate = False
+    log.setLevel(getattr(logging, cfg["logging"]["level"]))
+    log.addHandler(_ShardLogHandler(log_q, idx))
+
+    np_mod = IF_cls = None
+    try:
+        import numpy as np_mod
+        from sklearn.ensemble import IsolationForest as IF_cls
+    except Exception:
+        pass
+
+    detectors = load_detectors(cfg["plugins"], log, np_mod=np_mod)
+    ext_dir = cfg["self_improve"].get("extensions_dir", "extensions")
+    extensions = load_extensions(ext_dir, log, {}, None)
+    aijudge = None
+    if cfg["ai"].get("enabled", True) and IF_cls and np_mod is not None:
+        aijudge = AIJudge(cfg["ai"], log, np_mod, IF_cls)
+    profiler = _ShardProfiler()
+    sink = _ShardSink()
+    processor = PacketProcessor(
+        log, detectors, extensions, aijudge, profiler, sink,
+        cfg["ai"]["weights"], cfg["ai"]["baseline_scale"],
+    )
+    snap_every = float(cfg["service"].get("shard_snapshot_sec", 5))
+    ext_every = int(cfg["self_improve"].get("generation_interval_sec", 60))
+    last_snap = last_train = last_ext = time.time()
+    processed = 0
+
+    while True:
+        try:
+            item = in_q.get(timeout=0.5)
+        except queue.Empty:
+            item = ()
+        if item is None:
+            break
+        if item:
+            kind, data = item
+            if kind == "views":
+                processor.process_views([PacketView.from_tuple(t) for t in data])
+                processed += len(data)
+            elif kind == "toggles":
+                DETECTOR_ENABLED.clear()
+                DETECTOR_ENABLED.update(data)
+            elif kind == "plugins":
+                reload_detector_config(detectors, data, log)
+        if sink.events:
+            out_q.put(("alerts", idx, sink.events))
+            sink.events = []
+        if profiler.obs:
+            out_q.put(("hosts", idx, profiler.obs))
+            profiler.obs = []
+        now = time.time()
+        if aijudge and now - last_train > 10:
+            last_train = now
+            aijudge.maybe_train()
+        if now - last_ext > ext_every:
+            last_ext = now
+            names = {getattr(d, "name", "") for d in extensions}
+            for e in load_extensions(ext_dir, log, {}, None):
+                if getattr(e, "name", "") not in names:
+                    extensions.append(e)
+        if now - last_snap > snap_every:
+            last_snap = now
+            out_q.put(("stats", idx, {"processed": processed}))
+    out_q.put(("stats", idx, {"processed": processed}))
+
+class ShardedEngine:
+    """
+    Fans decoded packets out to worker processes keyed by the (src, dst) flow,
+    so per-flow detector state (beaconing) stays within one shard. Alerts come
+    back to the parent Pipeline, host observations to the parent HostProfiler
+    (a host spans shards), and shard log records to the parent's log pipeline.
+    """
+    def __init__(self, cfg, log, n_shards, host_profiler):
+        self.log = log
+        self.n = n_shards
+        self.host_profiler = host_profiler
+        ctx = multiprocessing.get_context()
+        qmax = int(cfg["service"].get("shard_queue_max", 256))
+        self.in_qs = [ctx.Queue(maxsize=qmax) for _ in range(n_shards)]
+        self.out_q = ctx.Queue()
+        self.log_q = ctx.Queue(maxsize=int(cfg["logging"].get("async_queue_max", 20000)))
+        self.procs = [
+            ctx.Process(target=_shard_main, args=(i, cfg, self.in_qs[i], self.out_q, self.log_q), daemon=True)
+            for i in range(n_shards)
+        ]
+        self.processed = [0] * n_shards
+        self.dropped = 0
+        self._toggles = dict(DETECTOR_ENABLED)
+
+    def start(self):
+        for p in self.procs:
+            p.start()
+        self.log.info({"event": "shards_started", "count": self.n})
+
+    def _shard_of(self, view):
+        return zlib.crc32(("%s>%s" % view.flow_key()).encode()) % self.n
+
+    def dispatch(self, views):
+        if DETECTOR_ENABLED != self._toggles:
+            self._toggles = dict(DETECTOR_ENABLED)
+            for q in self.in_qs:
+                try:
+                    q.put(("toggles", self._toggles), timeout=0.5)
+                except queue.Full:
+                    pass
+        parts = [[] for _ in range(self.n)]
+        for v in views:
+            parts[self._shard_of(v)].append(v.to_tuple())
+        for i, part in enumerate(parts):
+            if not part:
+                continue
+            try:
+                self.in_qs[i].put_nowait(("views", part))
+            except queue.Full:
+                self.dropped += len(part)
+
+    def reconfigure(self, cfg_plugins):
+        for q in self.in_qs:
+            try:
+                q.put(("plugins", cfg_plugins), timeout=0.5)
+            except queue.Full:
+                self.log.error({"event": "shard_reconfigure_dropped"})
+
+    def drain_logs(self):
+        while True:
+            try:
+                rec = self.log_q.get_nowait()
+            except queue.Empty:
+                return
+            self.log.handle(rec)
+
+    def drain(self, pipeline):
+        self.drain_logs()
+        while True:
+            try:
+                kind, idx, data = self.out_q.get_nowait()
+            except queue.Empty:
+                return
+            if kind == "alerts":
+                for ev in data:
+                    pipeline.ingest(ev)
+            elif kind == "hosts":
+                observe = self.host_profiler.observe
+                for obs in data:
+                    observe(*obs)
+            elif kind == "stats":
+                self.processed[idx] = data["processed"]
+
+    def stats(self):
+        return {"shards": self.n, "processed": list(self.processed), "dropped": self.dropped}
+
+    def close(self):
+        for q in self.in_qs:
+            try:
+                q.put(None, timeout=0.5)
+            except queue.Full:
+                pass
+        for p in self.procs:
+            p.join(timeout=2)
+        self.drain_logs()
+
 # =============================================================================
 # Active probes
 # =============================================================================
 
+class HostRateLimiter:
+    """At most one probe per host every `rate` seconds; shared by probes and scanner."""
+    def __init__(self, rate):
+        self.rate = rate
+        self.last_probe = {}
+        self.lock = threading.Lock()
+
+    def allow(self, host):
+        now = time.time()
+        with self.lock:
+            t = self.last_probe.get(host, 0)
+            if now - t < self.rate:
+                return False
+            self.last_probe[host] = now
+            if len(self.last_probe) > 65536:
+                cutoff = now - self.rate
+                self.last_probe = {h: ts for h, ts in self.last_probe.items() if ts >= cutoff}
+            return True
+
 class ProbeAPI:
-    def __init__(self, cfg, log, pipeline, requests_mod):
+    def __init__(self, cfg, log, pipeline, requests_mod, scan_engine=None):
         self.log = log
         self.pipeline = pipeline
         self.requests = requests_mod
         self.q = queue.Queue(maxsize=cfg.get("queue_max", 1000))
         self.timeout = float(cfg.get("timeout_sec", 1.0))
         self.rate = int(cfg.get("rate_limit_per_host_sec", 5))
-        self.last_probe = {}
+        self.limiter = HostRateLimiter(self.rate)
+        self.scan_engine = scan_engine
         self.stop = False
 
     def enqueue_http(self, url):
@@ -1013,12 +2159,7 @@ class ProbeAPI:
             self.log.error({"event": "probe_queue_full"})
 
     def _allow_host(self, host):
-        now = time.time()
-        t = self.last_probe.get(host, 0)
-        if now - t < self.rate:
-            return False
-        self.last_probe[host] = now
-        return True
+        return self.limiter.allow(host)
 
     def worker(self):
         while not self.stop and RUNNING:
@@ -1060,24 +2201,41 @@ class ProbeAPI:
     def _do_tcp(self, host, port):
         if not self._allow_host(host):
             return
+        if self.scan_engine is not None:
+            # non-blocking: the result is ingested from the scan engine loop
+            fut = self.scan_engine.submit_probe(host, port, self.timeout)
+            fut.add_done_callback(lambda f: self._tcp_result(host, port, f))
+            return
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             s.settimeout(self.timeout)
             try:
-                if s.connect_ex((host, port)) == 0:
-                    self.pipeline.ingest({
-                        "signal": "probe_tcp_open",
-                        "severity": 2,
-                        "host": host,
-                        "port": port,
-                    })
+                self._report_tcp(host, port, s.connect_ex((host, port)) == 0, None)
             except Exception as e:
-                self.pipeline.ingest({
-                    "signal": "probe_tcp_error",
-                    "severity": 2,
-                    "host": host,
-                    "port": port,
-                    "error": str(e),
-                })
+                self._report_tcp(host, port, False, e)
+
+    def _tcp_result(self, host, port, fut):
+        try:
+            is_open, err = fut.result()
+        except Exception as e:
+            is_open, err = False, e
+        self._report_tcp(host, port, is_open, err)
+
+    def _report_tcp(self, host, port, is_open, err):
+        if err is not None:
+            self.pipeline.ingest({
+                "signal": "probe_tcp_error",
+                "severity": 2,
+                "host": host,
+                "port": port,
+                "error": str(err),
+            })
+        elif is_open:
+            self.pipeline.ingest({
+                "signal": "probe_tcp_open",
+                "severity": 2,
+                "host": host,
+                "port": port,
+            })
 
     def close(self):
         self.stop = True
@@ -1086,8 +2244,82 @@ class ProbeAPI:
 # Scanner
 # =============================================================================
 
+class AsyncScanEngine:
+    """
+    Concurrent TCP connect engine on a private asyncio loop (daemon thread).
+    Callers submit work from any thread and get concurrent.futures.Future
+    objects back; scan results stream out through a callback per host.
+    """
+    def __init__(self, log, concurrency=256):
+        self.log = log
+        self.concurrency = max(1, int(concurrency))
+        self.loop = None
+        self.thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self.loop is not None:
+                return
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+            self.thread.start()
+
+    async def _check(self, host, port, timeout):
+        """(open, error): refused/timeout/unreachable are closed, not errors (as connect_ex)."""
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        except socket.gaierror as e:
+            return False, e
+        except (asyncio.TimeoutError, OSError):
+            return False, None
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except Exception:
+            pass
+        return True, None
+
+    async def _scan(self, hosts, ports, timeout, allow_host, on_host):
+        hosts = iter(hosts)
+        done = 0
+
+        async def worker():
+            nonlocal done
+            for host in hosts:
+                if allow_host is not None and not allow_host(host):
+                    continue
+                results = await asyncio.gather(*(self._check(host, p, timeout) for p in ports))
+                done += 1
+                open_ports = [p for p, (is_open, _) in zip(ports, results) if is_open]
+                if open_ports:
+                    try:
+                        on_host(host, open_ports)
+                    except Exception as e:
+                        self.log.error({"event": "scan_result_error", "error": str(e)})
+
+        # each worker scans one host's ports at once, so in-flight connects
+        # stay at or below `concurrency`
+        n_workers = max(1, self.concurrency // max(1, len(ports)))
+        await asyncio.gather(*(worker() for _ in range(n_workers)))
+        return done
+
+    def submit_probe(self, host, port, timeout):
+        self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._check(host, port, timeout), self.loop)
+
+    def submit_scan(self, hosts, ports, timeout, on_host, allow_host=None):
+        self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(
+            self._scan(hosts, list(ports), timeout, allow_host, on_host), self.loop
+        )
+
+    def close(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
 class NetworkScanner:
-    def __init__(self, cfg, log, pipeline):
+    def __init__(self, cfg, log, pipeline, engine=None, limiter=None):
         self.log = log
         self.pipeline = pipeline
         self.interval = int(cfg.get("scan_interval_sec", 900))
@@ -1095,6 +2327,9 @@ class NetworkScanner:
         self.max_ports = int(cfg.get("scanner_max_ports", 100))
         self.last_scan = 0
         self.ports = [22, 80, 443, 3389, 8080, 8443][: self.max_ports]
+        self.engine = engine or AsyncScanEngine(log, cfg.get("scanner_concurrency", 256))
+        self.limiter = limiter
+        self.running = None  # Future of the scan in progress
 
     def _guess_cidr(self):
         try:
@@ -1110,35 +2345,42 @@ class NetworkScanner:
         for ip in net.hosts():
             yield str(ip)
 
-    def _scan_host(self, ip):
-        open_ports = []
-        for port in self.ports:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(self.timeout)
-                try:
-                    if s.connect_ex((ip, port)) == 0:
-                        open_ports.append(port)
-                except Exception:
-                    continue
-        return open_ports
+    def _on_host(self, ip, ports):
+        self.pipeline.ingest({
+            "signal": "scan_open_ports",
+            "severity": 2,
+            "ip": ip,
+            "open_ports": ports,
+        })
+
+    def _on_done(self, cidr, started, fut):
+        try:
+            hosts = fut.result()
+            self.log.info({"event": "scanner_done", "cidr": cidr, "hosts": hosts,
+                           "elapsed_sec": round(time.time() - started, 2)})
+        except Exception as e:
+            self.log.error({"event": "scanner_error", "cidr": cidr, "error": str(e)})
 
     def maybe_scan(self, cidr):
+        """Start a scan if due; results stream into the pipeline as hosts finish."""
         now = time.time()
         if now - self.last_scan < self.interval:
             return
+        if self.running is not None and not self.running.done():
+            return  # previous scan still in flight; do not stack scans
         self.last_scan = now
-        cidr = cidr or self._guess_cidr()
+        cidr = cidr if cidr and cidr != "auto" else self._guess_cidr()
         self.log.info({"event": "scanner_start", "cidr": cidr})
-        for ip in self._iter_hosts(cidr):
-            ports = self._scan_host(ip)
-            if ports:
-                self.pipeline.ingest({
-                    "signal": "scan_open_ports",
-                    "severity": 2,
-                    "ip": ip,
-                    "open_ports": ports,
-                })
-        self.log.info({"event": "scanner_done"})
+        allow = self.limiter.allow if self.limiter is not None else None
+        self.running = self.engine.submit_scan(
+            self._iter_hosts(cidr), self.ports, self.timeout, self._on_host, allow_host=allow,
+        )
+        self.running.add_done_callback(lambda f, c=cidr, t=now: self._on_done(c, t, f))
+
+    def close(self):
+        if self.running is not None:
+            self.running.cancel()
+        self.engine.close()
 
 # =============================================================================
 # Self-improver + extensions
@@ -1182,7 +2424,8 @@ class Detector:
         self.log = log
         self.probes = probes
 
-    def process(self, pkt):
+    def process(self, view):
+        # view: PacketView (src, dst, dport, payload bytes, ...; raw packet in view.raw)
         # Placeholder: logic can be refined later
         return None
 '''
@@ -1272,6 +2515,7 @@ class MeshHTTPServer:
                         "alerts_by_signal": dict(pipeline.counts),
                         "peers": list(server_peers),
                         "host_risks": host_risk_model.get_risks() if host_risk_model else {},
+                        "dedup": pipeline.dedup.stats(),
                     }
                     b = json.dumps(body).encode()
                     self2.send_response(200)
@@ -1478,11 +2722,64 @@ class BackendController:
         self.stop_flag = False
 
 
+class _Inotify:
+    """Minimal ctypes inotify directory watch (Linux only); raises OSError if unavailable."""
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    def __init__(self, directory):
+        import ctypes, ctypes.util
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify requires Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = (self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_FROM
+                | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE)
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, "inotify_add_watch failed")
+
+    def wait(self, timeout):
+        """Block until something changed in the directory (or timeout)."""
+        import select
+        r, _, _ = select.select([self.fd], [], [], timeout)
+        if r:
+            try:
+                while os.read(self.fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+        return bool(r)
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
 class LogTailer:
-    def __init__(self, path, queue_obj, on_status):
+    """
+    Follows alerts.jsonl and pushes parsed records to the GUI queue in
+    batches (one list per read). Wakes on inotify events for the log
+    directory, falling back to polling, reads all new bytes at once and
+    reopens the file when RotatingFileHandler rotates or truncates it.
+    """
+    READ_CHUNK = 1 << 20
+
+    def __init__(self, path, queue_obj, on_status, poll_sec=0.2):
         self.path = path
         self.queue = queue_obj
         self.on_status = on_status
+        self.poll_sec = poll_sec
         self.stop_flag = False
 
     def start(self):
@@ -1492,28 +2789,81 @@ class LogTailer:
     def stop(self):
         self.stop_flag = True
 
+    def _parse(self, lines):
+        try:
+            return json.loads(b"[" + b",".join(lines) + b"]")
+        except Exception:
+            out = []
+            for line in lines:
+                try:
+                    out.append(json.loads(line))
+                except Exception:
+                    self.on_status("Invalid JSON in log")
+            return out
+
+    def _drain(self, f, pending):
+        """Read everything new from f; returns the trailing partial line."""
+        while True:
+            chunk = f.read(self.READ_CHUNK)
+            if not chunk:
+                return pending
+            data = pending + chunk
+            cut = data.rfind(b"\n")
+            if cut < 0:
+                pending = data
+                continue
+            pending = data[cut + 1:]
+            lines = [ln for ln in data[:cut].split(b"\n") if ln.strip()]
+            if lines:
+                batch = self._parse(lines)
+                if batch:
+                    self.queue.put(batch)
+
+    def _rotated(self, f):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return True
+        fst = os.fstat(f.fileno())
+        return st.st_ino != fst.st_ino or st.st_dev != fst.st_dev or st.st_size < f.tell()
+
     def _run(self):
         while not os.path.exists(self.path) and not self.stop_flag:
             time.sleep(0.5)
         if self.stop_flag:
             return
+        watcher = None
         try:
-            with open(self.path, "r", encoding="utf-8") as f:
-                f.seek(0, os.SEEK_END)
-                while not self.stop_flag:
-                    pos = f.tell()
-                    line = f.readline()
-                    if not line:
-                        time.sleep(0.2)
-                        f.seek(pos)
-                        continue
-                    try:
-                        data = json.loads(line.strip())
-                        self.queue.put(data)
-                    except Exception:
-                        self.on_status("Invalid JSON in log")
+            watcher = _Inotify(os.path.dirname(os.path.abspath(self.path)))
+        except Exception:
+            watcher = None  # polling fallback
+        try:
+            f = open(self.path, "rb")
+            f.seek(0, os.SEEK_END)
+            pending = b""
+            while not self.stop_flag:
+                pending = self._drain(f, pending)
+                if self._rotated(f):
+                    # finish the old file, then follow the new one from the start
+                    pending = self._drain(f, pending)
+                    f.close()
+                    while not os.path.exists(self.path) and not self.stop_flag:
+                        time.sleep(self.poll_sec)
+                    if self.stop_flag:
+                        return
+                    f = open(self.path, "rb")
+                    pending = b""
+                    continue
+                if watcher is not None:
+                    watcher.wait(1.0)
+                else:
+                    time.sleep(self.poll_sec)
+            f.close()
         except Exception as e:
             self.on_status(f"Log tailer error: {e}")
+        finally:
+            if watcher is not None:
+                watcher.close()
 
 
 class NetmeshGUI(tk.Tk):
@@ -1700,41 +3050,46 @@ class NetmeshGUI(tk.Tk):
 
     # log handling
     def _poll_log_queue(self):
+        alerts = []
         try:
             while True:
-                msg = self.log_queue.get_nowait()
-                self._handle_log(msg)
+                batch = self.log_queue.get_nowait()
+                for msg in (batch if isinstance(batch, list) else [batch]):
+                    m = msg.get("msg", {}) if isinstance(msg, dict) else {}
+                    if isinstance(m, dict) and m.get("event") == "alert":
+                        alerts.append(m.get("data", {}))
         except queue.Empty:
             pass
+        if alerts:
+            self._append_alerts(alerts)
         self.after(200, self._poll_log_queue)
 
-    def _handle_log(self, msg):
-        m = msg.get("msg", {})
-        if isinstance(m, dict) and m.get("event") == "alert":
-            data = m.get("data", {})
-            self._append_alert(data)
-
-    def _append_alert(self, data):
+    def _append_alerts(self, alerts):
+        """Render a whole batch with one text insert and one stats/graph refresh."""
         ts = time.strftime("%H:%M:%S")
-        sig = data.get("signal", "unknown")
-        sev = data.get("severity", "?")
-        src = data.get("src", "")
-        dst = data.get("dst", "")
-        line = f"[{ts}] sev={sev} {sig} {src} -> {dst}\n"
-        self.txt_alerts.insert("end", line)
+        lines = []
+        new_counts = defaultdict(int)
+        for data in alerts:
+            sig = data.get("signal", "unknown")
+            sev = data.get("severity", "?")
+            src = data.get("src", "")
+            dst = data.get("dst", "")
+            lines.append(f"[{ts}] sev={sev} {sig} {src} -> {dst}\n")
+            new_counts[sig] += 1
+        self.txt_alerts.insert("end", "".join(lines))
         self.txt_alerts.see("end")
-        self._update_stats(sig)
+        self._update_stats(new_counts)
 
-    def _update_stats(self, sig):
-        self.alert_counts[sig] += 1
+    def _update_stats(self, new_counts):
+        for sig, n in new_counts.items():
+            self.alert_counts[sig] += n
         # tree
-        for iid in self.tree_stats.get_children():
-            if self.tree_stats.item(iid, "text") == sig:
-                count = int(self.tree_stats.item(iid, "values")[0]) + 1
-                self.tree_stats.item(iid, values=(count,))
-                break
-        else:
-            self.tree_stats.insert("", "end", text=sig, values=(1,))
+        rows = {self.tree_stats.item(iid, "text"): iid for iid in self.tree_stats.get_children()}
+        for sig in new_counts:
+            if sig in rows:
+                self.tree_stats.item(rows[sig], values=(self.alert_counts[sig],))
+            else:
+                self.tree_stats.insert("", "end", text=sig, values=(self.alert_counts[sig],))
         # graph
         self._update_graph()
 
@@ -1839,6 +3194,296 @@ class NetmeshGUI(tk.Tk):
     def _status(self, text):
         self.status_var.set(text)
 
+# =============================================================================
+# Offline pcap replay + benchmark harness
+# =============================================================================
+
+PCAP_LINKTYPE_ETHERNET = 1
+PCAP_LINKTYPE_RAW = 101
+PCAP_LINKTYPE_LINUX_SLL = 113
+
+def _read_dns_qname(payload):
+    """First question name of a DNS message (no compression in questions)."""
+    labels = []
+    i = 12
+    while i < len(payload):
+        n = payload[i]
+        if n == 0 or n & 0xC0:
+            break
+        labels.append(payload[i + 1:i + 1 + n].decode("ascii", errors="ignore"))
+        i += 1 + n
+    return ".".join(labels) or None
+
+def decode_frame(ts, frame, linktype, wirelen=None):
+    """Stdlib IPv4/TCP/UDP/DNS decoder producing a PacketView (None if not IPv4)."""
+    if linktype == PCAP_LINKTYPE_ETHERNET:
+        off, etype = 14, frame[12:14]
+        while etype in (b"\x81\x00", b"\x88\xa8"):
+            etype = frame[off + 2:off + 4]
+            off += 4
+        if etype != b"\x08\x00":
+            return None
+    elif linktype == PCAP_LINKTYPE_LINUX_SLL:
+        if frame[14:16] != b"\x08\x00":
+            return None
+        off = 16
+    elif linktype == PCAP_LINKTYPE_RAW:
+        off = 0
+    else:
+        return None
+    ip = frame[off:]
+    if len(ip) < 20 or ip[0] >> 4 != 4:
+        return None
+    ihl = (ip[0] & 0x0F) * 4
+    view = PacketView(None, ts)
+    view.length = wirelen or len(frame)
+    view.proto = ip[9]
+    view.src = socket.inet_ntoa(ip[12:16])
+    view.dst = socket.inet_ntoa(ip[16:20])
+    l4 = ip[ihl:struct.unpack("!H", ip[2:4])[0]] or ip[ihl:]
+    if view.proto == 6 and len(l4) >= 20:
+        view.transport = "TCP"
+        view.sport, view.dport = struct.unpack("!HH", l4[:4])
+        payload = l4[(l4[12] >> 4) * 4:]
+    elif view.proto == 17 and len(l4) >= 8:
+        view.transport = "UDP"
+        view.sport, view.dport = struct.unpack("!HH", l4[:4])
+        payload = l4[8:]
+    else:
+        return view
+    view.payload = view.app_payload = bytes(payload)
+    if view.transport == "UDP" and 53 in (view.sport, view.dport) and len(payload) > 12:
+        view.dns_qname = _read_dns_qname(payload)
+    return view
+
+def iter_pcap_packets(path):
+    """
+    Yield (ts, packet) from a classic pcap file. Uses scapy packets when
+    scapy is importable (same decode path as live capture), otherwise
+    PacketView objects from the stdlib decoder. PcapReader comes from
+    scapy.all so the link/IP layers are registered; scapy.utils alone
+    yields Raw packets with no IP/TCP/DNS layers.
+    """
+    try:
+        from scapy.all import PcapReader
+    except Exception:
+        PcapReader = None
+    if PcapReader is not None:
+        with PcapReader(path) as rd:
+            for pkt in rd:
+                yield float(pkt.time), pkt
+        return
+    with open(path, "rb") as f:
+        hdr = f.read(24)
+        if len(hdr) < 24:
+            raise ValueError("not a pcap file: " + path)
+        magic = hdr[:4]
+        if magic in (b"\xd4\xc3\xb2\xa1", b"\x4d\x3c\xb2\xa1"):
+            endian = "<"
+        elif magic in (b"\xa1\xb2\xc3\xd4", b"\xa1\xb2\x3c\x4d"):
+            endian = ">"
+        else:
+            raise ValueError("unsupported capture format (pcapng?): " + path)
+        frac = 1e-9 if magic in (b"\x4d\x3c\xb2\xa1", b"\xa1\xb2\x3c\x4d") else 1e-6
+        linktype = struct.unpack(endian + "I", hdr[20:24])[0]
+        rec = struct.Struct(endian + "IIII")
+        while True:
+            rh = f.read(16)
+            if len(rh) < 16:
+                return
+            sec, sub, incl, orig = rec.unpack(rh)
+            frame = f.read(incl)
+            ts = sec + sub * frac
+            view = decode_frame(ts, frame, linktype, orig)
+            if view is not None:
+                yield ts, view
+
+def write_pcap(path, frames):
+    """Write (ts, ethernet_frame) pairs as a microsecond pcap."""
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, PCAP_LINKTYPE_ETHERNET))
+        for ts, frame in frames:
+            sec = int(ts)
+            f.write(struct.pack("<IIII", sec, int((ts - sec) * 1e6), len(frame), len(frame)))
+            f.write(frame)
+
+def _build_frame(src, dst, proto, sport, dport, payload):
+    if proto == 6:
+        l4 = struct.pack("!HHIIBBHHH", sport, dport, 0, 0, 5 << 4, 0x18, 65535, 0, 0) + payload
+    else:
+        l4 = struct.pack("!HHHH", sport, dport, 8 + len(payload), 0) + payload
+    ip = struct.pack(
+        "!BBHHHBBH4s4s", 0x45, 0, 20 + len(l4), 0, 0, 64, proto, 0,
+        socket.inet_aton(src), socket.inet_aton(dst),
+    )
+    eth = b"\x02\x00\x00\x00\x00\x01\x02\x00\x00\x00\x00\x02\x08\x00"
+    return eth + ip + l4
+
+def _dns_query(name, qid):
+    q = b"".join(bytes([len(l)]) + l.encode() for l in name.split(".")) + b"\x00"
+    return struct.pack("!HHHHHH", qid, 0x0100, 1, 0, 0, 0) + q + b"\x00\x01\x00\x01"
+
+def generate_synthetic_pcap(path, n_packets=100000, duration_sec=600, seed=7):
+    """
+    Synthetic traffic mix for benchmarks: background HTTPS/DNS noise plus
+    periodic beacons, DNS tunnelling queries and payloads carrying keywords
+    and base64/hex blobs. Deterministic for a given seed.
+    """
+    rnd = random.Random(seed)
+    b32 = "abcdefghijklmnopqrstuvwxyz234567"
+    b64 = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+    hosts = ["10.0.%d.%d" % (i // 250, i % 250 + 1) for i in range(500)]
+    frames = []
+    t0 = 1700000000.0
+    # beacons: 20 implants calling home every 30-120s with small jitter
+    for i in range(20):
+        period = rnd.uniform(30, 120)
+        t = t0 + rnd.uniform(0, period)
+        while t < t0 + duration_sec:
+            frames.append((t, _build_frame(hosts[i], "203.0.113.%d" % (i + 1), 6, 40000 + i, 4444, b"\x00" * 32)))
+            t += period + rnd.uniform(-0.5, 0.5)
+    n_rest = max(0, n_packets - len(frames))
+    for k in range(n_rest):
+        t = t0 + rnd.random() * duration_sec
+        src = rnd.choice(hosts)
+        r = rnd.random()
+        if r < 0.05:
+            # DNS tunnel: long high-entropy labels
+            label = "".join(rnd.choice(b32) for _ in range(rnd.randint(30, 60)))
+            frames.append((t, _build_frame(src, "10.0.0.53", 17, rnd.randint(1024, 65535), 53, _dns_query(label + ".t.example.net", k & 0xFFFF))))
+        elif r < 0.10:
+            blob = "".join(rnd.choice(b64) for _ in range(rnd.randint(32, 200)))
+            body = "POST /upload HTTP/1.1\r\n\r\npowershell -enc %s" % blob
+            frames.append((t, _build_frame(src, "198.51.100.7", 6, rnd.randint(1024, 65535), 8080, body.encode())))
+        elif r < 0.12:
+            hexblob = "".join(rnd.choice("0123456789abcdef") for _ in range(64))
+            frames.append((t, _build_frame(src, "198.51.100.8", 6, rnd.randint(1024, 65535), 80, ("GET /?d=%s HTTP/1.1\r\n\r\n" % hexblob).encode())))
+        elif r < 0.30:
+            name = rnd.choice(["www.example.com", "api.example.org", "cdn.example.net"])
+            frames.append((t, _build_frame(src, "10.0.0.53", 17, rnd.randint(1024, 65535), 53, _dns_query(name, k & 0xFFFF))))
+        else:
+            frames.append((t, _build_frame(src, "192.0.2.%d" % rnd.randint(1, 50), 6, rnd.randint(1024, 65535), 443, bytes(rnd.getrandbits(8) for _ in range(rnd.randint(0, 64))))))
+    frames.sort(key=lambda x: x[0])
+    write_pcap(path, frames)
+    return len(frames)
+
+class _TimedDetector:
+    """Proxy that records per-packet latency of a detector (benchmark only)."""
+    def __init__(self, det, max_samples=200000):
+        self.det = det
+        self.name = getattr(det, "name", "unknown")
+        self.samples = deque(maxlen=max_samples)
+        if hasattr(det, "process_batch"):
+            self.process_batch = self._process_batch
+
+    def process(self, view):
+        t = time.perf_counter()
+        try:
+            return self.det.process(view)
+        finally:
+            self.samples.append(time.perf_counter() - t)
+
+    def _process_batch(self, views):
+        t = time.perf_counter()
+        try:
+            return self.det.process_batch(views)
+        finally:
+            per = (time.perf_counter() - t) / max(1, len(views))
+            self.samples.extend([per] * len(views))
+
+def _percentiles(samples, ps=(50, 95, 99)):
+    if not samples:
+        return {f"p{p}": 0.0 for p in ps}
+    srt = sorted(samples)
+    return {f"p{p}": round(srt[min(len(srt) - 1, int(len(srt) * p / 100))] * 1e6, 2) for p in ps}
+
+def _peak_rss_mb():
+    try:
+        import resource
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(kb / (1024.0 * 1024.0) if sys.platform == "darwin" else kb / 1024.0, 1)
+    except Exception:
+        return None
+
+# Signals the synthetic pcap is built to trigger (see generate_synthetic_pcap)
+SYNTHETIC_EXPECTED_SIGNALS = ("periodic_beaconing", "suspicious_dns_label", "keyword_in_payload")
+
+def check_replay_report(report):
+    """Names of expected synthetic-traffic signals a replay failed to raise."""
+    counts = report.get("alerts_by_signal", {})
+    missing = [sig for sig in SYNTHETIC_EXPECTED_SIGNALS if not counts.get(sig)]
+    if not report.get("hosts_profiled"):
+        missing.append("hosts_profiled")
+    return missing
+
+def run_replay(cfg, log, np_mod, IF_cls):
+    """
+    Benchmark: drive the production detector stack (detectors + extensions,
+    AIJudge, HostProfiler, Pipeline, micro-batching) from a pcap and report
+    throughput, per-detector latency, queue depth and peak RSS.
+    """
+    pipeline = Pipeline(cfg["alerts"], log)
+    detectors = [_TimedDetector(d) for d in load_detectors(cfg["plugins"], log, np_mod=np_mod)]
+    ext_dir = cfg["self_improve"].get("extensions_dir", "extensions")
+    extensions = [_TimedDetector(e) for e in load_extensions(ext_dir, log, {}, None)]
+    host_profiler = HostProfiler(log)
+    host_risk_model = HostRiskModel(log, np_mod, IF_cls)
+    aijudge = None
+    if cfg["ai"].get("enabled", True) and IF_cls and np_mod is not None:
+        aijudge = AIJudge(cfg["ai"], log, np_mod, IF_cls)
+    processor = PacketProcessor(
+        log, detectors, extensions, aijudge, host_profiler, pipeline,
+        cfg["ai"]["weights"], cfg["ai"]["baseline_scale"],
+    )
+    batch_max = int(cfg["service"].get("batch_max_packets", 1))
+    batch_ms = float(cfg["service"].get("batch_max_ms", 50))
+
+    capture = Capture(cfg["service"], log)
+    depths = []
+    packets = 0
+    last_train = 0
+    started = time.perf_counter()
+    while RUNNING and not capture.exhausted():
+        depths.append(capture.q.qsize())
+        if batch_max > 1:
+            pkts = capture.next_batch(batch_max, batch_ms, timeout=0.2)
+            if pkts:
+                processor.process_batch(pkts)
+                packets += len(pkts)
+        else:
+            pkt = capture.next_packet(timeout=0.2)
+            if pkt is not None:
+                processor.process_one(pkt)
+                packets += 1
+        if aijudge and time.time() - last_train > 10:
+            last_train = time.time()
+            aijudge.maybe_train()
+    elapsed = time.perf_counter() - started
+    host_risk_model.update(host_profiler.snapshot_features())
+
+    report = {
+        "event": "replay_report",
+        "path": cfg["service"].get("replay_path"),
+        "packets": packets,
+        "elapsed_sec": round(elapsed, 3),
+        "packets_per_sec": round(packets / elapsed, 1) if elapsed > 0 else 0.0,
+        "batch_max_packets": batch_max,
+        "dropped": capture.dropped,
+        "queue_depth": {
+            "max": max(depths) if depths else 0,
+            "mean": round(sum(depths) / len(depths), 1) if depths else 0.0,
+        },
+        "detector_latency_us": {d.name: _percentiles(d.samples) for d in detectors + extensions},
+        "alerts_by_signal": dict(pipeline.counts),
+        "dedup": pipeline.dedup.stats(),
+        "hosts_profiled": len(host_risk_model.get_risks()),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    log.info(report)
+    print(json.dumps(report, indent=2))
+    capture.close()
+    return report
+
 # =============================================================================
 # Unified MAIN (CLI engine mode OR GUI mode)
 # =============================================================================
@@ -1853,8 +3498,33 @@ def run_engine_or_gui():
     parser.add_argument("--no-ai", action="store_true")
     parser.add_argument("--ai-contamination", type=float, default=None)
     parser.add_argument("--cidr", type=str, default=None)
+    parser.add_argument("--batch", type=int, default=None, help="Max packets per micro-batch (1 disables)")
+    parser.add_argument("--shards", type=int, default=None, help="Detector worker processes (0/1 disables)")
+    parser.add_argument("--replay", type=str, default=None, help="Benchmark: run the detector stack over a pcap and exit")
+    parser.add_argument("--replay-speed", type=float, default=0.0, help="0 = max speed, else time-scale factor")
+    parser.add_argument("--gen-pcap", type=str, default=None, help="Write a synthetic benchmark pcap and exit")
+    parser.add_argument("--gen-packets", type=int, default=100000)
+    parser.add_argument("--check-replay", action="store_true",
+                        help="Replay a generated pcap and fail unless beacon/DNS/keyword alerts fire")
+    parser.add_argument("--bench-matcher", action="store_true", help="Benchmark the payload keyword matcher and exit")
     args = parser.parse_args()
 
+    if args.bench_matcher:
+        bench_keyword_matcher()
+        return
+
+    if args.check_replay:
+        args.gen_pcap = args.gen_pcap or os.path.join(tempfile.mkdtemp(), "netmesh_check.pcap")
+        generate_synthetic_pcap(args.gen_pcap, n_packets=min(args.gen_packets, 20000))
+        args.replay = args.gen_pcap
+    elif args.gen_pcap:
+        n = generate_synthetic_pcap(args.gen_pcap, n_packets=args.gen_packets)
+        print(json.dumps({"event": "synthetic_pcap_written", "path": args.gen_pcap, "packets": n}))
+        return
+
+    if args.replay:
+        args.engine = True
+
     if not args.engine:
         app = NetmeshGUI()
         app.mainloop()
@@ -1888,28 +3558,62 @@ def run_engine_or_gui():
     if args.no_ai: cfg["ai"]["enabled"] = False
     if args.ai_contamination is not None: cfg["ai"]["contamination"] = args.ai_contamination
     if args.cidr: cfg["service"]["cidr"] = args.cidr
+    if args.batch is not None: cfg["service"]["batch_max_packets"] = max(1, args.batch)
+    if args.shards is not None: cfg["service"]["shards"] = args.shards
+    if args.replay:
+        cfg["service"]["backend"] = "replay"
+        cfg["service"]["replay_path"] = args.replay
+        cfg["service"]["replay_speed"] = args.replay_speed
+        cfg["logging"]["console"] = False  # the report goes to stdout
 
     log = get_logger(cfg["logging"], requests_mod=requests)
     log.info({"event": "service_start", "pid": os.getpid()})
 
+    if args.replay:
+        report = run_replay(cfg, log, np_mod, IF_cls)
+        shutdown_logging()
+        if args.check_replay:
+            missing = check_replay_report(report)
+            print(json.dumps({"event": "replay_check", "ok": not missing, "missing": missing}))
+            if missing:
+                sys.exit(1)
+        return
+
     signal.signal(signal.SIGINT, handle_shutdown)
     signal.signal(signal.SIGTERM, handle_shutdown)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, handle_reload)
 
     pipeline = Pipeline(cfg["alerts"], log)
-    detectors = load_detectors(cfg["plugins"], log)
-    capture = Capture(cfg["service"], log)
+    detectors = load_detectors(cfg["plugins"], log, np_mod=np_mod)
 
     host_profiler = HostProfiler(log)
+
+    # Shards are forked before any capture/server threads exist, but after
+    # the AsyncLogWriter thread started. That is safe: a shard never touches
+    # the parent's log queue, handlers or writer (it swaps in a
+    # _ShardLogHandler on its own multiprocessing queue), and logging holds
+    # its module lock across fork and re-inits handler locks in the child.
+    sharded = None
+    n_shards = int(cfg["service"].get("shards", 0) or 0)
+    if n_shards > 1:
+        sharded = ShardedEngine(cfg, log, n_shards, host_profiler)
+        sharded.start()
+
+    capture = Capture(cfg["service"], log)
     host_risk_model = HostRiskModel(log, np_mod, IF_cls)
 
     aijudge = None
-    if cfg["ai"].get("enabled", True) and IF_cls and np_mod is not None:
+    if sharded:
+        log.info({"event": "ai_in_shards"})
+    elif cfg["ai"].get("enabled", True) and IF_cls and np_mod is not None:
         aijudge = AIJudge(cfg["ai"], log, np_mod, IF_cls)
     else:
         log.info({"event": "ai_disabled"})
 
-    probes = ProbeAPI(cfg["probes"], log, pipeline, requests)
-    scanner = NetworkScanner(cfg["service"], log, pipeline)
+    scan_engine = AsyncScanEngine(log, cfg["service"].get("scanner_concurrency", 256))
+    probes = ProbeAPI(cfg["probes"], log, pipeline, requests, scan_engine=scan_engine)
+    scanner = NetworkScanner(cfg["service"], log, pipeline, engine=scan_engine, limiter=probes.limiter)
     peers = set()
 
     mesh = MeshHTTPServer(
@@ -1940,86 +3644,30 @@ def run_engine_or_gui():
     baseline_scale = cfg["ai"]["baseline_scale"]
     iface_cidr = cfg["service"]["cidr"]
 
+    processor = PacketProcessor(
+        log, detectors, extensions, aijudge, host_profiler, pipeline,
+        weights, baseline_scale,
+    )
+    batch_max = int(cfg["service"].get("batch_max_packets", 1))
+    batch_ms = float(cfg["service"].get("batch_max_ms", 50))
+
     def packet_worker():
         last_train = 0
         while RUNNING:
-            pkt = capture.next_packet()
-            if pkt is None:
+            if sharded:
+                pkts = capture.next_batch(max(1, batch_max), batch_ms)
+                if pkts:
+                    sharded.dispatch([PacketView.from_packet(p) for p in pkts])
+                sharded.drain(pipeline)
                 continue
-
-            ai_scores = None
-            if aijudge:
-                obs = aijudge.observe(pkt)
-                if obs:
-                    ai_scores = aijudge.score(obs)
-
-            # basic pkt info for host profiling
-            length = 0
-            src = dst = ""
-            dst_port = None
-            try:
-                if hasattr(pkt, "length"):
-                    length = int(pkt.length)
-                elif hasattr(pkt, "wirelen"):
-                    length = int(pkt.wirelen)
-            except Exception:
-                pass
-            try:
-                if hasattr(pkt, "ip"):
-                    src = getattr(pkt.ip, "src", "")
-                    dst = getattr(pkt.ip, "dst", "")
-                elif hasattr(pkt, "haslayer") and pkt.haslayer("IP"):
-                    ip_layer = pkt["IP"]
-                    src = ip_layer.src
-                    dst = ip_layer.dst
-                if hasattr(pkt, "tcp"):
-                    dst_port = int(getattr(pkt.tcp, "dstport", 0))
-                elif hasattr(pkt, "haslayer") and pkt.haslayer("TCP"):
-                    dst_port = int(pkt["TCP"].dport)
-                elif hasattr(pkt, "haslayer") and pkt.haslayer("UDP"):
-                    dst_port = int(pkt["UDP"].dport)
-            except Exception:
-                pass
-
-            events = []
-            for d in detectors + extensions:
-                if not DETECTOR_ENABLED.get(getattr(d, "name", ""), True):
-                    continue
-                try:
-                    ev = d.process(pkt)
-                    if ev:
-                        events.extend(ev if isinstance(ev, list) else [ev])
-                except Exception as e:
-                    log.error({"event": "detector_error", "error": str(e)})
-
-            for ev in events:
-                rule = ev.get("severity", 1)
-                sev, breakdown = ensemble_severity(rule, ai_scores, weights, baseline_scale)
-                ev["severity"] = sev
-                ev["explain"] = breakdown
-
-                # host profiling: anomaly + DNS/beacon info
-                sig = ev.get("signal", "")
-                dns_entropy = None
-                beacon_flag = False
-                if sig == "suspicious_dns_label":
-                    dets = ev.get("details", [])
-                    if dets:
-                        dns_entropy = max(d.get("entropy", 0) for d in dets)
-                if sig == "periodic_beaconing":
-                    beacon_flag = True
-
-                host_profiler.observe_packet(
-                    src=ev.get("src", src),
-                    dst=ev.get("dst", dst),
-                    length=length,
-                    anomaly=True,
-                    dns_entropy=dns_entropy,
-                    dst_port=ev.get("dst_port", dst_port),
-                    beacon=beacon_flag,
-                )
-
-                pipeline.ingest(ev)
+            if batch_max > 1:
+                pkts = capture.next_batch(batch_max, batch_ms)
+                if pkts:
+                    processor.process_batch(pkts)
+            else:
+                pkt = capture.next_packet()
+                if pkt is not None:
+                    processor.process_one(pkt)
 
             if aijudge and time.time() - last_train > 10:
                 last_train = time.time()
@@ -2063,26 +3711,40 @@ def run_engine_or_gui():
     last_risk_update = 0
     while RUNNING:
         now = time.time()
+        if RELOAD_REQUESTED.is_set():
+            RELOAD_REQUESTED.clear()
+            try:
+                new_cfg = load_config(args.config, yaml_mod)
+                reload_detector_config(detectors, new_cfg["plugins"], log)
+                if sharded:
+                    sharded.reconfigure(new_cfg["plugins"])
+            except Exception as e:
+                log.error({"event": "config_reload_error", "error": str(e)})
         if now - last_risk_update > 15:
-            snaps = host_profiler.snapshot_features()
-            host_risk_model.update(snaps)
+            host_risk_model.update(host_profiler.snapshot_features())
             last_risk_update = now
         log.info({
             "event": "heartbeat",
             "alerts": dict(pipeline.counts),
             "peers": list(peers),
             "host_risks": host_risk_model.get_risks(),
+            "shards": sharded.stats() if sharded else None,
         })
         for _ in range(hb):
-            if not RUNNING:
+            if not RUNNING or RELOAD_REQUESTED.is_set():
                 break
             time.sleep(1)
 
     capture.close()
+    if sharded:
+        sharded.close()
+        sharded.drain(pipeline)
     mesh.close()
     probes.close()
+    scanner.close()
     pipeline.flush()
     log.info({"event": "service_stop"})
+    shutdown_logging()
 
 # =============================================================================
 # ENTRYPOINT